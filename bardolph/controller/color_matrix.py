@@ -1,4 +1,9 @@
-import copy
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class Rect:
@@ -24,8 +29,24 @@ class ColorMatrix:
     When a rectangle is used as a parameter to a method, the coordinates are
     inclusive, starting at zero. For example, a rectangle covering an entire
     6x5 matrix would be Rect(top=0, bottom=5, left=0, right=4).
+
+    If numpy is installed, constructing a ColorMatrix actually yields an
+    ArrayColorMatrix, which does the same things with array operations
+    instead of cell-by-cell loops.
+
+    The matrix property is for reading. Use the set_* and overlay_* methods
+    to change cells: in an ArrayColorMatrix, the lists it returns are built
+    on the fly, and assigning to a cell through them raises a TypeError.
     """
 
+    def __new__(cls, *args, **kwargs):
+        # copy and pickle call __new__ without a size, and expect to get the
+        # class of the original.
+        if (cls is ColorMatrix and numpy is not None
+                and (len(args) > 0 or len(kwargs) > 0)):
+            cls = ArrayColorMatrix
+        return super().__new__(cls)
+
     def __init__(self, height, width):
         self._height = height
         self._width = width
@@ -35,10 +56,11 @@ class ColorMatrix:
 
     def __str__(self):
         ret_value = ''
+        mat = self.matrix
         for row in range(0, self._height):
             ret_value += 'Row {:1d}:\n'.format(row)
             for column in range(0, self._width):
-                color = self._mat[row][column]
+                color = mat[row][column]
                 if color is None:
                     ret_value += 'None '
                 else:
@@ -90,11 +112,36 @@ class ColorMatrix:
     def get_colors(self):
         return [self._standardize_raw(param) for param in self.as_list()]
 
+    def standardized(self):
+        """
+        Returns a new matrix containing the same colors as get_colors().
+        """
+        return ColorMatrix.new_from_iterable(
+            self.height, self.width, self.get_colors())
+
+    def transformed(self, batch_fn):
+        """
+        Returns a new matrix with batch_fn applied to the colors of all the
+        cells that have one. Cells containing None stay that way.
+
+        batch_fn gets all of those colors at once and returns a converted
+        color for each of them, in the same order, as with the batch
+        functions in controller.units.
+        """
+        colors = self.as_list()
+        converted = iter(batch_fn(
+            [color for color in colors if color is not None]))
+        return ColorMatrix.new_from_iterable(
+            self.height, self.width,
+            (None if color is None else list(next(converted))
+             for color in colors))
+
     def find_replace(self, to_find, replacement):
         for row in range(0, self.height):
             for column in range(0, self.width):
                 if self._mat[row][column] == to_find:
-                    self._mat[row][column] = replacement.copy()
+                    self._mat[row][column] = (
+                        None if replacement is None else replacement.copy())
 
     def as_list(self):
         return [self._mat[row][column]
@@ -151,4 +198,116 @@ class ColorMatrix:
                 rect.left = rect.right
             case False, True:
                 rect.right = rect.left
-        return rect
\ No newline at end of file
+        return rect
+
+class _ReadOnlyRow(list):
+    def __setitem__(self, index, value):
+        raise TypeError('cells of ArrayColorMatrix.matrix are read-only')
+
+    def __delitem__(self, index):
+        raise TypeError('cells of ArrayColorMatrix.matrix are read-only')
+
+
+class ArrayColorMatrix(ColorMatrix):
+    """
+    ColorMatrix kept in a height x width x 4 numpy array of floats. Cells
+    containing None are marked in a separate height x width array of
+    booleans, and the values underneath them are ignored.
+
+    The matrix property and as_list() return new lists, so changing them has
+    no effect on the matrix. The rows from the matrix property don't allow
+    their cells to be replaced, so that a change that would otherwise be
+    lost raises a TypeError.
+    """
+
+    def __init__(self, height, width):
+        self._height = height
+        self._width = width
+        self._mat = numpy.zeros((height, width, 4))
+        self._none = numpy.zeros((height, width), dtype=bool)
+
+    @property
+    def matrix(self):
+        rows = self._mat.tolist()
+        for row, column in zip(*numpy.nonzero(self._none)):
+            rows[row][column] = None
+        return [_ReadOnlyRow(row) for row in rows]
+
+    def set_from_iterable(self, srce):
+        colors = list(itertools.islice(srce, self._height * self._width))
+        none = [color is None for color in colors]
+        values = [[0, 0, 0, 0] if color is None else color for color in colors]
+        self._mat = numpy.array(values, dtype=float).reshape(
+            self._height, self._width, 4)
+        self._none = numpy.array(none, dtype=bool).reshape(
+            self._height, self._width)
+        return self
+
+    def set_from_constant(self, value):
+        self._set_cells(numpy.s_[:, :], value)
+        return self
+
+    def set_from_matrix(self, srce):
+        if not isinstance(srce, ArrayColorMatrix):
+            return self.set_from_iterable(srce.as_list())
+        self._mat = srce._mat[:self._height, :self._width].copy()
+        self._none = srce._none[:self._height, :self._width].copy()
+        return self
+
+    def get_colors(self):
+        colors = numpy.rint(numpy.clip(self._mat, 0.0, 65535.0)).astype(int)
+        return self._to_list(colors)
+
+    def standardized(self):
+        result = ArrayColorMatrix(self._height, self._width)
+        result._mat = numpy.rint(numpy.clip(self._mat, 0.0, 65535.0))
+        result._none = self._none.copy()
+        return result
+
+    def transformed(self, batch_fn):
+        """
+        batch_fn gets an N x 4 array of the colors, and returns anything
+        that can be turned into another array of that shape.
+        """
+        result = ArrayColorMatrix(self._height, self._width)
+        result._none = self._none.copy()
+        present = ~self._none
+        result._mat[present] = numpy.asarray(
+            batch_fn(self._mat[present]), dtype=float).reshape(-1, 4)
+        return result
+
+    def find_replace(self, to_find, replacement):
+        if to_find is None:
+            found = self._none.copy()
+        else:
+            found = numpy.all(self._mat == to_find, axis=2) & ~self._none
+        self._set_cells(found, replacement)
+
+    def as_list(self):
+        return self._to_list(self._mat)
+
+    def overlay_color(self, rect: Rect, color) -> None:
+        self._normalize_rect(rect)
+        self._set_cells(
+            numpy.s_[rect.top:rect.bottom + 1, rect.left:rect.right + 1],
+            color)
+
+    def overlay_section(self, rect: Rect, srce) -> None:
+        self._normalize_rect(rect)
+        for row in range(rect.top, rect.bottom + 1):
+            for column in range(rect.left, rect.right + 1):
+                self._set_cells((row, column), srce[row][column])
+
+    def _set_cells(self, where, color) -> None:
+        # where is anything that can index the height x width part.
+        if color is None:
+            self._none[where] = True
+        else:
+            self._mat[where] = color
+            self._none[where] = False
+
+    def _to_list(self, values):
+        colors = values.reshape(-1, 4).tolist()
+        for index in numpy.flatnonzero(self._none):
+            colors[index] = None
+        return colors
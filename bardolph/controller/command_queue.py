@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+
+from bardolph.lib import i_lib
+from bardolph.lib.injection import inject
+
+
+class _LightQueue:
+    """
+    Commands waiting to be sent to one light, keyed by kind: "color",
+    "power", "matrix", or a tuple for a range of zones. There is never more
+    than one of each kind, because a newer command replaces an older one
+    that hasn't gone out yet. They go out in the order they were submitted,
+    and a command that replaces another takes a place at the end.
+    """
+    def __init__(self):
+        self.pending = {}
+        self.busy = False
+        self.last_sent = None
+
+
+class CommandQueue:
+    """
+    Sits between the code that decides what a light should do and the light
+    itself, combining writes to the same light.
+
+    A command for a light that is idle goes out right away, on the caller's
+    thread. If the light is still busy with an earlier command, the new one
+    is parked instead, and the caller returns immediately. When the earlier
+    command finishes, the thread that sent it goes on to send whatever is
+    parked. A command that is still parked when another of the same kind
+    arrives for the same light is dropped, so only the latest state is sent.
+
+    If min_interval is more than zero, a light is also considered busy until
+    that many seconds have passed since the last command was sent to it.
+    The parked commands then go out from a timer thread. This setting comes
+    from min_send_interval, and it defaults to zero, which means that a
+    single thread calling submit() never has anything dropped.
+    """
+    def __init__(self, min_interval=None):
+        self._min_interval = min_interval
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._num_submitted = 0
+        self._num_sent = 0
+        self._num_coalesced = 0
+
+    @inject(i_lib.Settings)
+    def _init_interval(self, settings) -> None:
+        self._min_interval = float(
+            settings.get_value('min_send_interval', 0.0))
+
+    def submit(self, light, kind, fn) -> None:
+        """
+        Arrange for fn(light) to be called, unless another command of the
+        same kind is submitted for the light before it gets its turn.
+
+        If fn is called on the caller's thread and raises an exception, the
+        exception propagates. Exceptions from parked commands are logged.
+        """
+        if self._min_interval is None:
+            self._init_interval()
+        with self._lock:
+            self._num_submitted += 1
+            queue = self._queues.setdefault(light.get_uid(), _LightQueue())
+            if kind in queue.pending:
+                del queue.pending[kind]
+                self._num_coalesced += 1
+            queue.pending[kind] = fn
+            if queue.busy:
+                return
+            queue.busy = True
+            delay = self._delay(queue)
+            if delay > 0.0:
+                self._start_timer(light, queue, delay)
+                return
+            del queue.pending[kind]
+        try:
+            self._send(queue, light, fn)
+        finally:
+            self._drain(light, queue)
+
+    def _delay(self, queue) -> float:
+        if self._min_interval <= 0.0 or queue.last_sent is None:
+            return 0.0
+        return queue.last_sent + self._min_interval - time.monotonic()
+
+    def _start_timer(self, light, queue, delay) -> None:
+        timer = threading.Timer(delay, self._drain, (light, queue))
+        timer.daemon = True
+        timer.start()
+
+    def _send(self, queue, light, fn) -> None:
+        queue.last_sent = time.monotonic()
+        try:
+            fn(light)
+        finally:
+            with self._lock:
+                self._num_sent += 1
+
+    def _drain(self, light, queue) -> None:
+        # Called by the thread that owns the busy flag.
+        while True:
+            with self._lock:
+                if len(queue.pending) == 0:
+                    queue.busy = False
+                    return
+                delay = self._delay(queue)
+                if delay > 0.0:
+                    self._start_timer(light, queue, delay)
+                    return
+                kind = next(iter(queue.pending))
+                fn = queue.pending.pop(kind)
+            try:
+                self._send(queue, light, fn)
+            except Exception as ex:
+                logging.warning('Light "{}": {}'.format(light.get_name(), ex))
+
+    def forget(self, light) -> None:
+        # Drop the state kept for a light that has gone away.
+        with self._lock:
+            queue = self._queues.get(light.get_uid())
+            if queue is not None and not queue.busy:
+                del self._queues[light.get_uid()]
+
+    def get_counters(self) -> dict:
+        """
+        Returns a dict with the number of commands submitted, the number
+        actually sent, and the number dropped because a newer one replaced
+        them before they were sent.
+        """
+        with self._lock:
+            return {
+                'submitted': self._num_submitted,
+                'sent': self._num_sent,
+                'coalesced': self._num_coalesced
+            }
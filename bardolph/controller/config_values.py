@@ -2,9 +2,30 @@ import logging
 
 functional = {
     'default_num_lights': None,
+
+    # Commands for a group or location go to its lights concurrently.
+    'dispatch_deadline': 2.0, # seconds to wait for every light to finish
+    'dispatch_threads': 16,
+
+    # A light is sent at most one command per interval. Anything newer that
+    # arrives in the meantime replaces what's waiting to be sent.
+    'min_send_interval': 0.0, # seconds
+
     'sleep_time': 0.01, # seconds
 
+    # Start with the lights found by the previous discovery, and check them
+    # in the background.
+    'discovery_cache_file': '~/.cache/bardolph/discovery.json',
+    'use_discovery_cache': True,
+
     'generated_path': 'generated',
+
+    # Used only when use_async_lan is True.
+    'lan_broadcast': '255.255.255.255',
+    'lan_port': 56700,
+    'lan_retries': 2,
+    'lan_timeout': 0.5, # seconds to wait for a response
+
     'log_date_format': '%D %H:%M:%S',
     'log_format':
         '%(asctime)s %(filename)s(%(lineno)d) %(funcName)s(): %(message)s',
@@ -21,7 +42,46 @@ functional = {
     # How long to wait before pruning lights that seem to have disappeared.
     'light_gc_time': 300, # seconds
 
+    # Each browser watching the web app's /events stream holds one of the
+    # web server's threads for as long as it stays connected, so only this
+    # many can watch at once. Keep it well below web_threads, or there will
+    # be no threads left for anything else.
+    'max_event_streams': 8,
+
+    # Most background scripts that can run at once, each on its own thread.
+    'max_job_workers': 16,
+
+    # A matrix light is only sent the cells that have changed since the last
+    # set, but gets all of them at least this often. Zero always sends all.
+    'matrix_full_frame_time': 10.0, # seconds
+
+    # Background scripts take turns running on a few shared threads instead
+    # of each getting its own.
+    'scheduler_threads': 1,
+    'use_scheduler': False,
+
     'script_path': 'scripts',
+
+    # How long the last known state of a light can be trusted. Within that
+    # time, get is answered without asking the light, and a set that
+    # wouldn't change anything isn't sent. Zero turns this off.
+    'shadow_ttl': 0.0, # seconds
+    'shadow_tolerance': 0, # raw units of each color component
+
     'single_light_discover': False,
+
+    # How often the web app's status page gets the state of every light.
+    'status_refresh_time': 30, # seconds
+
+    # Threads the web app's waitress server handles requests on.
+    'web_threads': 16,
+
+    # Keep compiled scripts in a __lscache__ directory next to the source.
+    # The directory has to be writable, and old entries are never removed,
+    # so it grows a little every time a script is edited.
+    'use_compile_cache': False,
+
+    # Talk to the lights with the built-in asyncio transport, not lifxlan.
+    'use_async_lan': False,
     'use_fakes': False
 }
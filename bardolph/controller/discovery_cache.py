@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+import tempfile
+
+from bardolph.lib import i_lib
+from bardolph.lib.injection import inject
+
+
+class DiscoveryCache:
+    """
+    What the last discovery found, kept in a JSON file so that the next
+    process can start with the lights right away instead of waiting for
+    discovery to finish.
+
+    The file holds a list of records, one per light. Each record is a dict
+    produced by the light's get_record(): MAC and IP address, port, label,
+    group, location, product features, number of zones, and tile size.
+    Which of those a LightApi needs to rebuild the light is up to it.
+
+    A cache that can't be read or written is never fatal: discovery simply
+    happens the slow way.
+    """
+    VERSION = 1
+
+    def __init__(self, path):
+        self._path = path
+
+    @staticmethod
+    @inject(i_lib.Settings)
+    def from_settings(settings):
+        path = settings.get_value('discovery_cache_file', None)
+        if path is None:
+            return None
+        return DiscoveryCache(os.path.expanduser(path))
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self) -> list:
+        """
+        Return the records saved by the last discovery, or an empty list if
+        there aren't any.
+        """
+        try:
+            with open(self._path, 'r') as srce:
+                content = json.load(srce)
+        except FileNotFoundError:
+            return []
+        except Exception as ex:
+            logging.debug('Unable to read {}: {}'.format(self._path, ex))
+            return []
+        if (not isinstance(content, dict)
+                or content.get('version') != DiscoveryCache.VERSION
+                or not isinstance(content.get('lights'), list)):
+            logging.debug('Ignoring {}'.format(self._path))
+            return []
+        return [record for record in content['lights']
+                if isinstance(record, dict)]
+
+    def save(self, records) -> bool:
+        """
+        Replace the contents of the cache with records. The file is written
+        under a temporary name and then renamed, so a reader never sees a
+        partial list.
+        """
+        content = {'version': DiscoveryCache.VERSION, 'lights': list(records)}
+        cache_dir = os.path.dirname(os.path.abspath(self._path))
+        temp_name = None
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as dest:
+                json.dump(content, dest, indent=1)
+            os.replace(temp_name, self._path)
+            return True
+        except Exception as ex:
+            logging.debug('Unable to write {}: {}'.format(self._path, ex))
+            if temp_name is not None and os.path.exists(temp_name):
+                os.remove(temp_name)
+            return False
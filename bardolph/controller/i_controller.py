@@ -5,6 +5,7 @@ class LightException(Exception):
 
 class LightApi:
     def get_lights(self): pass
+    def restore_lights(self, records): pass
     def set_color_all_lights(self, color, duration): pass
     def set_power_all_lights(self, power_level, duration): pass
 
@@ -12,6 +13,8 @@ class LightApi:
 class LightSet:
     def discover(self): pass
     def refresh(self): pass
+    def get_state(self): pass
+    def get_version(self): pass
     def get_lights(self): pass
     def get_light_count(self): pass
     def get_light_names(self): pass
@@ -22,6 +25,12 @@ class LightSet:
     def get_location_lights(self, loc_name): pass
     def set_color_all_lights(self, color, duration): pass
     def set_power_all_lights(self, power_level, duration): pass
+    def set_color_lights(self, light_names, color, duration): pass
+    def set_power_lights(self, light_names, power_level, duration): pass
+    def set_light_zone_colors(
+        self, light, first_zone, last_zone, color, duration): pass
+    def set_light_matrix(self, light, matrix, duration): pass
+    def get_queue_counters(self): pass
     def get_successful_discoveries(self): pass
     def get_failed_discoveries(self): pass
 
@@ -35,6 +44,7 @@ class Light:
     def get_width(self) -> int: pass
     def is_color(self) -> bool: pass
     def get_age(self) -> float: pass
+    def get_record(self) -> dict: pass
     def get_color(self): pass
     def set_color(self, color, duration) -> None: pass
     def get_power(self) -> int: pass
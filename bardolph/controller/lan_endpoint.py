@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import random
+import threading
+
+from bardolph.controller import lifx_protocol
+from bardolph.controller.lifx_protocol import Message, MessageType
+
+
+class _Request:
+    """
+    An outstanding request, waiting for responses with its sequence number.
+    The request is complete as soon as is_complete(responses) returns True.
+    """
+    def __init__(self, target, response_types, is_complete):
+        self.target = target
+        self.response_types = response_types
+        self.is_complete = is_complete
+        self.responses = []
+        self.done = asyncio.get_running_loop().create_future()
+
+    def add(self, message, addr) -> None:
+        if self.done.done():
+            return
+        if (self.target != lifx_protocol.BROADCAST_TARGET
+                and message.target != self.target):
+            return
+        if (message.msg_type in self.response_types
+                or message.msg_type is MessageType.STATE_UNHANDLED):
+            self.responses.append((message, addr))
+            if self.is_complete(self.responses):
+                self.done.set_result(self.responses)
+
+
+class LanEndpoint(asyncio.DatagramProtocol):
+    """
+    One UDP socket through which all traffic to every device goes.
+
+    Each request gets its own sequence number, and a response is matched to
+    its request by that number. Therefore, any number of requests, to any
+    number of devices, can be outstanding at the same time. A request that
+    gets no answer is sent again, up to the given number of retries.
+
+    A device that doesn't understand a request may answer with
+    StateUnhandled, which is returned like any other response.
+    """
+    def __init__(self, timeout=0.5, retries=2):
+        self._timeout = timeout
+        self._retries = retries
+        self._transport = None
+        self._source = random.randint(2, 0xffffffff)
+        self._sequence = 0
+        self._pending = {}
+
+    async def open(self, local_addr=('0.0.0.0', 0)) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(
+            lambda: self, local_addr=local_addr, allow_broadcast=True)
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def connection_made(self, transport) -> None:
+        self._transport = transport
+
+    def datagram_received(self, data, addr) -> None:
+        message = lifx_protocol.decode(data)
+        if message is None or message.source != self._source:
+            return
+        request = self._pending.get(message.sequence)
+        if request is not None:
+            request.add(message, addr)
+
+    def error_received(self, exc) -> None:
+        logging.debug('LAN endpoint: {}'.format(exc))
+
+    def _next_sequence(self) -> int:
+        for _ in range(0, 256):
+            self._sequence = (self._sequence + 1) & 0xff
+            if self._sequence not in self._pending:
+                return self._sequence
+        raise lifx_protocol.ProtocolException('Too many requests pending.')
+
+    def send(self, addr, target, msg_type, payload=()) -> None:
+        """
+        Send a message without waiting for, or asking for, any response.
+        """
+        if self._transport is None:
+            return
+        message = Message(
+            msg_type, target, self._source, self._next_sequence(), payload)
+        self._transport.sendto(lifx_protocol.encode(message), addr)
+
+    async def request(self, addr, target, msg_type, payload=(),
+                      response_types=(), is_complete=None):
+        """
+        Send a message and wait for the response. Returns a list of
+        (Message, address) tuples, which is empty if nothing came back.
+
+        By default, the first response completes the request. A request
+        sent to the broadcast target never completes early; it collects
+        responses from every device until it times out.
+        """
+        if self._transport is None:
+            return []
+        broadcast = target == lifx_protocol.BROADCAST_TARGET
+        if is_complete is None:
+            is_complete = (lambda _: False) if broadcast else bool
+        sequence = self._next_sequence()
+        packet = lifx_protocol.encode(Message(
+            msg_type, target, self._source, sequence, payload,
+            tagged=broadcast, res_required=True))
+
+        request = _Request(target, response_types, is_complete)
+        self._pending[sequence] = request
+        try:
+            for _ in range(0, self._retries + 1):
+                self._transport.sendto(packet, addr)
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(request.done), self._timeout)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            del self._pending[sequence]
+        return request.responses
+
+
+class LanLoop:
+    """
+    Runs an asyncio event loop, which owns a LanEndpoint, in a background
+    thread. The synchronous code that controls the lights uses it to send
+    messages and to wait for the results of coroutines.
+    """
+    def __init__(self, endpoint: LanEndpoint, local_addr=('0.0.0.0', 0)):
+        self._endpoint = endpoint
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name='lan', daemon=True)
+        self._thread.start()
+        self.run(endpoint.open(local_addr))
+
+    @property
+    def endpoint(self) -> LanEndpoint:
+        return self._endpoint
+
+    def run(self, coroutine):
+        # Wait for the coroutine to finish running in the loop's thread.
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self._loop).result()
+
+    def send(self, addr, target, msg_type, payload=()) -> None:
+        # Returns right away; the message goes out from the loop's thread.
+        self._loop.call_soon_threadsafe(
+            self._endpoint.send, addr, target, msg_type, payload)
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._endpoint.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+
+from bardolph.controller import i_controller, lifx_async_light, lifx_protocol
+from bardolph.controller.lan_endpoint import LanEndpoint, LanLoop
+from bardolph.controller.lifx_async_light import Device
+from bardolph.controller.lifx_protocol import MessageType
+from bardolph.lib import i_lib
+from bardolph.lib.injection import bind_instance, inject
+from bardolph.lib.param_helper import param_16, param_32, param_color
+
+# Product ids of well-known devices. The features of any other product are
+# found by asking the device.
+_MULTIZONE_PRODUCTS = frozenset((31, 32, 38, 117, 118, 119, 120))
+_MATRIX_PRODUCTS = frozenset((55, 57, 68, 137, 138, 176, 177, 185, 186))
+_WHITE_PRODUCTS = frozenset((10, 11, 18, 50, 51, 60, 61, 66, 81, 82, 87, 88))
+
+
+class LifxAsyncApi(i_controller.LightApi):
+    """
+    Speaks the LIFX LAN protocol directly, through a single UDP socket that
+    is serviced by an asyncio event loop. Discovery broadcasts GetService
+    and then queries every device that answers, all of them at the same
+    time.
+
+    The lan_* settings determine where the broadcast goes, how long to wait
+    for a response, and how many times to retry.
+    """
+    @inject(i_lib.Settings)
+    def __init__(self, settings):
+        self._broadcast_addr = (
+            settings.get_value('lan_broadcast', '255.255.255.255'),
+            int(settings.get_value('lan_port', lifx_protocol.PORT)))
+        endpoint = LanEndpoint(
+            float(settings.get_value('lan_timeout', 0.5)),
+            int(settings.get_value('lan_retries', 2)))
+        self._lan = LanLoop(endpoint)
+        self._devices = []
+
+    def close(self) -> None:
+        self._lan.close()
+
+    def get_lights(self):
+        try:
+            self._devices = self._lan.run(self._discover())
+        except OSError as ex:
+            logging.error("In get_lights(): {}".format(ex))
+            raise i_controller.LightException(ex)
+        return [self._build_light(device) for device in self._devices]
+
+    def restore_lights(self, records):
+        """
+        Build lights from the records in the discovery cache without any
+        network traffic. A record that doesn't make sense is skipped.
+        """
+        devices = []
+        for record in records:
+            try:
+                devices.append(Device.from_record(record))
+            except (AttributeError, KeyError, TypeError, ValueError) as ex:
+                logging.debug('Discovery cache: {}'.format(ex))
+        self._devices = devices
+        return [self._build_light(device) for device in devices]
+
+    def set_color_all_lights(self, color, duration):
+        payload = (0, *param_color(color), param_32(duration))
+        for device in self._devices:
+            self._lan.send(
+                device.addr, device.target, MessageType.LIGHT_SET_COLOR,
+                payload)
+
+    def set_power_all_lights(self, power_level, duration):
+        payload = (param_16(power_level), param_32(duration))
+        for device in self._devices:
+            self._lan.send(
+                device.addr, device.target, MessageType.LIGHT_SET_POWER,
+                payload)
+
+    def _build_light(self, device):
+        if device.features['multizone']:
+            return lifx_async_light.MultizoneLight(self._lan, device)
+        if device.features['matrix']:
+            return lifx_async_light.MatrixLight(self._lan, device)
+        return lifx_async_light.Light(self._lan, device)
+
+    async def _discover(self):
+        endpoint = self._lan.endpoint
+        responses = await endpoint.request(
+            self._broadcast_addr, lifx_protocol.BROADCAST_TARGET,
+            MessageType.GET_SERVICE, (), (MessageType.STATE_SERVICE,))
+        found = {}
+        for message, addr in responses:
+            if message.msg_type is not MessageType.STATE_SERVICE:
+                continue
+            service, port = message.payload
+            if service == lifx_protocol.SERVICE_UDP:
+                found[message.target] = Device(message.target, (addr[0], port))
+
+        devices = await asyncio.gather(
+            *(self._query(device) for device in found.values()))
+        return [device for device in devices if device is not None]
+
+    async def _query(self, device):
+        # Returns None if the device doesn't answer.
+        endpoint = self._lan.endpoint
+        def request(msg_type, response_type, payload=()):
+            return endpoint.request(
+                device.addr, device.target, msg_type, payload,
+                (response_type,))
+
+        state, group, location, version = await asyncio.gather(
+            request(MessageType.LIGHT_GET, MessageType.LIGHT_STATE),
+            request(MessageType.GET_GROUP, MessageType.STATE_GROUP),
+            request(MessageType.GET_LOCATION, MessageType.STATE_LOCATION),
+            request(MessageType.GET_VERSION, MessageType.STATE_VERSION))
+        payloads = [
+            _first_payload(responses, response_type)
+            for responses, response_type in (
+                (state, MessageType.LIGHT_STATE),
+                (group, MessageType.STATE_GROUP),
+                (location, MessageType.STATE_LOCATION),
+                (version, MessageType.STATE_VERSION))]
+        if None in payloads:
+            logging.warning('Incomplete response from {}'.format(device.mac))
+            return None
+        state, group, location, version = payloads
+
+        device.label = lifx_protocol.label_text(state[6])
+        device.group = lifx_protocol.label_text(group[1])
+        device.location = lifx_protocol.label_text(location[1])
+        device.product = version[1]
+        await self._find_features(device, request)
+        return device
+
+    async def _find_features(self, device, request) -> None:
+        product = device.product
+        features = device.features
+        features['color'] = product not in _WHITE_PRODUCTS
+        known = product in _MULTIZONE_PRODUCTS or product in _MATRIX_PRODUCTS
+
+        if not known or product in _MULTIZONE_PRODUCTS:
+            zones = _first_payload(
+                await request(
+                    MessageType.GET_COLOR_ZONES, MessageType.STATE_MULTI_ZONE,
+                    (0, 255)),
+                MessageType.STATE_MULTI_ZONE)
+            if zones is not None:
+                features['multizone'] = True
+                device.num_zones = zones[0]
+                return
+
+        if not known or product in _MATRIX_PRODUCTS:
+            chain = _first_payload(
+                await request(
+                    MessageType.GET_DEVICE_CHAIN,
+                    MessageType.STATE_DEVICE_CHAIN),
+                MessageType.STATE_DEVICE_CHAIN)
+            if chain is not None:
+                # Only the first tile in the chain is used.
+                tile = 1
+                features['matrix'] = True
+                device.width = chain[tile + lifx_protocol.TILE_WIDTH]
+                device.height = chain[tile + lifx_protocol.TILE_HEIGHT]
+
+
+def _first_payload(responses, msg_type):
+    for message, _ in responses:
+        if message.msg_type is msg_type:
+            return message.payload
+    return None
+
+
+def configure():
+    # One instance owns the socket and knows every device.
+    bind_instance(LifxAsyncApi()).to(i_controller.LightApi)
@@ -0,0 +1,198 @@
+import logging
+
+from bardolph.controller import light
+from bardolph.controller.color_matrix import ColorMatrix
+from bardolph.controller.lifx_protocol import (MessageType, mac_target,
+                                              mac_text)
+from bardolph.lib.param_helper import param_16, param_32, param_8, param_color
+
+_NO_COLOR = [-1] * 4
+
+
+class Device:
+    """
+    What discovery finds out about a device: where it is, what it's called,
+    and what it can do.
+    """
+    def __init__(self, target, addr):
+        self.target = target
+        self.addr = addr
+        self.label = ''
+        self.group = ''
+        self.location = ''
+        self.product = 0
+        self.features = {'color': True, 'multizone': False, 'matrix': False}
+        self.num_zones = 0
+        self.height = 0
+        self.width = 0
+
+    @property
+    def mac(self) -> str:
+        return mac_text(self.target)
+
+    @staticmethod
+    def from_record(record):
+        device = Device(
+            mac_target(record['mac']), (record['ip'], int(record['port'])))
+        device.label = record['label']
+        device.group = record['group']
+        device.location = record['location']
+        device.product = record.get('product', 0)
+        device.features.update(record['features'])
+        device.num_zones = record['num_zones']
+        device.height = record['height']
+        device.width = record['width']
+        return device
+
+
+class Light(light.Light):
+    """
+    Talks to one device through the LanLoop shared by all of the lights.
+    Setting a color or power level doesn't wait for the device to respond.
+    """
+    def __init__(self, lan, device: Device):
+        super().__init__(
+            hash(device.mac), device.label, device.group, device.location)
+        self._lan = lan
+        self._device = device
+        self.product_features = device.features
+        self._is_color = device.features.get('color', False)
+
+    def is_color(self):
+        return self._is_color
+
+    def get_record(self) -> dict:
+        device = self._device
+        return {
+            'mac': device.mac,
+            'ip': device.addr[0],
+            'port': device.addr[1],
+            'label': device.label,
+            'group': device.group,
+            'location': device.location,
+            'product': device.product,
+            'features': dict(device.features),
+            'num_zones': device.num_zones,
+            'height': device.height,
+            'width': device.width
+        }
+
+    def _send(self, msg_type, payload=()) -> None:
+        self._lan.send(
+            self._device.addr, self._device.target, msg_type, payload)
+
+    def _request(self, msg_type, response_type, payload=(), is_complete=None):
+        # Returns the payloads of the responses of the expected type.
+        responses = self._lan.run(self._lan.endpoint.request(
+            self._device.addr, self._device.target, msg_type, payload,
+            (response_type,), is_complete))
+        return [message.payload for message, _ in responses
+                if message.msg_type is response_type]
+
+    def _no_response(self, what) -> None:
+        logging.warning('No response to {} from "{}"'.format(what, self._name))
+
+    def _get_color(self):
+        payloads = self._request(
+            MessageType.LIGHT_GET, MessageType.LIGHT_STATE)
+        if len(payloads) == 0:
+            self._no_response('get_color')
+            return _NO_COLOR
+        return list(payloads[0][0:4])
+
+    def _set_color(self, color, duration):
+        color = param_color(color)
+        duration = param_32(duration)
+        self._send(MessageType.LIGHT_SET_COLOR, (0, *color, duration))
+
+    def _get_power(self) -> int:
+        payloads = self._request(
+            MessageType.LIGHT_GET_POWER, MessageType.LIGHT_STATE_POWER)
+        if len(payloads) == 0:
+            self._no_response('get_power')
+            return None
+        return round(payloads[0][0])
+
+    def _set_power(self, power, duration, rapid=True):
+        power = param_16(power)
+        duration = param_32(duration)
+        self._send(MessageType.LIGHT_SET_POWER, (power, duration))
+
+
+class MultizoneLight(Light, light.MultizoneLight):
+    def get_height(self) -> int:
+        return 1
+
+    def get_width(self) -> int:
+        return self._device.num_zones
+
+    def _get_zone_colors(self, first_zone=None, last_zone=None):
+        """
+        Returns the colors of the zones from first_zone up to, but not
+        including, last_zone. By default, that's all of them.
+        """
+        zones = {}
+        def all_received(responses) -> bool:
+            for message, _ in responses:
+                if message.msg_type is MessageType.STATE_MULTI_ZONE:
+                    count, index = message.payload[0:2]
+                    for offset in range(0, 8):
+                        if index + offset < count:
+                            start = 2 + offset * 4
+                            zones[index + offset] = list(
+                                message.payload[start:start + 4])
+            return len(zones) >= self._device.num_zones
+        self._request(
+            MessageType.GET_COLOR_ZONES, MessageType.STATE_MULTI_ZONE,
+            (0, 255), all_received)
+        if len(zones) < self._device.num_zones:
+            self._no_response('get_zone_colors')
+        colors = [zones.get(zone, _NO_COLOR)
+                  for zone in range(0, self._device.num_zones)]
+        return colors[first_zone:last_zone]
+
+    def _set_zone_colors(self, first_zone, last_zone, color, duration) -> None:
+        # The zones go from first_zone up to, but not including, last_zone.
+        color = param_color(color)
+        duration = param_32(duration)
+        self._send(
+            MessageType.SET_COLOR_ZONES,
+            (param_8(first_zone), param_8(last_zone - 1), *color, duration, 1))
+
+
+class MatrixLight(Light, light.MatrixLight):
+    def get_height(self) -> int:
+        return self._device.height
+
+    def get_width(self) -> int:
+        return self._device.width
+
+    def _cell_count(self) -> int:
+        return min(64, self._device.height * self._device.width)
+
+    def _set_matrix(self, matrix, duration=0):
+        if self._cell_count() == 0:
+            logging.error('Data error setting matrix light color.')
+            return False
+        colors = [param_16(value) for color in matrix.get_colors()
+                  for value in color]
+        colors = colors[:256] + [0] * (256 - len(colors))
+        self._send(
+            MessageType.SET_64,
+            (0, 1, 0, 0, 0, param_8(self._device.width), param_32(duration),
+             *colors))
+
+    def _get_matrix(self) -> ColorMatrix:
+        num_cells = self._cell_count()
+        if num_cells == 0:
+            return ColorMatrix(0, 0)
+        payloads = self._request(
+            MessageType.GET_64, MessageType.STATE_64,
+            (0, 1, 0, 0, 0, param_8(self._device.width)))
+        if len(payloads) == 0:
+            self._no_response('get_matrix')
+            return ColorMatrix(0, 0)
+        values = payloads[0][5:]
+        colors = [list(values[i * 4:i * 4 + 4]) for i in range(0, num_cells)]
+        return ColorMatrix.new_from_iterable(
+            self._device.height, self._device.width, colors)
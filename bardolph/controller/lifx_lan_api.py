@@ -33,6 +33,33 @@ class LifxLanApi(i_controller.LightApi):
                     "Expected {} devices, found {}".format(expected, actual))
         return lights
 
+    def restore_lights(self, records):
+        """
+        Build lights from the records in the discovery cache without any
+        network traffic. A record that doesn't make sense is skipped.
+        """
+        lights = []
+        for record in records:
+            try:
+                features = record['features']
+                if features.get('multizone', False):
+                    impl = lifxlan.MultiZoneLight(
+                        record['mac'], record['ip'], port=record['port'])
+                    lights.append(
+                        lifx_lan_light.MultizoneLight(impl, record=record))
+                elif features.get('matrix', False):
+                    impl = lifxlan.Light(
+                        record['mac'], record['ip'], port=record['port'])
+                    lights.append(
+                        lifx_lan_light.MatrixLight(impl, record))
+                else:
+                    impl = lifxlan.Light(
+                        record['mac'], record['ip'], port=record['port'])
+                    lights.append(lifx_lan_light.Light(impl, record))
+            except (AttributeError, KeyError, TypeError, ValueError) as ex:
+                logging.debug('Discovery cache: {}'.format(ex))
+        return lights
+
     def set_color_all_lights(self, color, duration):
         color = param_color(color)
         self._lifxlan.set_color_all_lights(color, param_32(duration), True)
@@ -1,12 +1,15 @@
 import logging
+import time
 
 from bardolph.lib.cache import Cache
 from lifxlan.errors import WorkflowException
 from lifxlan.msgtypes import (GetDeviceChain, GetTileState64, SetTileState64,
                               StateDeviceChain, StateTileState64)
 
-from bardolph.controller import i_controller, light
+from bardolph.controller import light, matrix_delta
 from bardolph.controller.color_matrix import ColorMatrix
+from bardolph.lib import i_lib
+from bardolph.lib.injection import inject
 from bardolph.lib.param_helper import param_16, param_32, param_8, param_color
 from bardolph.lib.retry import tries
 
@@ -26,43 +29,74 @@ _the_cache = _SizeCache()
 
 
 class Light(light.Light):
-    def __init__(self, impl):
-        super().__init__(
-            hash(impl.get_mac_addr()), impl.get_label(), impl.get_group(),
-            impl.get_location())
+    def __init__(self, impl, record=None):
+        # If there's a record from the discovery cache, the light is built
+        # from it without asking the device anything.
+        if record is None:
+            label = impl.get_label()
+            group = impl.get_group()
+            location = impl.get_location()
+            features = impl.get_product_features()
+        else:
+            label = record['label']
+            group = record['group']
+            location = record['location']
+            features = record['features']
+        super().__init__(hash(impl.get_mac_addr()), label, group, location)
         self._impl = impl
-        self.product_features = impl.get_product_features()
+        self.product_features = features
         self._is_color = self.product_features.get('color', False)
 
     def is_color(self):
         return self._is_color
 
+    def get_record(self) -> dict:
+        return {
+            'mac': self._impl.get_mac_addr(),
+            'ip': self._impl.get_ip_addr(),
+            'port': self._impl.port,
+            'label': self.get_name(),
+            'group': self.get_group(),
+            'location': self.get_location(),
+            'features': self.product_features,
+            'num_zones': 0,
+            'height': self.get_height(),
+            'width': self.get_width()
+        }
+
     @tries(_MAX_TRIES, WorkflowException, [-1] * 4)
-    def get_color(self):
+    def _get_color(self):
         return self._impl.get_color()
 
-    @tries(_MAX_TRIES, WorkflowException)
-    def set_color(self, color, duration):
+    @tries(_MAX_TRIES, WorkflowException, False)
+    def _set_color(self, color, duration):
         color = param_color(color)
         duration = param_32(duration)
         self._impl.set_color(color, duration, True)
 
     @tries(_MAX_TRIES, WorkflowException)
-    def get_power(self) -> int:
+    def _get_power(self) -> int:
         return round(self._impl.get_power())
 
-    @tries(_MAX_TRIES, WorkflowException)
-    def set_power(self, power, duration, rapid=True):
+    @tries(_MAX_TRIES, WorkflowException, False)
+    def _set_power(self, power, duration, rapid=True):
         power = param_16(power)
         duration = param_32(duration)
         return self._impl.set_power(power, duration, rapid)
 
 
-class MultizoneLight(Light, i_controller.MultizoneLight):
-    def __init__(self, impl, num_zones=None):
-        super().__init__(impl)
+class MultizoneLight(Light, light.MultizoneLight):
+    def __init__(self, impl, num_zones=None, record=None):
+        super().__init__(impl, record)
+        if record is not None:
+            num_zones = record['num_zones']
         self._num_zones = num_zones or len(self.get_zone_colors())
 
+    def get_record(self) -> dict:
+        record = super().get_record()
+        record['num_zones'] = self._num_zones
+        return record
+
     def get_height(self) -> int:
         return 1
 
@@ -70,19 +104,20 @@ class MultizoneLight(Light, i_controller.MultizoneLight):
         return self._num_zones
 
     @tries(_MAX_TRIES, WorkflowException)
-    def get_zone_colors(self, first_zone=None, last_zone=None):
+    def _get_zone_colors(self, first_zone=None, last_zone=None):
         if first_zone is not None:
             first_zone = param_16(first_zone)
         if last_zone is not None:
             last_zone = param_16(first_zone)
         return self._impl.get_color_zones(first_zone, last_zone)
 
-    @tries(_MAX_TRIES, WorkflowException)
-    def set_zone_colors(self, first_zone, last_zone, color, duration) -> None:
+    @tries(_MAX_TRIES, WorkflowException, False)
+    def _set_zone_colors(self, first_zone, last_zone, color, duration):
         # Unknown why this happens.
         if not hasattr(self._impl, 'set_zone_color'):
             logging.error(
                 'No set_zone_color for light of type', type(self._impl))
+            return False
         else:
             color = param_color(color)
             first_zone = param_16(first_zone)
@@ -91,11 +126,24 @@ class MultizoneLight(Light, i_controller.MultizoneLight):
             self._impl.set_zone_color(first_zone, last_zone, color, duration)
 
 
-class MatrixLight(Light, i_controller.MatrixLight):
-    def __init__(self, impl):
-        super().__init__(impl)
-        self._height = self._width = 0
-        self._get_size()
+class MatrixLight(Light, light.MatrixLight):
+    """
+    Remembers the colors it last sent, so that the next set_matrix() only
+    has to send the parts that have changed, and nothing at all if nothing
+    has. The whole matrix is still sent if that takes no more messages, and
+    at least every matrix_full_frame_time seconds, in case something else
+    has changed the light since then.
+    """
+    def __init__(self, impl, record=None):
+        super().__init__(impl, record)
+        self._sent = None
+        self._sent_time = 0.0
+        if record is not None and record['height'] > 0:
+            self._height = record['height']
+            self._width = record['width']
+        else:
+            self._height = self._width = 0
+            self._get_size()
 
     @tries(_MAX_TRIES, WorkflowException)
     def _get_size(self) -> None:
@@ -129,24 +177,57 @@ class MatrixLight(Light, i_controller.MatrixLight):
             result = False
         return result
 
-    @tries(_MAX_TRIES, WorkflowException)
-    def set_matrix(self, matrix, duration=0) -> None:
-        if self._valid_width_height():
-            payload = {
-                "tile_index": 0,
-                "length": 1,
-                "reserved": 0,
-                "x": 0,
-                "y": 0,
-                "width": param_8(self._width),
-                "height": param_8(self._height),
-                "duration": param_32(duration),
-                "colors": matrix.get_colors()
-            }
-            self._impl.fire_and_forget(SetTileState64, payload, num_repeats=1)
+    def _set_color(self, color, duration):
+        # Every cell changes, and what was sent before no longer applies.
+        self._sent = None
+        return super()._set_color(color, duration)
+
+    @tries(_MAX_TRIES, WorkflowException, False)
+    def _set_matrix(self, matrix, duration=0):
+        if not self._valid_width_height():
+            return False
+        colors = matrix.get_colors()
+        windows = None
+        if (matrix.height, matrix.width) == (self._height, self._width):
+            windows = self._changed_windows(colors)
+        is_full_frame = windows is None
+        if is_full_frame:
+            windows = matrix_delta.full_frame(self._height, self._width)
+        self._sent = None
+        for window in windows:
+            self._send_window(window, colors, duration)
+        if len(colors) == self._height * self._width:
+            self._sent = colors
+            if is_full_frame:
+                self._sent_time = time.monotonic()
+        return True
+
+    @inject(i_lib.Settings)
+    def _changed_windows(self, colors, settings):
+        # None means the whole matrix should be sent.
+        full_frame_time = float(
+            settings.get_value('matrix_full_frame_time', 10.0))
+        if (self._sent is None or len(self._sent) != len(colors)
+                or time.monotonic() - self._sent_time > full_frame_time):
+            return None
+        return matrix_delta.changed_rects(
+            self._sent, colors, self._height, self._width)
+
+    def _send_window(self, window, colors, duration) -> None:
+        payload = {
+            "tile_index": 0,
+            "length": 1,
+            "reserved": 0,
+            "x": param_8(window.left),
+            "y": param_8(window.top),
+            "width": param_8(window.right - window.left + 1),
+            "duration": param_32(duration),
+            "colors": matrix_delta.window_colors(colors, self._width, window)
+        }
+        self._impl.fire_and_forget(SetTileState64, payload, num_repeats=1)
 
     @tries(_MAX_TRIES, WorkflowException)
-    def get_matrix(self) -> ColorMatrix:
+    def _get_matrix(self) -> ColorMatrix:
         if not self._valid_width_height():
             return ColorMatrix(0, 0)
         payload = {
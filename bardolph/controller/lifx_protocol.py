@@ -0,0 +1,192 @@
+"""
+Encoding and decoding of LIFX LAN protocol packets.
+
+Every packet starts with a 36-byte header, followed by a payload whose
+layout depends on the type of the message. Payloads are handled as flat
+tuples of numbers and byte strings, in the order the fields appear on the
+wire.
+"""
+
+import struct
+from enum import IntEnum
+
+PORT = 56700
+BROADCAST_TARGET = bytes(8)
+HEADER_SIZE = 36
+SERVICE_UDP = 1
+
+_PROTOCOL = 1024
+_ADDRESSABLE = 0x1000
+_TAGGED = 0x2000
+_RES_REQUIRED = 0x01
+_ACK_REQUIRED = 0x02
+
+_HEADER = struct.Struct('<HHI8s6sBB8sHH')
+
+
+class MessageType(IntEnum):
+    GET_SERVICE = 2
+    STATE_SERVICE = 3
+    GET_POWER = 20
+    SET_POWER = 21
+    STATE_POWER = 22
+    GET_LABEL = 23
+    STATE_LABEL = 25
+    GET_VERSION = 32
+    STATE_VERSION = 33
+    ACKNOWLEDGEMENT = 45
+    GET_LOCATION = 48
+    STATE_LOCATION = 50
+    GET_GROUP = 51
+    STATE_GROUP = 53
+    LIGHT_GET = 101
+    LIGHT_SET_COLOR = 102
+    LIGHT_STATE = 107
+    LIGHT_GET_POWER = 116
+    LIGHT_SET_POWER = 117
+    LIGHT_STATE_POWER = 118
+    STATE_UNHANDLED = 223
+    SET_COLOR_ZONES = 501
+    GET_COLOR_ZONES = 502
+    STATE_ZONE = 503
+    STATE_MULTI_ZONE = 506
+    GET_DEVICE_CHAIN = 701
+    STATE_DEVICE_CHAIN = 702
+    GET_64 = 707
+    STATE_64 = 711
+    SET_64 = 715
+
+
+# Fields of one tile in StateDeviceChain: accelerometer x, y, z, reserved,
+# user x, user y, width, height, reserved, vendor, product, reserved,
+# firmware build, reserved, firmware minor, firmware major, reserved.
+_TILE = 'hhhhffBBBIIIQQHHI'
+TILE_FIELDS = len(_TILE)
+TILE_WIDTH = 6
+TILE_HEIGHT = 7
+MAX_TILES = 16
+
+_PAYLOADS = {
+    MessageType.STATE_SERVICE: struct.Struct('<BI'),
+    MessageType.SET_POWER: struct.Struct('<H'),
+    MessageType.STATE_POWER: struct.Struct('<H'),
+    MessageType.STATE_LABEL: struct.Struct('<32s'),
+    MessageType.STATE_VERSION: struct.Struct('<III'),
+    MessageType.STATE_LOCATION: struct.Struct('<16s32sQ'),
+    MessageType.STATE_GROUP: struct.Struct('<16s32sQ'),
+    MessageType.LIGHT_SET_COLOR: struct.Struct('<B4HI'),
+    MessageType.LIGHT_STATE: struct.Struct('<4HhH32sQ'),
+    MessageType.LIGHT_SET_POWER: struct.Struct('<HI'),
+    MessageType.LIGHT_STATE_POWER: struct.Struct('<H'),
+    MessageType.STATE_UNHANDLED: struct.Struct('<H'),
+    MessageType.SET_COLOR_ZONES: struct.Struct('<BB4HIB'),
+    MessageType.GET_COLOR_ZONES: struct.Struct('<BB'),
+    MessageType.STATE_ZONE: struct.Struct('<BB4H'),
+    MessageType.STATE_MULTI_ZONE: struct.Struct('<BB32H'),
+    MessageType.STATE_DEVICE_CHAIN: struct.Struct(
+        '<B' + _TILE * MAX_TILES + 'B'),
+    MessageType.GET_64: struct.Struct('<6B'),
+    MessageType.STATE_64: struct.Struct('<5B256H'),
+    MessageType.SET_64: struct.Struct('<6BI256H')
+}
+
+
+class ProtocolException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class Message:
+    __slots__ = ('msg_type', 'target', 'source', 'sequence', 'tagged',
+                 'ack_required', 'res_required', 'payload')
+
+    def __init__(self, msg_type, target=BROADCAST_TARGET, source=0,
+                 sequence=0, payload=(), tagged=False, ack_required=False,
+                 res_required=False):
+        self.msg_type = msg_type
+        self.target = target
+        self.source = source
+        self.sequence = sequence
+        self.payload = tuple(payload)
+        self.tagged = tagged
+        self.ack_required = ack_required
+        self.res_required = res_required
+
+    def __repr__(self):
+        return 'Message({}, {}, seq={})'.format(
+            self.msg_type, mac_text(self.target), self.sequence)
+
+
+def encode(message: Message) -> bytes:
+    payload_struct = _PAYLOADS.get(message.msg_type)
+    if payload_struct is None:
+        if len(message.payload) > 0:
+            raise ProtocolException(
+                'No payload for {}'.format(message.msg_type))
+        payload = b''
+    else:
+        try:
+            payload = payload_struct.pack(*message.payload)
+        except struct.error as ex:
+            raise ProtocolException(
+                '{}: {}'.format(message.msg_type, ex)) from ex
+
+    protocol = _PROTOCOL | _ADDRESSABLE
+    if message.tagged:
+        protocol |= _TAGGED
+    flags = 0
+    if message.res_required:
+        flags |= _RES_REQUIRED
+    if message.ack_required:
+        flags |= _ACK_REQUIRED
+    header = _HEADER.pack(
+        HEADER_SIZE + len(payload), protocol, message.source,
+        message.target, bytes(6), flags, message.sequence & 0xff, bytes(8),
+        message.msg_type, 0)
+    return header + payload
+
+
+def decode(data: bytes):
+    """
+    Return the Message contained in data, or None if it isn't a valid
+    packet of a known type.
+    """
+    if len(data) < HEADER_SIZE:
+        return None
+    (size, protocol, source, target, _, flags, sequence, _, msg_type,
+        _) = _HEADER.unpack_from(data)
+    if size != len(data) or protocol & 0xfff != _PROTOCOL:
+        return None
+    try:
+        msg_type = MessageType(msg_type)
+    except ValueError:
+        return None
+
+    payload_struct = _PAYLOADS.get(msg_type)
+    if payload_struct is None:
+        payload = ()
+    elif payload_struct.size != size - HEADER_SIZE:
+        return None
+    else:
+        payload = payload_struct.unpack_from(data, HEADER_SIZE)
+    return Message(
+        msg_type, target, source, sequence, payload,
+        bool(protocol & _TAGGED), bool(flags & _ACK_REQUIRED),
+        bool(flags & _RES_REQUIRED))
+
+
+def label_bytes(text: str, size=32) -> bytes:
+    return text.encode('utf-8')[:size].ljust(size, b'\0')
+
+
+def label_text(data: bytes) -> str:
+    return data.split(b'\0', 1)[0].decode('utf-8', errors='replace')
+
+
+def mac_text(target: bytes) -> str:
+    return ':'.join('{:02x}'.format(octet) for octet in target[:6])
+
+
+def mac_target(text: str) -> bytes:
+    return bytes(int(octet, 16) for octet in text.split(':')) + bytes(2)
@@ -2,24 +2,39 @@ import logging
 import time
 
 from bardolph.controller import i_controller
+from bardolph.controller.color_matrix import ColorMatrix
+from bardolph.controller.shadow_state import (COLOR, MATRIX, POWER,
+                                              ShadowState, ZONES)
+from bardolph.lib.param_helper import param_16, param_color
 
 _MAX_TRIES = 3
 
 
 class Light(i_controller.Light):
+    """
+    Base class for lights that talk to a real device. The public get and set
+    methods go through a ShadowState, which can answer a get without asking
+    the device, or drop a set that wouldn't change anything. The
+    communication itself is done by the underscored methods, which
+    subclasses override.
+
+    An underscored set method returns False if the light didn't get the
+    new state, in which case the shadow forgets what it knew, rather than
+    remembering a state that the light doesn't have.
+    """
     def __init__(self, uid=None, name=None, group=None, location=None):
         self._uid = uid or hash(self)
         self._name = name
         self._group = group
         self._location = location
         self._birth = time.time()
+        self._shadow = ShadowState()
 
     def __repr__(self):
-        fmt = 'Light(_name="{}", _group="{}", _location="{}", _multizone={}, '
+        fmt = 'Light(_name="{}", _group="{}", _location="{}", '
         fmt += ' _birth={})'
         rep = fmt.format(
-            self._name, self._group, self._location, self._multizone,
-            self._birth)
+            self._name, self._group, self._location, self._birth)
         return rep
 
     def get_uid(self):
@@ -45,15 +60,109 @@ class Light(i_controller.Light):
         return time.time() - self._birth
 
     def get_color(self):
+        return self._shadow.get(COLOR, self._get_color)
+
+    def set_color(self, color, duration):
+        color = param_color(color)
+        if not self._shadow.matches(COLOR, color):
+            if self._set_color(color, duration) is False:
+                self._shadow.invalidate(COLOR, ZONES, MATRIX)
+                return
+            self._shadow.put(COLOR, color)
+            self._shadow.invalidate(ZONES, MATRIX)
+
+    def get_power(self):
+        return self._shadow.get(POWER, self._get_power)
+
+    def set_power(self, power, duration, rapid=True):
+        power = param_16(power)
+        if not self._shadow.matches(POWER, power):
+            if self._set_power(power, duration, rapid) is False:
+                self._shadow.invalidate(POWER)
+                return
+            self._shadow.put(POWER, power)
+
+    def _get_color(self):
         logging.warning("controller.Light: get_color() not implemented.")
         return None
 
-    def set_color(self, *_):
+    def _set_color(self, *_):
         logging.warning("controller.Light: set_color() not implemented.")
 
-    def get_power(self):
+    def _get_power(self):
         logging.warning("controller.Light: get_power() not implemented.")
         return None
 
-    def set_power(self, *_):
+    def _set_power(self, *_):
         logging.warning("controller.Light: set_power() not implemented.")
+
+
+class MultizoneLight(Light, i_controller.MultizoneLight):
+    def get_zone_colors(self, first_zone=None, last_zone=None):
+        """
+        Returns the colors of the zones from first_zone up to, but not
+        including, last_zone. By default, that's all of them.
+        """
+        zones = self._shadow.get(
+            ZONES, lambda: self._get_zone_colors(None, None))
+        if zones is None:
+            return None
+        return zones[first_zone:last_zone]
+
+    def set_zone_colors(self, first_zone, last_zone, color, duration) -> None:
+        color = param_color(color)
+        num_zones = max(0, last_zone - first_zone)
+        zones = self._shadow.peek(ZONES)
+        if zones is not None and self._shadow.matches(
+                ZONES, zones[:first_zone] + [color] * num_zones
+                + zones[last_zone:]):
+            return
+        if self._set_zone_colors(
+                first_zone, last_zone, color, duration) is False:
+            self._shadow.invalidate(ZONES, COLOR)
+            return
+        if zones is not None and last_zone <= len(zones):
+            zones[first_zone:last_zone] = [color] * num_zones
+            self._shadow.put(ZONES, zones)
+        else:
+            self._shadow.invalidate(ZONES)
+        self._shadow.invalidate(COLOR)
+
+    def _get_zone_colors(self, first_zone, last_zone):
+        logging.warning(
+            "controller.Light: get_zone_colors() not implemented.")
+        return None
+
+    def _set_zone_colors(self, *_):
+        logging.warning(
+            "controller.Light: set_zone_colors() not implemented.")
+
+
+class MatrixLight(Light, i_controller.MatrixLight):
+    def get_matrix(self) -> ColorMatrix:
+        def fetch():
+            matrix = self._get_matrix()
+            if matrix is None:
+                return None
+            return (matrix.height, matrix.width, matrix.get_colors())
+
+        value = self._shadow.get(MATRIX, fetch)
+        if value is None:
+            return ColorMatrix(0, 0)
+        return ColorMatrix.new_from_iterable(*value)
+
+    def set_matrix(self, matrix, duration=0) -> None:
+        value = (matrix.height, matrix.width, matrix.get_colors())
+        if not self._shadow.matches(MATRIX, value):
+            if self._set_matrix(matrix, duration) is False:
+                self._shadow.invalidate(MATRIX, COLOR)
+                return
+            self._shadow.put(MATRIX, value)
+            self._shadow.invalidate(COLOR)
+
+    def _get_matrix(self):
+        logging.warning("controller.Light: get_matrix() not implemented.")
+        return None
+
+    def _set_matrix(self, *_):
+        logging.warning("controller.Light: set_matrix() not implemented.")
@@ -0,0 +1,86 @@
+import concurrent.futures
+import logging
+import threading
+
+from bardolph.lib import i_lib
+from bardolph.lib.injection import inject
+
+
+class LightDispatch:
+    """
+    Sends the same command to a number of lights at once. Each light gets its
+    own task in a thread pool, so a light that is slow to respond, or has to
+    be retried, holds up only itself.
+
+    dispatch() waits until every light has finished or the deadline has
+    passed, whichever comes first. A light that is still busy at the deadline
+    is reported as late and left to finish in the background.
+
+    The deadline and the number of threads come from the dispatch_deadline
+    and dispatch_threads settings.
+    """
+    def __init__(self, max_workers=None, deadline=None):
+        self._max_workers = max_workers
+        self._deadline = deadline
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @inject(i_lib.Settings)
+    def _get_pool(self, settings):
+        # Created the first time it's needed, by only one thread.
+        with self._pool_lock:
+            if self._pool is None:
+                if self._max_workers is None:
+                    self._max_workers = int(
+                        settings.get_value('dispatch_threads', 16))
+                if self._deadline is None:
+                    self._deadline = float(
+                        settings.get_value('dispatch_deadline', 2.0))
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    self._max_workers, 'dispatch')
+            return self._pool
+
+    def dispatch(self, lights, fn) -> list:
+        """
+        Call fn(light) for every light in lights. Returns the names of the
+        lights for which fn raised an exception or didn't finish before the
+        deadline. Those are also logged.
+        """
+        if len(lights) == 0:
+            return []
+        if len(lights) == 1:
+            return self._call_one(lights[0], fn)
+
+        pool = self._get_pool()
+        futures = {pool.submit(fn, light): light for light in lights}
+        done, late = concurrent.futures.wait(futures, self._deadline)
+
+        failed = []
+        for future in done:
+            ex = future.exception()
+            if ex is not None:
+                failed.append(self._report(futures[future], ex))
+        for future in late:
+            failed.append(self._report(
+                futures[future],
+                'not finished after {} s.'.format(self._deadline)))
+        return failed
+
+    def _call_one(self, light, fn) -> list:
+        try:
+            fn(light)
+        except Exception as ex:
+            return [self._report(light, ex)]
+        return []
+
+    @staticmethod
+    def _report(light, problem) -> str:
+        name = light.get_name()
+        logging.warning('Light "{}": {}'.format(name, problem))
+        return name
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
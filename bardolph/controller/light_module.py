@@ -14,6 +14,9 @@ def configure():
     if settings.get_value('use_fakes'):
         from bardolph.fakes import fake_light_api
         fake_light_api.configure()
+    elif settings.get_value('use_async_lan'):
+        from bardolph.controller import lifx_async_api
+        lifx_async_api.configure()
     else:
         from bardolph.controller import lifx_lan_api
         lifx_lan_api.configure()
@@ -3,6 +3,10 @@ import threading
 import time
 
 from bardolph.controller import i_controller
+from bardolph.controller.command_queue import CommandQueue
+from bardolph.controller.discovery_cache import DiscoveryCache
+from bardolph.controller.light_dispatch import LightDispatch
+from bardolph.controller.light_set_state import LightSetState, StateBuilder
 from bardolph.lib.color import rounded_color
 from bardolph.lib import i_lib
 from bardolph.lib.injection import bind_instance, inject, provide
@@ -12,129 +16,214 @@ from bardolph.lib.sorted_list import SortedList
 
 class LightSet(i_controller.LightSet):
     """
-    All lights (inistances of i_controller.Light) are stored in _light_dict,
-    keyed on the light's name.
-
-    Locations and groups are stored in _location_dict (key is location name)
-    and _group_dict (key is group name). Each value in the location or group
-    dict is a list of strings containing light names.
+    The lights (instances of i_controller.Light), groups, and locations are
+    published as a LightSetState, which is never changed once it's
+    published. Discovery and garbage collection build a new state from the
+    current one with a StateBuilder, and then replace _state with it in a
+    single assignment. A reader therefore needs no lock; whatever state it
+    gets is consistent, even if a refresh happens while it's being used.
+    Writers are serialized by _write_lock.
+
+    _group_of and _location_of map the name of a light to the name of its
+    group or location. Refreshing a light whose memberships haven't changed
+    is therefore just a lookup. Similarly, _name_of maps each light's uid to
+    its name. These are used only by writers.
     """
-    def __init__(self):
-        self._lights = {}
-        self._light_names = SortedList()
-        self._groups = {}
-        self._locations = {}
+    def __init__(self, discovery_cache=None):
+        self._state = LightSetState()
+        self._write_lock = threading.Lock()
+        self._group_of = {}
+        self._location_of = {}
+        self._name_of = {}
         self._num_successful_discovers = 0
         self._num_failed_discovers = 0
+        self._dispatch = LightDispatch()
+        self._queue = CommandQueue()
+        self._discovery_cache = discovery_cache
 
     @inject(i_controller.LightApi)
     def discover(self, light_api):
         try:
-            for light in light_api.get_lights():
-                light_name = light.get_name()
-                self._light_names.add(light_name)
-                self._lights[light_name] = light
-                LightSet._update_memberships(
-                    light, light.get_group(), self._groups)
-                LightSet._update_memberships(
-                    light, light.get_location(), self._locations)
+            lights = light_api.get_lights()
         except i_controller.LightException as ex:
             self._num_failed_discovers += 1
             logging.warning("In discover():\n{}".format(ex))
             return False
 
+        with self._write_lock:
+            builder = StateBuilder(self._state)
+            for light in lights:
+                self._add_light(builder, light)
+            self._publish(builder)
         self._num_successful_discovers += 1
         logging.debug('discover. successes: {}, fails: {}'
                       .format(self._num_successful_discovers,
                               self._num_failed_discovers))
+        self._save_discovery()
+        return True
+
+    @inject(i_controller.LightApi)
+    def restore(self, light_api) -> bool:
+        """
+        Populate the set from the discovery cache, without any network
+        traffic. Returns False if there was nothing to restore, in which case
+        discover() has to be done the slow way.
+
+        The restored lights are only as good as the last discovery. A
+        subsequent discover() replaces them with what's really out there,
+        and lights that are gone are eventually garbage collected.
+        """
+        if self._discovery_cache is None:
+            return False
+        lights = light_api.restore_lights(self._discovery_cache.load())
+        if not lights:
+            return False
+        with self._write_lock:
+            builder = StateBuilder(self._state)
+            for light in lights:
+                self._add_light(builder, light)
+            self._publish(builder)
+        logging.debug('restored {} lights from {}'.format(
+            len(lights), self._discovery_cache.path))
         return True
 
+    def _publish(self, builder) -> None:
+        # Called with _write_lock held.
+        self._state = builder.build()
+        for light in builder.removed:
+            self._queue.forget(light)
+
+    def _add_light(self, builder, light) -> None:
+        light_name = light.get_name()
+        old_name = self._name_of.get(light.get_uid())
+        if old_name is not None and old_name != light_name:
+            # The same device under a different name has been renamed.
+            self._remove_light(builder, old_name)
+        builder.put_light(light_name, light)
+        self._name_of[light.get_uid()] = light_name
+        self._update_memberships(
+            light_name, light.get_group(), builder.groups, self._group_of)
+        self._update_memberships(
+            light_name, light.get_location(), builder.locations,
+            self._location_of)
+
+    def _remove_light(self, builder, light_name) -> None:
+        light = builder.lights[light_name]
+        self._remove_memberships(light_name, builder.groups, self._group_of)
+        self._remove_memberships(
+            light_name, builder.locations, self._location_of)
+        builder.remove_light(light_name)
+        if self._name_of.get(light.get_uid()) == light_name:
+            del self._name_of[light.get_uid()]
+
+    def _save_discovery(self) -> None:
+        if self._discovery_cache is None:
+            return
+        records = [light.get_record() for light in self.get_lights()]
+        if len(records) > 0 and None not in records:
+            self._discovery_cache.save(records)
+
     def refresh(self):
         self.discover()
         self._garbage_collect()
 
     @staticmethod
-    def _update_memberships(light, name, target_dict):
+    def _update_memberships(light_name, set_name, member_sets, index):
         """
-        Update the group and location dictionaries with a light's current group
-        and location.
+        Make the light a member of the named group or location, and of no
+        other group or location in member_sets.
 
-        light : i_controller.Light
-            The light to be updated in the group and location dictionaries.
-        name : str
+        light_name : str
+            The name of the light being updated.
+        set_name : str
             The name of the group or location the light belongs to.
-        target_dict : dict
-            The dictionary, either groups or locations, that is to hold a
-            reference to the light.
+        member_sets : MemberSets
+            Either the groups or the locations of the state being built.
+        index : dict
+            The reverse of member_sets, mapping each light name to the
+            group or location it's in. If that's already set_name, there's
+            nothing to do.
         """
-        LightSet._remove_memberships(light, target_dict)
-        if name not in target_dict:
-            target_dict[name] = SortedList(light.get_name())
-        else:
-            target_dict[name].add(light.get_name())
+        old_name = index.get(light_name)
+        if old_name == set_name:
+            return
+        if old_name is not None:
+            LightSet._remove_memberships(light_name, member_sets, index)
+        member_sets.for_write(set_name).add(light_name)
+        index[light_name] = set_name
 
     @staticmethod
-    def _remove_memberships(light, target_dict):
-        # Remove the light from from the set_dict (groups or locations) that
-        # it belongs to.
-        to_be_deleted = []
-
-        # From each group or location within the dict, remove the light.
-        # Delete the group or location if it gets down to zero members.
-        for list_name, light_list in target_dict.items():
-            light_list.remove(light.get_name())
-            if len(light_list) == 0:
-                to_be_deleted.append(list_name)
-        for list_name in to_be_deleted:
-            del target_dict[list_name]
+    def _remove_memberships(light_name, member_sets, index):
+        # Remove the light from the group or location it belongs to, and
+        # delete that group or location if it's now empty.
+        set_name = index.pop(light_name, None)
+        if member_sets.get(set_name) is not None:
+            members = member_sets.for_write(set_name)
+            members.remove(light_name)
+            if len(members) == 0:
+                member_sets.discard(set_name)
 
     @inject(i_lib.Settings)
     def _garbage_collect(self, settings):
         # Get rid of a light's proxy if it hasn't responded for a while.
         logging.debug("garbage collect, currently have {} lights"
-                      .format(len(self._lights)))
+                      .format(self.get_light_count()))
         max_age = int(settings.get_value('light_gc_time', 20 * 60))
-        target_lights = []
-        for light in self._lights.values():
-            if light.get_age() > max_age:
-                LightSet._remove_memberships(light, self._groups)
-                LightSet._remove_memberships(light, self._locations)
-                target_lights.append(light.get_name())
-        for light_name in target_lights:
-            logging.debug("_garbage_collect() deleting {}".format(light_name))
-            self._light_names.remove(light_name)
-            self._lights[light_name] = None
-            del self._lights[light_name]
+        with self._write_lock:
+            builder = StateBuilder(self._state)
+            target_lights = [
+                light.get_name() for light in builder.lights.values()
+                if light.get_age() > max_age
+            ]
+            for light_name in target_lights:
+                logging.debug(
+                    "_garbage_collect() deleting {}".format(light_name))
+                self._remove_light(builder, light_name)
+            self._publish(builder)
+
+    def get_state(self) -> LightSetState:
+        """
+        The current, immutable state of the set. To see a consistent set of
+        lights over a number of calls, get the state once and use it for
+        all of them.
+        """
+        return self._state
+
+    def get_version(self) -> int:
+        """
+        Goes up every time a light, group, or location changes.
+        """
+        return self._state.version
 
     def get_lights(self):
-        return list(self._lights.values())
+        return self._state.get_lights()
 
     def get_light_count(self) -> int:
-        return len(self._lights)
+        return self._state.get_light_count()
 
     def get_light_names(self) -> SortedList:
         """ SortedList of strings """
-        return self._light_names
+        return self._state.get_light_names()
 
     def get_light(self, light_name):
         """ instance of i_controller.Light or None """
-        return self._lights.get(light_name)
+        return self._state.get_light(light_name)
 
     def get_group_names(self) -> SortedList:
         """ list of strings """
-        return SortedList(self._groups.keys())
+        return self._state.get_group_names()
 
     def get_group_lights(self, group_name):
         """ list of light names or None """
-        return self._groups.get(group_name)
+        return self._state.get_group_lights(group_name)
 
     def get_location_names(self) -> SortedList:
         """ list of strings, each containing a location name """
-        return SortedList(self._locations.keys())
+        return self._state.get_location_names()
 
     def get_location_lights(self, loc_name):
         """ list of light names or None """
-        return self._locations.get(loc_name)
+        return self._state.get_location_lights(loc_name)
 
     @inject(i_controller.LightApi)
     def set_color_all_lights(self, color, duration, light_api):
@@ -150,6 +239,64 @@ class LightSet(i_controller.LightSet):
         light_api.set_power_all_lights(power_level, duration)
         return True
 
+    def set_color_lights(self, light_names, color, duration) -> list:
+        """
+        Send the color to all of the named lights at the same time. Returns
+        the names of the lights that failed or didn't finish in time.
+
+        The command goes through the queue, which drops it if a newer color
+        for the same light comes along before it can be sent.
+        """
+        return self._dispatch.dispatch(
+            self._get_lights(light_names),
+            lambda light: self._queue.submit(
+                light, 'color',
+                lambda target: target.set_color(color, duration)))
+
+    def set_power_lights(self, light_names, power_level, duration) -> list:
+        """
+        Like set_color_lights(), for the power level.
+        """
+        return self._dispatch.dispatch(
+            self._get_lights(light_names),
+            lambda light: self._queue.submit(
+                light, 'power',
+                lambda target: target.set_power(power_level, duration)))
+
+    def set_light_zone_colors(
+            self, light, first_zone, last_zone, color, duration) -> None:
+        """
+        Set the color of some of the zones of a multizone light. This goes
+        through the same queue as the light's other colors, so that it's
+        sent in the order it was made. A zone command is dropped only if a
+        newer one for the same zones comes along before it can be sent.
+        """
+        self._queue.submit(
+            light, ('zones', first_zone, last_zone),
+            lambda target: target.set_zone_colors(
+                first_zone, last_zone, color, duration))
+
+    def set_light_matrix(self, light, matrix, duration) -> None:
+        """
+        Set all the colors of a matrix light, through the same queue as the
+        light's other colors. matrix must not be changed afterwards.
+        """
+        self._queue.submit(
+            light, 'matrix',
+            lambda target: target.set_matrix(matrix, duration))
+
+    def get_queue_counters(self) -> dict:
+        """
+        Counts of the commands that were submitted, sent, and coalesced by
+        the queue in front of the lights.
+        """
+        return self._queue.get_counters()
+
+    def _get_lights(self, light_names) -> list:
+        state = self._state
+        lights = [state.get_light(name) for name in light_names]
+        return [light for light in lights if light is not None]
+
     def get_successful_discovers(self):
         return self._num_successful_discovers
 
@@ -163,6 +310,23 @@ def _start_light_refresh():
         target=_light_refresh, name='discovery', daemon=True).start()
 
 
+def _start_validation(light_set, keep_refreshing):
+    # Check the lights restored from the cache against the real ones.
+    logging.debug("Starting validation thread.")
+    threading.Thread(
+        target=_validate, args=(light_set, keep_refreshing),
+        name='discovery', daemon=True).start()
+
+
+def _validate(light_set, keep_refreshing):
+    try:
+        light_set.discover()
+    except i_controller.LightException as ex:
+        logging.warning("Error during discovery {}".format(ex))
+    if keep_refreshing:
+        _light_refresh()
+
+
 def _light_refresh():
     settings = provide(i_lib.Settings)
     success_sleep_time = float(
@@ -183,9 +347,17 @@ def _light_refresh():
 
 @inject(i_lib.Settings)
 def configure(settings):
-    light_set = LightSet()
-    light_set.discover()
-    if not bool(settings.get_value('single_light_discover', False)):
-        _start_light_refresh()
+    discovery_cache = None
+    if bool(settings.get_value('use_discovery_cache', False)):
+        discovery_cache = DiscoveryCache.from_settings()
+    light_set = LightSet(discovery_cache)
+    keep_refreshing = not bool(
+        settings.get_value('single_light_discover', False))
+    if light_set.restore():
+        _start_validation(light_set, keep_refreshing)
+    else:
+        light_set.discover()
+        if keep_refreshing:
+            _start_light_refresh()
 
     bind_instance(light_set).to(i_controller.LightSet)
@@ -0,0 +1,179 @@
+from types import MappingProxyType
+
+from bardolph.lib.sorted_list import SortedList
+
+
+class LightSetState:
+    """
+    An immutable view of all the lights, groups, and locations, as of one
+    version of a LightSet. Whenever anything changes, the LightSet publishes
+    a new LightSetState with a higher version number, so a reader that holds
+    on to one always sees a consistent set of lights, no matter what
+    discovery is doing in the meantime. No locking is needed to read it.
+
+    The SortedList objects handed out by the getters are shared by every
+    reader, and must not be modified.
+    """
+    __slots__ = ('_lights', '_light_names', '_groups', '_group_names',
+                 '_locations', '_location_names', '_version')
+
+    def __init__(self, lights=None, light_names=None, groups=None,
+                 group_names=None, locations=None, location_names=None,
+                 version=0):
+        groups = groups or {}
+        locations = locations or {}
+        if group_names is None:
+            group_names = SortedList(groups.keys())
+        if location_names is None:
+            location_names = SortedList(locations.keys())
+        for name, value in (
+                ('_lights', MappingProxyType(lights or {})),
+                ('_light_names', light_names or SortedList()),
+                ('_groups', MappingProxyType(groups)),
+                ('_group_names', group_names),
+                ('_locations', MappingProxyType(locations)),
+                ('_location_names', location_names),
+                ('_version', version)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('LightSetState is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('LightSetState is immutable')
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get_lights(self):
+        return list(self._lights.values())
+
+    def get_light_count(self) -> int:
+        return len(self._lights)
+
+    def get_light_names(self) -> SortedList:
+        """ SortedList of strings """
+        return self._light_names
+
+    def get_light(self, light_name):
+        """ instance of i_controller.Light or None """
+        return self._lights.get(light_name)
+
+    def get_group_names(self) -> SortedList:
+        """ list of strings """
+        return self._group_names
+
+    def get_group_lights(self, group_name):
+        """ list of light names or None """
+        return self._groups.get(group_name)
+
+    def get_location_names(self) -> SortedList:
+        """ list of strings, each containing a location name """
+        return self._location_names
+
+    def get_location_lights(self, loc_name):
+        """ list of light names or None """
+        return self._locations.get(loc_name)
+
+
+class MemberSets:
+    """
+    The groups or the locations of a LightSetState that is being built.
+    Each SortedList of members is copied the first time it's changed, so the
+    lists in the state being replaced are left untouched.
+    """
+    def __init__(self, sets, names):
+        self._sets = dict(sets)
+        self._names = names
+        self._copied = set()
+        self._names_changed = False
+
+    def get(self, set_name):
+        return self._sets.get(set_name)
+
+    def names(self):
+        return self._sets.keys()
+
+    def for_write(self, set_name) -> SortedList:
+        # The members of the set, which can be changed. Creates the set if
+        # it doesn't exist.
+        if set_name not in self._copied:
+            members = self._sets.get(set_name)
+            if members is None:
+                members = SortedList()
+                self._names_changed = True
+            else:
+                members = SortedList(members)
+            self._sets[set_name] = members
+            self._copied.add(set_name)
+        return self._sets[set_name]
+
+    def discard(self, set_name) -> None:
+        if self._sets.pop(set_name, None) is not None:
+            self._copied.discard(set_name)
+            self._names_changed = True
+
+    def build(self):
+        # Returns (sets, names) for the new LightSetState.
+        if self._names_changed:
+            return self._sets, SortedList(self._sets.keys())
+        return self._sets, self._names
+
+    @property
+    def changed(self) -> bool:
+        return len(self._copied) > 0 or self._names_changed
+
+
+class StateBuilder:
+    """
+    Accumulates the changes to a LightSetState and produces a new one. The
+    state it starts from is not affected.
+    """
+    def __init__(self, state: LightSetState):
+        self._state = state
+        self.lights = dict(state._lights)
+        self.groups = MemberSets(state._groups, state._group_names)
+        self.locations = MemberSets(state._locations, state._location_names)
+        self.removed = []
+        self._light_names = state._light_names
+        self._lights_changed = False
+        self._names_copied = False
+
+    def put_light(self, light_name, light) -> None:
+        if self.lights.get(light_name) is light:
+            return
+        if light_name not in self.lights:
+            self._names_for_write().add(light_name)
+        self.lights[light_name] = light
+        self._lights_changed = True
+
+    def remove_light(self, light_name) -> None:
+        light = self.lights.pop(light_name, None)
+        if light is not None:
+            self._names_for_write().remove(light_name)
+            self.removed.append(light)
+            self._lights_changed = True
+
+    def _names_for_write(self) -> SortedList:
+        if not self._names_copied:
+            self._light_names = SortedList(self._light_names)
+            self._names_copied = True
+        return self._light_names
+
+    @property
+    def changed(self) -> bool:
+        return (self._lights_changed or self.groups.changed
+                or self.locations.changed)
+
+    def build(self) -> LightSetState:
+        """
+        Returns the new state, or the original one if nothing has changed.
+        """
+        if not self.changed:
+            return self._state
+        groups, group_names = self.groups.build()
+        locations, location_names = self.locations.build()
+        return LightSetState(
+            self.lights, self._light_names, groups, group_names, locations,
+            location_names, self._state.version + 1)
@@ -8,31 +8,54 @@ from bardolph.controller import arg_helper, config_values
 from bardolph.lib import injection, settings
 from bardolph.parser.parse import Parser
 from bardolph.runtime import runtime_module
+from bardolph.vm.loader import Loader
+from bardolph.vm.native_gen import NativeGen
+from bardolph.vm.program import Program
 
 
-def program_code(instructions):
+def program_code(instructions, native=False):
     output = ''
     dot = os.path.dirname(os.path.realpath(__file__))
-    with open(os.path.join(dot, 'lsc_template.py')) as srce:
+    if native:
+        template, marker = 'lsc_native_template.py', '#blocks'
+    else:
+        template, marker = 'lsc_template.py', '#instructions'
+    with open(os.path.join(dot, template)) as srce:
         for line in srce:
-            if line.find('#instructions') > -1:
+            if line.find(marker) > -1:
                 output += instructions
             else:
                 output += line
     return output
 
-def instruction_text(file_name):
+def _parse_file(file_name):
     parser = Parser()
     if not parser.parse_file(file_name):
         print("Error compiling {}".format(file_name))
         print(parser.get_errors())
         return None
+    return parser.get_program()
+
+def instruction_text(file_name):
+    program = _parse_file(file_name)
+    if program is None:
+        return None
 
-    program = parser.get_program()
     text = '    '
     text += ',\n    '.join(map(lambda inst: inst.as_list_text(), program))
     return text
 
+def native_text(program):
+    if not isinstance(program, Program):
+        program = Loader().load(program)
+    return NativeGen().generate(program)
+
+def native_file_text(file_name):
+    program = _parse_file(file_name)
+    if program is None:
+        return None
+    return native_text(program)
+
 def output_python(output_text, output_name=None):
     if output_name is None:
         print(output_text)
@@ -46,6 +69,9 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('file', help='name of the script file')
     arg_helper.add_o_argument(parser)
+    parser.add_argument(
+        '--native', help='generate Python functions instead of instructions',
+        action='store_true')
     args = parser.parse_args()
 
     injection.configure()
@@ -53,9 +79,14 @@ def main():
     runtime_module.configure()
 
     input_file = args.file
-    program = instruction_text(input_file)
+    if args.native:
+        program = native_file_text(input_file)
+    else:
+        program = instruction_text(input_file)
     if program is not None:
-        output_python(program_code(program), arg_helper.get_output_file(args))
+        output_python(
+            program_code(program, args.native),
+            arg_helper.get_output_file(args))
 
 if __name__ == '__main__':
     main()
@@ -11,6 +11,7 @@ from bardolph.controller import light_module
 from bardolph.controller.units import UnitMode
 from bardolph.runtime import runtime_module
 from bardolph.vm import machine
+from bardolph.vm.slot import Scope, Slot
 from bardolph.vm.instruction import Instruction, OpCode
 from bardolph.vm.vm_codes import IoOp, JumpCondition, LoopVar, Operand, Operator
 from bardolph.vm.vm_codes import Register, SetOp
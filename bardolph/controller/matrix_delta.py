@@ -0,0 +1,87 @@
+"""
+Works out which SetTileState64 messages a matrix light needs in order to
+show a new set of colors, given the colors it was sent last time.
+
+Every message carries exactly MESSAGE_CELLS colors, which fill a window on
+the tile, starting at its x and y, row by row, each row being as long as
+its width. A window therefore covers MESSAGE_CELLS // width rows, and the
+light ignores the part of it that falls below the bottom of the tile. Tiles
+are assumed to be no more than MESSAGE_CELLS cells wide.
+
+Windows are described by Rects, clipped to the tile. Colors are passed
+around as flat lists, one color per cell, row by row, the same as from
+ColorMatrix.get_colors().
+"""
+
+from bardolph.controller.color_matrix import Rect
+
+MESSAGE_CELLS = 64
+
+
+def full_frame(height, width):
+    """ Windows that together cover the whole tile. """
+    return [
+        _window(top, 0, width - 1, height)
+        for top in range(0, height, MESSAGE_CELLS // width)]
+
+
+def changed_rects(old_colors, new_colors, height, width):
+    """
+    Returns a list of windows, to be sent as one message each, that together
+    cover every cell whose color has changed. The list is empty if nothing
+    has changed. Returns None if that would take as many messages as
+    sending the whole tile, in which case the whole tile should be sent.
+    """
+    changed_rows = []
+    left, right = width, -1
+    for row in range(0, height):
+        start = row * width
+        columns = [
+            column for column in range(0, width)
+            if old_colors[start + column] != new_colors[start + column]]
+        if len(columns) > 0:
+            changed_rows.append(row)
+            left = min(left, columns[0])
+            right = max(right, columns[-1])
+    if len(changed_rows) == 0:
+        return []
+
+    # A window only as wide as the changes covers more rows.
+    windows = min(
+        _cover(changed_rows, 0, width - 1, height),
+        _cover(changed_rows, left, right, height),
+        key=len)
+    if len(windows) >= len(full_frame(height, width)):
+        return None
+    return windows
+
+
+def window_colors(colors, width, window):
+    """
+    The MESSAGE_CELLS colors to send for window, taken from colors, a full
+    frame for a tile width cells wide. Cells below the tile get zeros.
+    """
+    window_width = window.right - window.left + 1
+    result = []
+    for i in range(0, MESSAGE_CELLS):
+        index = ((window.top + i // window_width) * width
+                 + window.left + i % window_width)
+        if index < len(colors):
+            result.append(colors[index])
+        else:
+            result.append([0, 0, 0, 0])
+    return result
+
+
+def _cover(rows, left, right, height):
+    # The fewest windows between left and right that cover all the rows.
+    windows = []
+    for row in rows:
+        if len(windows) == 0 or row > windows[-1].bottom:
+            windows.append(_window(row, left, right, height))
+    return windows
+
+
+def _window(top, left, right, height):
+    num_rows = MESSAGE_CELLS // (right - left + 1)
+    return Rect(top, min(top + num_rows, height) - 1, left, right)
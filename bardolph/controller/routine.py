@@ -4,11 +4,21 @@ class Routine:
         self._address = address
         self._return = address
         self._params = []
+        self._frame_size = 0
 
     @property
     def name(self):
         return self._name
 
+    @property
+    def frame_size(self) -> int:
+        # Number of slots needed for the parameters and local variables.
+        return max(self._frame_size, len(self._params))
+
+    @frame_size.setter
+    def frame_size(self, frame_size):
+        self._frame_size = frame_size
+
     @property
     def params(self):
         return self._params
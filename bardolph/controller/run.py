@@ -16,7 +16,10 @@ from bardolph.runtime import runtime_module
 _epilog = """The -n parameter is optional, but if you don't specify it,
 discovery of the lights will take several seconds, and there will
 be a noticeable pause before the script actually runs. If specified, this
-parameter overrides any values in any configuration files."""
+parameter overrides any values in any configuration files. Once the lights
+have been discovered, they are remembered in the discovery cache, and
+subsequent runs start right away while discovery goes on in the
+background."""
 
 
 def init_args():
@@ -1,16 +1,22 @@
 import logging
 
-from bardolph.lib.job_control import Job
+from bardolph.lib import i_lib
+from bardolph.lib.injection import inject
+from bardolph.lib.job_control import SlicedJob
+from bardolph.vm.loader import Loader
 from bardolph.vm.machine import Machine, MachineState, Registers
+from bardolph.vm.program import Program
+from bardolph.parser.compile_cache import CompileCache
 from bardolph.parser.parse import Parser
 
 
-class ScriptJob(Job):
+class ScriptJob(SlicedJob):
     def __init__(self):
         super().__init__()
         self._program = None
         self._parser = Parser()
         self._machine = Machine()
+        self._stop_requested = False
 
     @staticmethod
     def from_file(file_name):
@@ -24,17 +30,68 @@ class ScriptJob(Job):
         new_instance.load_string(script)
         return new_instance
 
+    @staticmethod
+    def from_program(program: Program):
+        """
+        A Program is never modified by running it, so any number of jobs can
+        share one.
+        """
+        new_instance = ScriptJob()
+        new_instance._program = program
+        return new_instance
+
     def load_file(self, file_name):
+        try:
+            with open(file_name, 'r') as srce:
+                input_string = srce.read()
+        except OSError:
+            return self._parse_file(file_name)
+        self._program = self._compile(self._parser, file_name, input_string)
+        return self._program
+
+    @staticmethod
+    def compile_source(file_name, input_string) -> Program:
+        """
+        Compile input_string, which was read from file_name, without setting
+        up a job to run it. If the script doesn't compile, the errors are
+        logged and the Program is empty.
+        """
+        return ScriptJob._compile(Parser(), file_name, input_string)
+
+    @staticmethod
+    @inject(i_lib.Settings)
+    def _compile(parser, file_name, input_string, settings) -> Program:
+        use_cache = settings.get_value('use_compile_cache', False)
+        if use_cache:
+            cache = CompileCache.for_script(file_name)
+            program = cache.get(input_string)
+            if program is not None:
+                logging.debug(
+                    '"{}" from {}'.format(file_name, cache.cache_dir))
+                return program
+
+        if not parser.parse(input_string):
+            return ScriptJob._parse_failed(parser, file_name)
+        program = Loader().load(parser.get_program())
+        if use_cache:
+            cache.put(input_string, program)
+        return program
+
+    def _parse_file(self, file_name):
         if self._parser.parse_file(file_name):
-            self._program = self._parser.get_program()
+            self._program = Loader().load(self._parser.get_program())
         else:
-            logging.error("{}, {}".format(file_name, self._parser.get_errors()))
-            self._program = []
+            self._program = self._parse_failed(self._parser, file_name)
         return self._program
 
+    @staticmethod
+    def _parse_failed(parser, file_name):
+        logging.error("{}, {}".format(file_name, parser.get_errors()))
+        return Program()
+
     def load_string(self, input_string):
         if self._parser.parse(input_string):
-            self._program = self._parser.get_program()
+            self._program = Loader().load(self._parser.get_program())
         else:
             self._program = None
             logging.error(self._parser.get_errors())
@@ -53,8 +110,26 @@ class ScriptJob(Job):
 
     def execute(self):
         if self._program is not None:
-            self._machine.reset()
+            self._reset_machine()
             self._machine.run(self._program)
 
+    def start(self):
+        if self._program is not None:
+            self._reset_machine()
+            self._machine.start(self._program)
+
+    def resume(self):
+        if self._program is None:
+            return None
+        return self._machine.resume()
+
     def request_stop(self):
+        self._stop_requested = True
         self._machine.stop()
+
+    def _reset_machine(self) -> None:
+        # Resetting the machine forgets a stop that was requested before the
+        # job started, so it gets passed along again.
+        self._machine.reset()
+        if self._stop_requested:
+            self._machine.stop()
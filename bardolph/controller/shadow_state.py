@@ -0,0 +1,190 @@
+import copy
+import threading
+import time
+
+from bardolph.lib import i_lib
+from bardolph.lib.injection import inject
+
+COLOR = 'color'
+POWER = 'power'
+ZONES = 'zones'
+MATRIX = 'matrix'
+
+
+class ShadowMetrics:
+    """
+    Counts shared by the shadows of all the lights. A hit is a get served
+    from the shadow, a miss is one that had to go to the light, and a skip
+    is a set that was dropped because the light already had that state.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._skips = 0
+
+    def hit(self) -> None:
+        with self._lock:
+            self._hits += 1
+
+    def miss(self) -> None:
+        with self._lock:
+            self._misses += 1
+
+    def skip(self) -> None:
+        with self._lock:
+            self._skips += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hits = self._misses = self._skips = 0
+
+    def get(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'skips': self._skips
+            }
+
+
+_the_metrics = ShadowMetrics()
+
+
+def get_metrics() -> dict:
+    return _the_metrics.get()
+
+
+def reset_metrics() -> None:
+    _the_metrics.reset()
+
+
+class ShadowState:
+    """
+    What is known about the state of one light: its color, power, zones, and
+    matrix, each with the time it was last confirmed, either by the light's
+    response to a get, or by a set that went out without an error.
+
+    A field is only trusted for ttl seconds, which comes from the shadow_ttl
+    setting. If that is zero, nothing is ever trusted and every get and set
+    goes to the light, which is the default.
+
+    Two colors match if none of their components differ by more than the
+    shadow_tolerance setting, in raw units. Hue is compared around the
+    circle, so 65535 and 0 are next to each other.
+
+    After a set with a non-zero duration, the shadow holds the state that
+    the light is on its way to, not whatever it shows at the moment.
+    """
+    def __init__(self, ttl=None, tolerance=None, metrics=None):
+        self._ttl = ttl
+        self._tolerance = tolerance
+        self._metrics = metrics or _the_metrics
+        self._fields = {}
+        self._lock = threading.Lock()
+
+    @inject(i_lib.Settings)
+    def _init_settings(self, settings) -> None:
+        if self._ttl is None:
+            self._ttl = float(settings.get_value('shadow_ttl', 0.0))
+        if self._tolerance is None:
+            self._tolerance = int(settings.get_value('shadow_tolerance', 0))
+
+    def _enabled(self) -> bool:
+        if self._ttl is None or self._tolerance is None:
+            self._init_settings()
+        return self._ttl > 0.0
+
+    def _current(self, field):
+        # The value of the field, or None if it isn't known or is stale.
+        with self._lock:
+            entry = self._fields.get(field)
+        if entry is None:
+            return None
+        value, confirmed = entry
+        if time.monotonic() - confirmed > self._ttl:
+            return None
+        return value
+
+    def get(self, field, fetch):
+        """
+        Returns the field from the shadow if it's current. Otherwise, calls
+        fetch() to get it from the light and remembers the result, unless
+        it indicates a failure.
+        """
+        if not self._enabled():
+            return fetch()
+        value = self._current(field)
+        if value is not None:
+            self._metrics.hit()
+            return copy.deepcopy(value)
+        self._metrics.miss()
+        value = fetch()
+        if _is_valid(field, value):
+            self.put(field, value)
+        return value
+
+    def peek(self, field):
+        # The field if it's current, otherwise None. Not counted.
+        if not self._enabled():
+            return None
+        return copy.deepcopy(self._current(field))
+
+    def matches(self, field, value) -> bool:
+        """
+        Returns True if the field is current and already equal to value, in
+        which case there's no need to send it again. A True result is
+        counted as a skip.
+        """
+        if not self._enabled():
+            return False
+        current = self._current(field)
+        if current is None or not self._equal(field, current, value):
+            return False
+        self._metrics.skip()
+        return True
+
+    def put(self, field, value) -> None:
+        if self._enabled():
+            with self._lock:
+                self._fields[field] = (
+                    copy.deepcopy(value), time.monotonic())
+
+    def invalidate(self, *fields) -> None:
+        with self._lock:
+            for field in fields:
+                self._fields.pop(field, None)
+
+    def _equal(self, field, current, value) -> bool:
+        if field == POWER:
+            return current == value
+        if field == COLOR:
+            return self._colors_equal(current, value)
+        if field == MATRIX:
+            current_size, current = current[0:2], current[2]
+            if current_size != value[0:2]:
+                return False
+            value = value[2]
+        return len(current) == len(value) and all(
+            self._colors_equal(a, b) for a, b in zip(current, value))
+
+    def _colors_equal(self, color0, color1) -> bool:
+        tolerance = self._tolerance
+        hue_diff = abs(color0[0] - color1[0])
+        if min(hue_diff, 0x10000 - hue_diff) > tolerance:
+            return False
+        return all(abs(a - b) <= tolerance
+                   for a, b in zip(color0[1:4], color1[1:4]))
+
+
+def _is_valid(field, value) -> bool:
+    # Lights report a failed get with None or a color of all -1.
+    if value is None:
+        return False
+    if field == POWER:
+        return True
+    if field == COLOR:
+        return min(value) >= 0
+    if field == MATRIX:
+        return value[0] > 0 and value[1] > 0
+    return all(color is not None and min(color) >= 0 for color in value)
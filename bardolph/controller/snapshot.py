@@ -15,6 +15,7 @@ class Snapshot:
     def __init__(self):
         self._text = None
         self._brief = False
+        self._light_state = None
 
     def start_snapshot(self):
         self._text = ''
@@ -43,24 +44,44 @@ class Snapshot:
         self.setting(Register.KELVIN, raw_color[3])
 
     def light(self, light):
-        self.color(light.get_color())
+        self.color(self.get_color(light))
 
     def multizone(self, light):
-        for number, color in enumerate(light.get_zone_colors()):
+        for number, color in enumerate(self.get_zone_colors(light)):
             self.zone(light, number, color)
 
     def matrix(self, light):
-        light_matrix = light.get_matrix()
+        light_matrix = self.get_matrix(light)
         mat = light_matrix.matrix
         for row in range(0, light_matrix.height):
             for column in range(0, light_matrix.width):
                 self.matrix_cell(row, column, mat[row][column])
 
+    # Everything the snapshot learns from the lights goes through these.
+    @staticmethod
+    def get_color(light):
+        return light.get_color()
+
+    @staticmethod
+    def get_power(light):
+        return light.get_power()
+
+    @staticmethod
+    def get_zone_colors(light):
+        return light.get_zone_colors()
+
+    @staticmethod
+    def get_matrix(light):
+        return light.get_matrix()
+
     @injection.inject(LightSet)
     def generate(self, filter, light_set):
+        # Everything comes from one state of the LightSet, even if discovery
+        # changes it in the meantime.
+        self._light_state = light_set.get_state()
         self.start_snapshot()
         any_found = False
-        for name in light_set.get_light_names():
+        for name in self._light_state.get_light_names():
             if filter is None:
                 include = True
             elif isinstance(filter, str):
@@ -70,7 +91,7 @@ class Snapshot:
 
             if include:
                 any_found = True
-                light = light_set.get_light(name)
+                light = self._light_state.get_light(name)
                 if isinstance(light, i_controller.MultizoneLight):
                     self.start_multizone(light)
                     self.multizone(light)
@@ -116,7 +137,7 @@ class ScriptSnapshot(Snapshot):
         self.append('end\n')
 
     def power(self, light):
-        fmt = 'on "{}"\n' if light.get_power() else 'off "{}"\n'
+        fmt = 'on "{}"\n' if self.get_power(light) else 'off "{}"\n'
         self.append(fmt.format(light.get_name()))
 
 
@@ -165,15 +186,15 @@ class TextSnapshot(Snapshot):
     def _nl(self):
         self.append('\n')
 
-    @injection.inject(LightSet)
-    def _add_sets(self, filter, light_set):
+    def _add_sets(self, filter):
+        light_state = self._light_state
         self._add_set(
-            'Groups', light_set.get_group_names(),
-            light_set.get_group_lights,
+            'Groups', light_state.get_group_names(),
+            light_state.get_group_lights,
             filter)
         self._add_set(
-            'Locations', light_set.get_location_names(),
-            light_set.get_location_lights,
+            'Locations', light_state.get_location_names(),
+            light_state.get_location_lights,
             filter)
 
     def _add_set(self, heading, set_names, get_fn, filter=None):
@@ -201,7 +222,7 @@ class TextSnapshot(Snapshot):
     def start_multizone(self, light):
         self.start_light(light)
         layout = '{:>' + str(self._field_width * 4 + 1) + '}'
-        self.append(layout.format(light.get_power()))
+        self.append(layout.format(self.get_power(light)))
         self.append('\n   Zone\n')
 
     def zone(self, _, number, raw_color):
@@ -220,7 +241,7 @@ class TextSnapshot(Snapshot):
         self._nl()
 
     def matrix(self, light):
-        light_matrix = light.get_matrix()
+        light_matrix = self.get_matrix(light)
         mat = light_matrix.matrix
         for row in range(0, light_matrix.height):
             for col in range(0, light_matrix.width):
@@ -229,12 +250,47 @@ class TextSnapshot(Snapshot):
                 self._nl()
 
     def power(self, light):
-        self._add_field('{:d}'.format(light.get_power()))
+        self._add_field('{:d}'.format(self.get_power(light)))
 
     def end_light(self, _):
         self._nl()
 
 
+class StatusSnapshot(TextSnapshot):
+    """
+    The same text as TextSnapshot, plus the raw state of each light, which
+    ends up in the lights dictionary, keyed by name. Each light is asked for
+    its state only once.
+    """
+    def __init__(self):
+        super().__init__()
+        self.lights = {}
+
+    def _state_of(self, light):
+        return self.lights.setdefault(light.get_name(), {})
+
+    def get_color(self, light):
+        color = light.get_color()
+        self._state_of(light)['color'] = list(color)
+        return color
+
+    def get_power(self, light):
+        power = light.get_power()
+        self._state_of(light)['power'] = power
+        return power
+
+    def get_zone_colors(self, light):
+        colors = light.get_zone_colors()
+        self._state_of(light)['zones'] = [list(color) for color in colors]
+        return colors
+
+    def get_matrix(self, light):
+        light_matrix = light.get_matrix()
+        self._state_of(light)['matrix'] = [
+            [list(color) for color in row] for row in light_matrix.matrix]
+        return light_matrix
+
+
 def _do_gen(ctor, filter):
     print(ctor().generate(filter).text)
 
@@ -1,6 +1,11 @@
 import colorsys
 from enum import Enum, auto
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from bardolph.lib.noneable import noneable
 from bardolph.vm.vm_codes import Register
 
@@ -100,3 +105,115 @@ def convert_fn(srce_type, dest_type):
 def convert(srce, srce_type, dest_type):
     fn = convert_fn(srce_type, dest_type)
     return srce if fn is None else fn(srce)
+
+
+# Batch conversions. Each one takes a sequence of colors, none of which may
+# be None, and returns the converted colors in the same order: an N x 4
+# numpy array if numpy is installed, otherwise a list of lists. The results
+# are exactly the same as from the single-color functions above.
+
+def logical_to_raw_batch(colors):
+    if numpy is None:
+        return _each(logical_to_raw, colors)
+    h, s, b, k = _columns(colors)
+    is_zero = (((-_EPSILON < h) & (h < _EPSILON))
+               | ((360 - _EPSILON < h) & (h < 360 + _EPSILON)))
+    h = numpy.where(is_zero, 0.0, (h % 360.0) / 360.0 * 65535.0)
+    return numpy.column_stack((h, _pct_to_raw_np(s), _pct_to_raw_np(b), k))
+
+def raw_to_logical_batch(colors):
+    if numpy is None:
+        return _each(raw_to_logical, colors)
+    h, s, b, k = _columns(colors)
+    h = h / 65535.0 * 360.0
+    s = numpy.where(s >= 65535.0, 100.0, s / 65535.0 * 100.0)
+    b = numpy.where(b >= 65535.0, 100.0, b / 65535.0 * 100.0)
+    return numpy.maximum(numpy.column_stack((h, s, b, k)), 0.0)
+
+def rgb_to_raw_batch(colors):
+    if numpy is None:
+        return _each(rgb_to_raw, colors)
+    r, g, b, k = _columns(colors)
+    h, s, v = _rgb_to_hsv_np(r / 100.0, g / 100.0, b / 100.0)
+    hsv = numpy.clip(numpy.column_stack((h, s, v)) * 65535.0, 0, 65535)
+    return numpy.rint(numpy.column_stack((hsv, k)))
+
+def rgb_to_logical_batch(colors):
+    if numpy is None:
+        return _each(rgb_to_logical, colors)
+    r, g, b, k = _columns(colors)
+    h, s, v = _rgb_to_hsv_np(r / 100.0, g / 100.0, b / 100.0)
+    return numpy.column_stack((h * 360.0, s * 100.0, v * 100.0, k))
+
+def raw_to_rgb_batch(colors):
+    if numpy is None:
+        return _each(raw_to_rgb, colors)
+    h, s, v, k = _columns(colors)
+    r, g, b = _hsv_to_rgb_np(h / 65535.0, s / 65535.0, v / 65535.0)
+    return numpy.column_stack((r * 100.0, g * 100.0, b * 100.0, k))
+
+def logical_to_rgb_batch(colors):
+    if numpy is None:
+        return _each(logical_to_rgb, colors)
+    h, s, v, k = _columns(colors)
+    r, g, b = _hsv_to_rgb_np(h / 360.0, s / 100.0, v / 100.0)
+    return numpy.column_stack((r * 100.0, g * 100.0, b * 100.0, k))
+
+def convert_batch_fn(srce_type, dest_type):
+    return {
+        UnitMode.LOGICAL: {
+            UnitMode.LOGICAL: None,
+            UnitMode.RAW: logical_to_raw_batch,
+            UnitMode.RGB: logical_to_rgb_batch },
+        UnitMode.RAW: {
+            UnitMode.LOGICAL: raw_to_logical_batch,
+            UnitMode.RAW: None,
+            UnitMode.RGB: raw_to_rgb_batch },
+        UnitMode.RGB: {
+            UnitMode.LOGICAL: rgb_to_logical_batch,
+            UnitMode.RAW: rgb_to_raw_batch,
+            UnitMode.RGB: None }
+    }[srce_type][dest_type]
+
+def _each(fn, colors):
+    # Skips the @noneable check, which doesn't apply to a batch.
+    return [fn.__wrapped__(list(color)) for color in colors]
+
+def _columns(colors):
+    return numpy.asarray(colors, dtype=float).reshape(-1, 4).T
+
+def _pct_to_raw_np(pct):
+    return numpy.where(
+        (-_EPSILON < pct) & (pct < _EPSILON), 0.0, pct / 100.0 * 65535.0)
+
+def _rgb_to_hsv_np(r, g, b):
+    # Same steps as colorsys.rgb_to_hsv(), for arrays.
+    maxc = numpy.maximum(numpy.maximum(r, g), b)
+    minc = numpy.minimum(numpy.minimum(r, g), b)
+    rangec = maxc - minc
+    is_gray = minc == maxc
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        s = rangec / maxc
+        rc = (maxc - r) / rangec
+        gc = (maxc - g) / rangec
+        bc = (maxc - b) / rangec
+    h = numpy.select(
+        (r == maxc, g == maxc), (bc - gc, 2.0 + rc - bc), 4.0 + gc - rc)
+    h = (h / 6.0) % 1.0
+    return (numpy.where(is_gray, 0.0, h), numpy.where(is_gray, 0.0, s),
+            maxc)
+
+def _hsv_to_rgb_np(h, s, v):
+    # Same steps as colorsys.hsv_to_rgb(), for arrays.
+    i = numpy.trunc(h * 6.0)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    sextants = [i % 6 == n for n in range(0, 6)]
+    r = numpy.select(sextants, (v, q, p, p, t, v))
+    g = numpy.select(sextants, (t, v, v, q, p, p))
+    b = numpy.select(sextants, (p, p, t, v, v, q))
+    is_gray = s == 0.0
+    return (numpy.where(is_gray, v, r), numpy.where(is_gray, v, g),
+            numpy.where(is_gray, v, b))
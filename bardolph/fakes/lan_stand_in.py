@@ -0,0 +1,206 @@
+import socket
+import threading
+
+from bardolph.controller import lifx_protocol
+from bardolph.controller.lifx_protocol import Message, MessageType
+
+
+class VirtualDevice:
+    """
+    Keeps the state of one simulated device and answers the messages sent
+    to it. Every message it gets is appended to received as a
+    (MessageType, payload) tuple.
+
+    A device that isn't responsive ignores everything.
+    """
+    def __init__(self, mac, label, group='', location='', product=1,
+                 num_zones=0, height=0, width=0):
+        self.target = lifx_protocol.mac_target(mac)
+        self.label = label
+        self.group = group
+        self.location = location
+        self.product = product
+        self.color = [0, 0, 0, 0]
+        self.power = 0
+        self.zones = [[0, 0, 0, 0] for _ in range(0, num_zones)]
+        self.height = height
+        self.width = width
+        self.cells = [[0, 0, 0, 0] for _ in range(0, 64)]
+        self.responsive = True
+        self.received = []
+
+    def handle(self, message, port) -> list:
+        """
+        Returns a list of (MessageType, payload) for the responses.
+        """
+        msg_type, payload = message.msg_type, message.payload
+        self.received.append((msg_type, payload))
+        handler = {
+            MessageType.GET_SERVICE: lambda: [(
+                MessageType.STATE_SERVICE,
+                (lifx_protocol.SERVICE_UDP, port))],
+            MessageType.GET_LABEL: lambda: [(
+                MessageType.STATE_LABEL,
+                (lifx_protocol.label_bytes(self.label),))],
+            MessageType.GET_VERSION: lambda: [(
+                MessageType.STATE_VERSION, (1, self.product, 0))],
+            MessageType.GET_GROUP: lambda: [(
+                MessageType.STATE_GROUP, self._membership(self.group))],
+            MessageType.GET_LOCATION: lambda: [(
+                MessageType.STATE_LOCATION, self._membership(self.location))],
+            MessageType.LIGHT_GET: self._light_state,
+            MessageType.LIGHT_SET_COLOR: self._set_color,
+            MessageType.GET_POWER: lambda: [(
+                MessageType.STATE_POWER, (self.power,))],
+            MessageType.LIGHT_GET_POWER: lambda: [(
+                MessageType.LIGHT_STATE_POWER, (self.power,))],
+            MessageType.SET_POWER: self._set_power,
+            MessageType.LIGHT_SET_POWER: self._set_power,
+            MessageType.GET_COLOR_ZONES: self._get_zones,
+            MessageType.SET_COLOR_ZONES: self._set_zones,
+            MessageType.GET_DEVICE_CHAIN: self._device_chain,
+            MessageType.GET_64: self._get_64,
+            MessageType.SET_64: self._set_64
+        }.get(msg_type)
+        responses = None if handler is None else handler()
+        if responses is None:
+            return [(MessageType.STATE_UNHANDLED, (msg_type,))]
+        if 'SET' in msg_type.name and not message.res_required:
+            return []
+        return responses
+
+    @staticmethod
+    def _membership(label):
+        return (lifx_protocol.label_bytes(label, 16),
+                lifx_protocol.label_bytes(label), 0)
+
+    def _light_state(self):
+        return [(MessageType.LIGHT_STATE, (
+            *self.color, 0, self.power,
+            lifx_protocol.label_bytes(self.label), 0))]
+
+    def _set_color(self):
+        self.color = list(self.received[-1][1][1:5])
+        return self._light_state()
+
+    def _set_power(self):
+        self.power = self.received[-1][1][0]
+        return [(MessageType.LIGHT_STATE_POWER, (self.power,))]
+
+    def _get_zones(self):
+        if len(self.zones) == 0:
+            return None
+        count = len(self.zones)
+        responses = []
+        for index in range(0, count, 8):
+            colors = self.zones[index:index + 8]
+            colors += [[0, 0, 0, 0]] * (8 - len(colors))
+            responses.append((
+                MessageType.STATE_MULTI_ZONE,
+                (count, index,
+                 *[value for color in colors for value in color])))
+        return responses
+
+    def _set_zones(self):
+        if len(self.zones) == 0:
+            return None
+        start, end, *color = self.received[-1][1][0:6]
+        for zone in range(start, min(end + 1, len(self.zones))):
+            self.zones[zone] = list(color)
+        return self._get_zones()
+
+    def _device_chain(self):
+        if self.height == 0:
+            return None
+        tiles = []
+        for index in range(0, lifx_protocol.MAX_TILES):
+            tile = [0] * lifx_protocol.TILE_FIELDS
+            if index == 0:
+                tile[lifx_protocol.TILE_WIDTH] = self.width
+                tile[lifx_protocol.TILE_HEIGHT] = self.height
+            tiles.extend(tile)
+        return [(MessageType.STATE_DEVICE_CHAIN, (0, *tiles, 1))]
+
+    def _get_64(self):
+        if self.height == 0:
+            return None
+        values = [value for color in self.cells for value in color]
+        return [(MessageType.STATE_64, (0, 0, 0, 0, self.width, *values))]
+
+    def _set_64(self):
+        if self.height == 0:
+            return None
+        values = self.received[-1][1][7:]
+        self.cells = [list(values[i:i + 4]) for i in range(0, 256, 4)]
+        return self._get_64()
+
+
+class LanStandIn:
+    """
+    Stands in for a network of LIFX devices, all of them listening on one UDP
+    port on localhost. This allows the code that speaks the LAN protocol to
+    be tested without any real devices.
+
+    A message sent to the broadcast target is answered by every device. Any
+    other message goes to the device whose MAC address is its target.
+    """
+    def __init__(self, devices, host='127.0.0.1', port=0):
+        self._devices = {device.target: device for device in devices}
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((host, port))
+        self._socket.settimeout(0.05)
+        self._running = False
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    def get_device(self, mac) -> VirtualDevice:
+        return self._devices.get(lifx_protocol.mac_target(mac))
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._serve, name='lan stand-in', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._socket.close()
+
+    def _serve(self) -> None:
+        while self._running:
+            try:
+                data, addr = self._socket.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self._handle(data, addr)
+
+    def _handle(self, data, addr) -> None:
+        message = lifx_protocol.decode(data)
+        if message is None:
+            return
+        if message.tagged or message.target == lifx_protocol.BROADCAST_TARGET:
+            devices = self._devices.values()
+        else:
+            device = self._devices.get(message.target)
+            devices = [] if device is None else [device]
+
+        for device in devices:
+            if not device.responsive:
+                continue
+            responses = device.handle(message, self.port)
+            if message.ack_required:
+                responses.insert(0, (MessageType.ACKNOWLEDGEMENT, ()))
+            for msg_type, payload in responses:
+                reply = Message(
+                    msg_type, device.target, message.source,
+                    message.sequence, payload)
+                self._socket.sendto(lifx_protocol.encode(reply), addr)
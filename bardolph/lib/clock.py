@@ -2,7 +2,7 @@ import threading
 import time
 from datetime import datetime
 
-from bardolph.lib import i_lib, injection
+from bardolph.lib import i_lib, injection, timer_service
 
 
 def now():
@@ -16,58 +16,95 @@ def configure():
 
 # All time quantities are in seconds.
 class Clock(i_lib.Clock):
+    """
+    Keeps time for one running script. Instead of a thread of its own, it
+    relies on the TimerService shared by all the clocks, which wakes it
+    exactly when a pause is over.
+
+    The cue time accumulates across calls to pause_for(), so that a script
+    which does some work between pauses doesn't drift.
+
+    wait() still returns at every tick of sleep_time seconds, measured from
+    the time the clock was started.
+    """
+    MAX_SLEEP = 60.0
+
     def __init__(self):
-        self._event = threading.Event()
         self._start_time = 0.0
         self._cue_time = 0.0
+        self._tick = None
         self._keep_going = True
-
-    def start(self):
-        self.reset()
-        threading.Thread(target=self.run, args=(), daemon=True).start()
+        self._wakeup = threading.Event()
+        self._service = timer_service.get_service()
 
     @injection.inject(i_lib.Settings)
-    def run(self, settings):
+    def start(self, settings):
+        self._tick = float(settings.get_value('sleep_time', 0.01))
         self._keep_going = True
-        sleep_time = float(settings.get_value('sleep_time'))
-        while self._keep_going:
-            if sleep_time > 0.0:
-                time.sleep(sleep_time)
-            self.fire()
+        self.reset()
 
     def stop(self):
         self._keep_going = False
+        self._wakeup.set()
 
     def reset(self):
         self._cue_time = 0.0
-        self._start_time = now()
+        self._start_time = time.monotonic()
 
     def et(self):
-        return time.time() - self._start_time
-
-    def fire(self):
-        self._event.set()
-        self._event.clear()
+        return time.monotonic() - self._start_time
 
-    def wait(self):
+    def _sleep_until(self, deadline) -> bool:
+        # Returns False if the clock was stopped.
         if self._keep_going:
-            self._event.wait()
+            self._wakeup = threading.Event()
+            if self._keep_going:
+                self._service.sleep_until(deadline, self._wakeup)
         return self._keep_going
 
+    def wait(self):
+        if self._tick is None or self._tick <= 0.0:
+            return self._keep_going
+        ticks = int(self.et() / self._tick) + 1
+        return self._sleep_until(self._start_time + ticks * self._tick)
+
     def pause_for(self, delay):
+        self._sleep_until(self.cue(delay))
+
+    def cue(self, delay):
+        """
+        Advance the cue time by delay without blocking, and return when the
+        pause will be over, in terms of time.monotonic().
+        """
         self._cue_time += delay
-        while self.et() < self._cue_time:
-            if not self.wait():
-                break
+        return self._start_time + self._cue_time
 
     def wait_until(self, time_pattern):
-        hour, minute = Clock._hour_minute()
-        while not time_pattern.match(hour, minute):
-            self.wait()
-            hour, minute = Clock._hour_minute()
-        self.reset()
-
-    @staticmethod
-    def _hour_minute():
+        """
+        Sleep until the time of day matches time_pattern, waking up only
+        when the next matching minute begins.
+        """
+        deadline = self.check_pattern(time_pattern)
+        while deadline is not None:
+            if not self._sleep_until(deadline):
+                return
+            deadline = self.check_pattern(time_pattern)
+
+    def check_pattern(self, time_pattern):
+        """
+        Without blocking, check whether the time of day matches
+        time_pattern. If it does, reset the clock and return None. If not,
+        return when to check again, in terms of time.monotonic(). That's the
+        beginning of the next matching minute, but at most MAX_SLEEP seconds
+        away, in case the wall clock gets changed or the computer is
+        suspended in the meantime.
+        """
         now = datetime.now()
-        return (now.hour, now.minute)
+        if time_pattern.match(now.hour, now.minute):
+            self.reset()
+            return None
+        delay = Clock.MAX_SLEEP
+        next_time = time_pattern.next_match(now)
+        if next_time is not None:
+            delay = min(delay, (next_time - now).total_seconds())
+        return time.monotonic() + delay
@@ -3,11 +3,14 @@ class Clock:
     def stop(self): pass
     def reset(self): pass
     def pause_for(self, _): pass
+    def cue(self, _): pass
+    def check_pattern(self, _): pass
 
 class Settings: pass
 
 class TimePattern:
     def match(self, hour, minute): pass
+    def next_match(self, moment): pass
 
 class LogConfig: pass
 
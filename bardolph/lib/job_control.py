@@ -1,6 +1,17 @@
 import collections
+import heapq
+import itertools
 import logging
 import threading
+import time
+import traceback
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
 
 
 class Job:
@@ -8,16 +19,85 @@ class Job:
     def request_stop(self): pass
 
 
+class SlicedJob(Job):
+    """
+    A job that can also be run a slice at a time by a Scheduler, taking turns
+    with other jobs on the same thread. start() is called once, and then
+    resume() is called until it returns None. Otherwise, resume() returns
+    when it should be called again, in terms of time.monotonic().
+    """
+    def start(self): pass
+    def resume(self): pass
+
+
+class WorkerPool:
+    """
+    Runs functions on at most max_workers threads. A function that can't get
+    a thread right away waits, and the waiting ones with the highest priority
+    go first. A thread that is done with one function goes on to the next one
+    that's waiting, and ends when there are none left.
+    """
+    def __init__(self, max_workers):
+        self._max_workers = max(1, max_workers)
+        self._pending = []
+        self._counter = itertools.count()
+        self._num_workers = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, priority=Priority.NORMAL) -> None:
+        with self._lock:
+            heapq.heappush(
+                self._pending, (-priority, next(self._counter), fn))
+            if self._num_workers < self._max_workers:
+                self._num_workers += 1
+                threading.Thread(target=self._work, name='job worker').start()
+
+    def get_worker_count(self) -> int:
+        return self._num_workers
+
+    def get_pending_count(self) -> int:
+        return len(self._pending)
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._pending) == 0:
+                    self._num_workers -= 1
+                    return
+                fn = heapq.heappop(self._pending)[2]
+            try:
+                fn()
+            except Exception as ex:
+                logging.debug(traceback.format_exc())
+                logging.error('Job worker caught {}'.format(ex))
+
+
 class Agent:
     """
     The name serves as the unique identifier. When the job finishes, the
     callback is invoked with self (this Agent) as the only parameter.
+
+    Without a pool, the job gets a thread of its own. If the job is asked to
+    stop while it's still waiting for a thread from the pool, it never
+    starts.
+
+    All times are in seconds. The wait time is how long the job spent waiting
+    to start, and the run time is how long it has been running, or how long
+    it ran if it's finished.
     """
-    def __init__(self, job, callback, name=None):
+    def __init__(self, job, callback, name=None, priority=Priority.NORMAL,
+                 pool=None):
         self._job = job
         self._callback = callback
-        self._thread = None
         self._name = name or 'job {}'.format(id(self))
+        self._priority = priority
+        self._pool = pool
+        self._queued_at = time.monotonic()
+        self._executed = False
+        self._started_at = None
+        self._finished_at = None
+        self._stop_requested = False
+        self.preempted = False
 
     @property
     def name(self):
@@ -27,24 +107,80 @@ class Agent:
     def job(self):
         return self._job
 
+    @property
+    def priority(self):
+        return self._priority
+
+    @property
+    def wait_time(self) -> float:
+        started_at = self._started_at
+        if started_at is None:
+            return time.monotonic() - self._queued_at
+        return started_at - self._queued_at
+
+    @property
+    def run_time(self):
+        """ None if the job hasn't started. """
+        started_at, finished_at = self._started_at, self._finished_at
+        if started_at is None:
+            return None
+        return (finished_at or time.monotonic()) - started_at
+
     def is_running(self):
-        return self._thread is not None and self._thread.is_alive()
+        return self._executed and self._finished_at is None
 
     def execute(self):
-        self._thread = threading.Thread(target=self._execute_and_call)
-        self._thread.start()
+        self._executed = True
+        if self._pool is None:
+            threading.Thread(target=self._execute_and_call).start()
+        else:
+            self._pool.submit(self._execute_and_call, self._priority)
         return self
 
     def request_stop(self):
+        self._stop_requested = True
         self._job.request_stop()
 
     def _execute_and_call(self):
+        self._started_at = time.monotonic()
         try:
-            self._job.execute()
+            if self._stop_requested:
+                logging.info('"{}" was stopped before it started.'.format(
+                    self._name))
+            else:
+                self._job.execute()
         finally:
+            self._finished_at = time.monotonic()
             self._callback(self)
 
 
+class ScheduledAgent(Agent):
+    """
+    Runs a SlicedJob with a Scheduler instead of a thread of its own.
+    """
+    def __init__(self, job, callback, scheduler, name=None,
+                 priority=Priority.NORMAL):
+        super().__init__(job, callback, name, priority)
+        self._scheduler = scheduler
+        self._task = None
+
+    def execute(self):
+        self._executed = True
+        self._started_at = time.monotonic()
+        self._task = self._scheduler.submit(self._job, self._on_done)
+        return self
+
+    def _on_done(self):
+        self._finished_at = time.monotonic()
+        self._callback(self)
+
+    def request_stop(self):
+        self._stop_requested = True
+        self._job.request_stop()
+        if self._task is not None:
+            self._scheduler.wake(self._task)
+
+
 def failed_job() -> Agent:
     class FailedJob:
         def execute(self):
@@ -57,38 +193,86 @@ def failed_job() -> Agent:
 
 class JobControl:
     """
-    Jobs are pulled out from the left (front of the queue). add_job() appends
-    one to the end (right side), while insert_job() inserts it in front (left
-    side).
+    Queued jobs run one at a time, highest priority first, and in the order
+    they were added within a priority. insert_job() is the same as add_job()
+    with Priority.HIGH. Adding a job with a higher priority than the one that's
+    running stops the running one, which is not resumed.
+
+    Background jobs run concurrently, on at most max_workers threads, which
+    are reused from one job to the next. Once they're all busy, more
+    background jobs wait for one to finish, highest priority first.
+
+    If there's a scheduler, background jobs that can be run in slices share
+    its threads instead.
+
+    Finished jobs stay in the history, along with their wait and run times,
+    until HISTORY_LEN newer ones have finished.
+
+    Functions passed to add_listener() are called with no parameters
+    whenever a job is queued, started, or finished.
     """
-    def __init__(self):
+    HISTORY_LEN = 50
+
+    def __init__(self, scheduler=None, max_workers=16):
+        self._scheduler = scheduler
         self._background = {}
         self._active_agent = None
-        self._queue = collections.deque()
+        self._queue = []
+        self._counter = itertools.count()
+        self._history = collections.deque(maxlen=JobControl.HISTORY_LEN)
+        self._listeners = []
+        self._foreground_pool = WorkerPool(1)
+        self._background_pool = WorkerPool(max_workers)
         self._lock = threading.RLock()
 
+    def add_listener(self, listener) -> None:
+        self._listeners.append(listener)
+
     def clear_queue(self) -> None:
-        self._queue.clear()
+        if self._acquire_lock():
+            try:
+                self._queue.clear()
+            finally:
+                self._release_lock()
+            self._notify()
 
-    def add_job(self, job, name=None):
-        return self._enqueue_job(job, self._queue.append, name)
+    def add_job(self, job, name=None, priority=Priority.NORMAL):
+        return self._enqueue_job(job, name, priority)
 
     def insert_job(self, job, name=None):
-        return self._enqueue_job(job, self._queue.appendleft, name)
+        return self._enqueue_job(job, name, Priority.HIGH)
 
-    def spawn_job(self, job, name):
+    def spawn_job(self, job, name, priority=Priority.NORMAL):
         agent = None
         if self._acquire_lock():
             try:
-                agent = Agent(job, self._on_background_done, name)
+                if (self._scheduler is not None
+                        and isinstance(job, SlicedJob)):
+                    agent = ScheduledAgent(
+                        job, self._on_background_done, self._scheduler, name,
+                        priority)
+                else:
+                    agent = Agent(
+                        job, self._on_background_done, name, priority,
+                        self._background_pool)
                 self._background[agent.name] = agent
                 agent.execute()
             finally:
                 self._release_lock()
+            self._notify()
         return agent
 
     def get_queued(self):
-        return list(self._queue) if self._queue is not None else None
+        """ Waiting jobs, in the order they'll run. """
+        return [entry[2] for entry in sorted(self._queue)]
+
+    def get_history(self):
+        """ Finished jobs, oldest first. """
+        return list(self._history)
+
+    def get_worker_count(self) -> int:
+        return (self._foreground_pool.get_worker_count()
+                + self._background_pool.get_worker_count())
 
     def get_background(self):
         if self._background is None:
@@ -151,37 +335,58 @@ class JobControl:
         if self._acquire_lock():
             try:
                 if self._active_agent is None and len(self._queue) > 0:
-                    self._active_agent = self._queue.popleft()
+                    self._active_agent = heapq.heappop(self._queue)[2]
                     self._active_agent.execute()
             finally:
                 self._release_lock()
 
-    def _enqueue_job(self, job, append_fn, name):
+    def _enqueue_job(self, job, name, priority):
         agent = None
         if self._acquire_lock():
             try:
-                agent = Agent(job, self._on_execution_done, name)
-                append_fn(agent)
+                agent = Agent(job, self._on_execution_done, name, priority,
+                              self._foreground_pool)
+                heapq.heappush(
+                    self._queue, (-priority, next(self._counter), agent))
                 if self._active_agent is None:
                     self._run_next_job()
+                elif priority > self._active_agent.priority:
+                    self._preempt(self._active_agent)
             finally:
-                self._lock.release()
+                self._release_lock()
+            self._notify()
         return agent
 
-    def _on_execution_done(self, _):
+    @staticmethod
+    def _preempt(agent) -> None:
+        if not agent.preempted:
+            logging.info('Stopping "{}" for a higher priority job.'.format(
+                agent.name))
+            agent.preempted = True
+            agent.request_stop()
+
+    def _on_execution_done(self, agent):
         if self._acquire_lock():
             try:
                 self._active_agent = None
+                self._history.append(agent)
             finally:
                 self._release_lock()
             self._run_next_job()
+            self._notify()
 
     def _on_background_done(self, agent):
         if self._acquire_lock():
             try:
                 del self._background[agent.name]
+                self._history.append(agent)
             finally:
                 self._release_lock()
+            self._notify()
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            listener()
 
     def _acquire_lock(self):
         if not self._lock.acquire(True, 1.0):
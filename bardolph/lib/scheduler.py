@@ -0,0 +1,97 @@
+import functools
+import logging
+import queue
+import threading
+import traceback
+
+from bardolph.lib import timer_service
+
+
+class _Task:
+    __slots__ = ('job', 'on_done', 'timer', 'started', 'done')
+
+    def __init__(self, job, on_done):
+        self.job = job
+        self.on_done = on_done
+        self.timer = None
+        self.started = False
+        self.done = False
+
+
+class Scheduler:
+    """
+    Runs any number of sliced jobs on a small, fixed number of threads.
+
+    A sliced job has start(), which is called once, and resume(), which runs
+    the job until it has to wait. resume() returns when the job wants to run
+    again, in terms of time.monotonic(), or None when the job is done.
+    While a job waits, the shared TimerService holds its deadline, and no
+    thread is tied up.
+
+    When a job is done, the on_done function given to submit() is called
+    with no parameters.
+    """
+    def __init__(self, num_threads=1):
+        self._num_threads = max(1, num_threads)
+        self._ready = queue.SimpleQueue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._service = timer_service.get_service()
+
+    def submit(self, job, on_done):
+        """ Returns a handle to be passed to wake(). """
+        task = _Task(job, on_done)
+        with self._lock:
+            while len(self._threads) < self._num_threads:
+                thread = threading.Thread(
+                    target=self._work, name='scheduler', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._ready.put(task)
+        return task
+
+    def wake(self, task) -> None:
+        """
+        If the job is waiting, resume it right away. This is how a job that
+        has been asked to stop gets the chance to do so.
+        """
+        with self._lock:
+            if task.timer is None:
+                # Already running or about to.
+                return
+            self._service.cancel(task.timer)
+            task.timer = None
+        self._ready.put(task)
+
+    def get_thread_count(self) -> int:
+        return len(self._threads)
+
+    def _work(self) -> None:
+        while True:
+            self._run_slice(self._ready.get())
+
+    def _run_slice(self, task) -> None:
+        try:
+            if not task.started:
+                task.started = True
+                task.job.start()
+            deadline = task.job.resume()
+        except Exception as ex:
+            logging.debug(traceback.format_exc())
+            logging.error('Job stopped due to {}'.format(ex))
+            deadline = None
+
+        if deadline is None:
+            task.done = True
+            task.on_done()
+            return
+        with self._lock:
+            task.timer = self._service.schedule(
+                deadline, functools.partial(self._on_timer, task))
+
+    def _on_timer(self, task) -> None:
+        with self._lock:
+            if task.timer is None:
+                return
+            task.timer = None
+        self._ready.put(task)
@@ -12,10 +12,13 @@ class SymbolType(Enum):
     VAR = auto()
 
 class Symbol:
-    def __init__(self, name='', symbol_type=SymbolType.UNDEFINED, value=None):
+    def __init__(
+            self, name='', symbol_type=SymbolType.UNDEFINED, value=None,
+            slot=None):
         self._name = name
         self._symbol_type = symbol_type
         self._value = value
+        self._slot = slot
 
     def __repr__(self):
         return 'Symbol("{}", {}, {})'.format(
@@ -36,3 +39,7 @@ class Symbol:
     @property
     def value(self):
         return self._value
+
+    @property
+    def slot(self):
+        return self._slot
@@ -10,8 +10,9 @@ class SymbolTable:
     def clear(self):
         self._dict.clear()
 
-    def add_symbol(self, name, symbol_type=SymbolType.UNKNOWN, value=None):
-        self._dict[name] = Symbol(name, symbol_type, value)
+    def add_symbol(
+            self, name, symbol_type=SymbolType.UNKNOWN, value=None, slot=None):
+        self._dict[name] = Symbol(name, symbol_type, value, slot)
 
     def get_symbol(self, name):
         return self._dict.get(name, Symbol())
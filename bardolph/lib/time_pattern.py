@@ -1,20 +1,28 @@
 import re
+from datetime import datetime, timedelta
 
 from . import i_lib
 
 
 class TimePattern(i_lib.TimePattern):
-    HOURS_24 = set(range(0, 24))
-    MINUTES_60 = set(range(0, 60))
+    """
+    A set of times of day, with a resolution of one minute. Each pattern
+    from a script becomes a term: a bitmask of the hours it matches
+    and a bitmask of the minutes. A union of patterns keeps all of their
+    terms, and matches a time if any one of them does.
+    """
+    ALL_HOURS = (1 << 24) - 1
+    ALL_MINUTES = (1 << 60) - 1
     REGEX_SPEC = r'(\*|\*\d|\d\*|\d\d?):(\d\d|\d\*|\*\d|\*)(?=(\s|$))'
     REGEX = re.compile(REGEX_SPEC)
 
     def __init__(self, hours, minutes):
         self._repr = 'TimePattern("{}", "{}")'.format(hours, minutes)
-        self._hour_set, self._minute_set = set(), set()
+        self._terms = []
         if hours and minutes:
-            self._init_hour_set(hours)
-            self._init_minute_set(minutes)
+            term = (self._hour_mask(hours), self._minute_mask(minutes))
+            if term[0] and term[1]:
+                self._terms.append(term)
 
     def __repr__(self):
         return self._repr
@@ -64,31 +72,70 @@ class TimePattern(i_lib.TimePattern):
         return 0 <= int_minutes < 60
 
     def union(self, other):
-        self._hour_set.update(other._hour_set)
-        self._minute_set.update(other._minute_set)
+        for term in other._terms:
+            if term not in self._terms:
+                self._terms.append(term)
 
     def match(self, hours, minutes):
-        return hours in self._hour_set and minutes in self._minute_set
+        hour_bit, minute_bit = 1 << hours, 1 << minutes
+        return any(hour_mask & hour_bit and minute_mask & minute_bit
+                   for hour_mask, minute_mask in self._terms)
 
-    def _init_hour_set(self, pattern):
+    def next_match(self, moment: datetime) -> datetime:
+        """
+        Return the start of the first minute after the one containing
+        moment that matches the pattern, or None if nothing can match.
+        """
+        base = moment.replace(second=0, microsecond=0)
+        hour, minute = base.hour, base.minute
+        offsets = [TimePattern._minutes_to_match(term, hour, minute)
+                   for term in self._terms]
+        if len(offsets) == 0:
+            return None
+        return base + timedelta(minutes=min(offsets))
+
+    @staticmethod
+    def _minutes_to_match(term, hour, minute) -> int:
+        # Number of minutes from hour:minute to the next time matched by
+        # term, which is never zero.
+        hour_mask, minute_mask = term
+        later = TimePattern._lowest_bit(minute_mask >> (minute + 1))
+        if hour_mask & (1 << hour) and later is not None:
+            return later + 1
+        first_minute = TimePattern._lowest_bit(minute_mask)
+        next_hour = TimePattern._lowest_bit(hour_mask >> (hour + 1))
+        if next_hour is None:
+            next_hour = TimePattern._lowest_bit(hour_mask) + 24 - hour - 1
+        return (next_hour + 1) * 60 + first_minute - minute
+
+    @staticmethod
+    def _lowest_bit(mask):
+        # Index of the lowest bit that is set, or None if mask is zero.
+        if mask == 0:
+            return None
+        return (mask & -mask).bit_length() - 1
+
+    @staticmethod
+    def _hour_mask(pattern) -> int:
         if pattern == '*':
-            self._hour_set = TimePattern.HOURS_24.copy()
-        elif len(pattern) == 1:
-            self._hour_set = set([int(pattern)])
-        else:
-            self._hour_set = set()
-            for hour in range(0, 24):
-                if self._number_match(hour, pattern):
-                    self._hour_set.add(hour)
-
-    def _init_minute_set(self, pattern):
+            return TimePattern.ALL_HOURS
+        if len(pattern) == 1 or pattern.isdecimal():
+            return (1 << int(pattern)) & TimePattern.ALL_HOURS
+        return TimePattern._mask(24, pattern)
+
+    @staticmethod
+    def _minute_mask(pattern) -> int:
         if pattern == '*':
-            self._minute_set = TimePattern.MINUTES_60.copy()
-        else:
-            self._minute_set = set()
-            for minute in range(0, 59):
-                if TimePattern._number_match(minute, pattern):
-                    self._minute_set.add(minute)
+            return TimePattern.ALL_MINUTES
+        return TimePattern._mask(60, pattern)
+
+    @staticmethod
+    def _mask(limit, pattern) -> int:
+        mask = 0
+        for number in range(0, limit):
+            if TimePattern._number_match(number, pattern):
+                mask |= 1 << number
+        return mask
 
     @staticmethod
     def _number_match(number, pattern) -> bool:
@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class Timer:
+    """
+    Handle for one scheduled callback, returned by TimerService.schedule().
+    """
+    __slots__ = ('deadline', 'callback', 'cancelled')
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+
+class TimerService:
+    """
+    Calls functions at given times, all from a single thread. The pending
+    deadlines are kept in a heap, and the thread sleeps until the earliest
+    one comes due; when nothing is scheduled, it sleeps until something is.
+    Therefore, any number of clocks can share the service without anything
+    waking up for no reason.
+
+    Deadlines are in terms of time.monotonic(). A callback should return
+    quickly, because the callbacks after it have to wait for it.
+    """
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = True
+
+    def schedule(self, deadline, callback) -> Timer:
+        timer = Timer(deadline, callback)
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._counter), timer))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='timer service', daemon=True)
+                self._thread.start()
+            elif self._heap[0][2] is timer:
+                # The new deadline is the earliest, so the thread has to
+                # wake up sooner than it was going to.
+                self._condition.notify()
+        return timer
+
+    @staticmethod
+    def cancel(timer) -> None:
+        # The timer stays in the heap but is ignored when it comes due.
+        timer.cancelled = True
+
+    def sleep_until(self, deadline, wakeup: threading.Event) -> None:
+        """
+        Block until deadline, or until wakeup is set by someone else,
+        whichever comes first.
+        """
+        if deadline <= time.monotonic():
+            return
+        timer = self.schedule(deadline, wakeup.set)
+        wakeup.wait()
+        self.cancel(timer)
+
+    def pending(self) -> int:
+        # Number of timers that haven't come due or been cancelled.
+        with self._condition:
+            return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+
+    def shutdown(self) -> None:
+        # Stop the thread. Anything still scheduled is never called.
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                while len(self._heap) > 0 and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                if len(self._heap) == 0:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0.0:
+                    self._condition.wait(delay)
+                    continue
+                timer = heapq.heappop(self._heap)[2]
+            if not timer.cancelled:
+                timer.callback()
+
+
+_the_service = None
+_lock = threading.Lock()
+
+
+def get_service() -> TimerService:
+    # The one TimerService shared by every clock, created when first needed.
+    global _the_service
+    with _lock:
+        if _the_service is None:
+            _the_service = TimerService()
+        return _the_service
@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import os
+import pickle
+import stat
+import tempfile
+
+from bardolph.vm.program import Program
+
+
+class CompileCache:
+    """
+    Compiled, optimized programs kept on disk so that a script which hasn't
+    changed doesn't have to be lexed, parsed, and optimized again. Much like
+    Python's __pycache__, the entries live in a directory next to the script.
+
+    An entry is named after a hash of the script's source and of the
+    compiler's own source code. Editing either one means that the old entry
+    is simply never looked up again.
+
+    A cache that can't be read or written is never fatal: the script is
+    compiled as if the cache wasn't there.
+
+    Because unpickling an entry can run arbitrary code, an entry is only
+    loaded if both it and the cache directory belong to the current user
+    and nobody else can write to them. Anything else is ignored.
+    """
+    DIR_NAME = '__lscache__'
+    SUFFIX = '.lsc'
+
+    # Everything that has a say in the code generated for a script.
+    _COMPILER_DIRS = ('parser', 'runtime')
+    _COMPILER_FILES = (
+        ('controller', 'routine.py'),
+        ('controller', 'units.py'),
+        ('lib', 'symbol.py'),
+        ('lib', 'symbol_table.py'),
+        ('lib', 'time_pattern.py'),
+        ('vm', 'eval_stack.py'),
+        ('vm', 'instruction.py'),
+        ('vm', 'loader.py'),
+        ('vm', 'program.py'),
+        ('vm', 'slot.py'),
+        ('vm', 'vm_codes.py'),
+        ('vm', 'vm_math.py'))
+
+    _compiler_version = None
+
+    def __init__(self, cache_dir):
+        self._cache_dir = cache_dir
+
+    @staticmethod
+    def for_script(file_name):
+        """
+        Return the cache that belongs to the directory containing file_name.
+        """
+        script_dir = os.path.dirname(os.path.abspath(file_name))
+        return CompileCache(os.path.join(script_dir, CompileCache.DIR_NAME))
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    @classmethod
+    def compiler_version(cls) -> str:
+        if cls._compiler_version is None:
+            cls._compiler_version = cls._hash_compiler()
+        return cls._compiler_version
+
+    @classmethod
+    def _hash_compiler(cls) -> str:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        paths = []
+        for dir_name in cls._COMPILER_DIRS:
+            src_dir = os.path.join(root, dir_name)
+            paths.extend(
+                os.path.join(src_dir, file_name)
+                for file_name in sorted(os.listdir(src_dir))
+                if file_name.endswith('.py'))
+        paths.extend(os.path.join(root, *parts)
+                     for parts in cls._COMPILER_FILES)
+
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(os.path.relpath(path, root).encode())
+            try:
+                with open(path, 'rb') as srce:
+                    digest.update(srce.read())
+            except OSError:
+                digest.update(b'\0')
+        return digest.hexdigest()
+
+    def key(self, source: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(CompileCache.compiler_version().encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, source: str) -> str:
+        return os.path.join(
+            self._cache_dir, self.key(source) + CompileCache.SUFFIX)
+
+    def get(self, source: str):
+        """
+        Return the compiled program for source, or None if there isn't one.
+        """
+        path = self.path(source)
+        try:
+            with open(path, 'rb') as srce:
+                if not (self._is_trusted(os.stat(self._cache_dir))
+                        and self._is_trusted(os.fstat(srce.fileno()))):
+                    logging.warning('Ignoring untrusted {}'.format(path))
+                    return None
+                program = pickle.load(srce)
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            logging.debug('Unable to read {}: {}'.format(path, ex))
+            return None
+        if not isinstance(program, Program):
+            logging.debug('Ignoring {}'.format(path))
+            return None
+        return program
+
+    def put(self, source: str, program: Program) -> bool:
+        """
+        Save the compiled program for source. The file is written under a
+        temporary name and then renamed, so a reader never sees a partial
+        entry.
+        """
+        path = self.path(source)
+        temp_name = None
+        try:
+            os.makedirs(self._cache_dir, 0o755, exist_ok=True)
+            if not self._is_trusted(os.stat(self._cache_dir)):
+                logging.warning(
+                    'Not writing to untrusted {}'.format(self._cache_dir))
+                return False
+            fd, temp_name = tempfile.mkstemp(
+                dir=self._cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as dest:
+                pickle.dump(program, dest, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_name, path)
+            return True
+        except Exception as ex:
+            logging.debug('Unable to write {}: {}'.format(path, ex))
+            if temp_name is not None and os.path.exists(temp_name):
+                os.remove(temp_name)
+            return False
+
+    @staticmethod
+    def _is_trusted(file_stat) -> bool:
+        """
+        Return True if file_stat is for something that belongs to the
+        current user and can't be written by the group or by others.
+        """
+        if hasattr(os, 'getuid') and file_stat.st_uid != os.getuid():
+            return False
+        return (file_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)) == 0
@@ -2,6 +2,7 @@ from collections import deque
 
 from bardolph.lib.symbol import Symbol, SymbolType
 from bardolph.lib.symbol_table import Symbol, SymbolTable
+from bardolph.vm.slot import Scope, Slot
 
 
 class _LoopContext:
@@ -17,6 +18,11 @@ class Context:
         self._loop_depth = 0
         self._in_matrix = False
         self._in_routine = False
+        self._routine = None
+        self._frame_fixups = []
+        self._routine_locals = {}
+        self._num_globals = 0
+        self._num_locals = 0
 
     def __contains__(self, name) -> bool:
         return name in self._locals or name in self._globals
@@ -25,19 +31,52 @@ class Context:
         # Locals don't need to be in a stack because nested routines aren't
         # allowed.
         self._in_routine = False
+        self._routine = None
+        self._frame_fixups.clear()
+        self._routine_locals.clear()
         self._globals.clear()
         self._locals.clear()
         self._loop_stack.clear()
+        self._num_globals = 0
+        self._num_locals = 0
 
-    def enter_routine(self) -> None:
+    def enter_routine(self, routine=None) -> None:
         self._in_routine = True
+        self._routine = routine
+        self._num_locals = 0
 
     def in_routine(self) -> bool:
         return self._in_routine
 
     def exit_routine(self) -> None:
+        if self._routine is not None:
+            self._routine.frame_size = self._num_locals
+            for inst in self._frame_fixups:
+                inst.param0 = self._num_locals
         self._in_routine = False
+        self._routine = None
+        self._frame_fixups.clear()
         self._locals.clear()
+        self._num_locals = 0
+
+    @property
+    def current_routine(self):
+        return self._routine
+
+    @property
+    def num_globals(self) -> int:
+        return self._num_globals
+
+    @property
+    def num_locals(self) -> int:
+        return self._num_locals
+
+    def add_frame_fixup(self, inst) -> None:
+        """
+        inst: a CTX for a recursive call. The size of the frame isn't known
+        until the end of the routine, at which point param0 gets filled in.
+        """
+        self._frame_fixups.append(inst)
 
     def enter_matrix(self) -> None:
         self._in_matrix = True
@@ -72,13 +111,58 @@ class Context:
     def add_routine(self, routine) -> None:
         self._globals.add_symbol(routine.name, SymbolType.ROUTINE, routine)
 
-    def add_variable(self, name, value=None) -> None:
-        dest = self._locals if self._in_routine else self._globals
-        dest.add_symbol(name, SymbolType.VAR, value)
+    def add_variable(self, name, value=None) -> Slot:
+        return self._add_data(name, SymbolType.VAR, value)
+
+    def add_array(self, name, num_dimensions) -> Slot:
+        return self._add_data(name, SymbolType.ARRAY, num_dimensions)
 
-    def add_array(self, name, num_dimensions) -> None:
-        dest = self._locals if self._in_routine else self._globals
-        dest.add_symbol(name, SymbolType.ARRAY, num_dimensions)
+    def add_param(
+            self, name, symbol_type=SymbolType.VAR, value=None) -> Slot:
+        """
+        A parameter always gets a new slot in the routine's frame, hiding any
+        global with the same name.
+        """
+        slot = self._new_local(name)
+        self._locals.add_symbol(name, symbol_type, value, slot)
+        return slot
+
+    def _add_data(self, name, symbol_type, value) -> Slot:
+        """
+        Resolve the name to a slot, allocating one if the name is new. Inside
+        a routine, a name that isn't already local refers to the global
+        variable of that name, if there is one.
+
+        The global may not be defined until further down in the script, after
+        the routine. In that case, the routine's slots for the name, which
+        are already in its code, are changed to refer to the global.
+        """
+        if self._in_routine:
+            dest = self._locals
+            slot = self._locals.get_symbol(name).slot
+            if slot is None:
+                symbol = self._globals.get_symbol(name)
+                if symbol.symbol_type in (SymbolType.VAR, SymbolType.ARRAY):
+                    slot = symbol.slot
+                else:
+                    slot = self._new_local(name)
+                    self._routine_locals.setdefault(name, []).append(slot)
+        else:
+            dest = self._globals
+            slot = self._globals.get_symbol(name).slot
+            if slot is None:
+                slot = Slot(name, Scope.GLOBAL, self._num_globals)
+                self._num_globals += 1
+                for local in self._routine_locals.pop(name, ()):
+                    local.scope = Scope.GLOBAL
+                    local.index = slot.index
+        dest.add_symbol(name, symbol_type, value, slot)
+        return slot
+
+    def _new_local(self, name) -> Slot:
+        slot = Slot(name, Scope.LOCAL, self._num_locals)
+        self._num_locals += 1
+        return slot
 
     def add_global(self, name, symbol_type, value) -> None:
         self._globals.add_symbol(name, symbol_type, value)
@@ -96,6 +180,9 @@ class Context:
             symbol = self._globals.get_symbol(name)
         return symbol
 
+    def get_slot(self, name) -> Slot:
+        return self.get_symbol(name).slot
+
     def get_symbol_typed(self, name, symbol_types):
         symbol = self.get_symbol(name)
         if symbol.undefined or symbol.symbol_type in symbol_types:
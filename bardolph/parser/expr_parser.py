@@ -1,6 +1,7 @@
 from bardolph.lib.symbol import SymbolType
 from bardolph.parser.sub_parser import SubParser
 from bardolph.parser.token import Assoc, TokenTypes
+from bardolph.vm.slot import Scope, Slot
 from bardolph.vm.vm_codes import OpCode, Operator, Register
 
 
@@ -63,12 +64,16 @@ class ExpressionParser(SubParser):
 
     def _name(self, code_gen) -> bool:
         name = str(self.current_token)
-        if self.context.has_symbol_typed(name, SymbolType.ARRAY):
-            return self.next_token() and self._array(name, code_gen)
-        if self.context.has_symbol_typed(
-                name, SymbolType.VAR, SymbolType.CONSTANT):
-            code_gen.push(str(self.current_token))
-            return self.next_token()
+        symbol = self.context.get_symbol(name)
+        match symbol.symbol_type:
+            case SymbolType.ARRAY:
+                return self.next_token() and self._array(symbol.slot, code_gen)
+            case SymbolType.CONSTANT:
+                code_gen.pushq(symbol.value)
+                return self.next_token()
+            case SymbolType.VAR:
+                code_gen.push(symbol.slot)
+                return self.next_token()
         return self.trigger_error('Unknown name: {}'.format(name))
 
     def _array(self, name, code_gen) -> bool:
@@ -125,16 +130,20 @@ class ExpressionParser(SubParser):
         if routine.undefined:
             return self.token_error('Unknown name: "{}"')
 
-        code_gen.add_instruction(OpCode.CTX)
+        ctx = code_gen.add_instruction(OpCode.CTX, routine.value.frame_size)
+        if routine.value is self.context.current_routine:
+            self.context.add_frame_fixup(ctx)
         self.next_token()
-        for param_name in routine.value.params:
+        for index, param_name in enumerate(routine.value.params):
             if self.current_token == ']':
                 return self.trigger_error(
                     'Missing parameter "{}"'.format(param_name))
             if not self.rvalue():
                 return False
             code_gen.add_instruction(OpCode.POP, Register.RESULT)
-            code_gen.add_instruction(OpCode.PARAM, param_name, Register.RESULT)
+            code_gen.add_instruction(
+                OpCode.PARAM, Slot(param_name, Scope.LOCAL, index),
+                Register.RESULT)
         code_gen.add_instruction(OpCode.JSR, routine.name)
         code_gen.add_instruction(OpCode.END_CTX)
 
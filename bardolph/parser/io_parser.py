@@ -1,5 +1,6 @@
 import string
 
+from bardolph.lib.symbol import SymbolType
 from bardolph.parser.sub_parser import SubParser
 from bardolph.vm.vm_codes import IoOp, OpCode, Register
 
@@ -26,16 +27,38 @@ class IoParser(SubParser):
             return self.token_error('Expected format specifier, got {}')
         self.next_token()
 
+        fields = [
+            field[1] for field in string.Formatter().parse(format_str)
+            if field[1] is not None]
         num_unnamed = sum(
-            (1 for field in string.Formatter().parse(format_str)
-             if field[1] is not None
-             and (len(field[1]) == 0 or field[1].isdecimal())))
+            (1 for field in fields if len(field) == 0 or field.isdecimal()))
         for field in range(0, num_unnamed):
             if not self._out_rvalue():
                 return False
+        for name in dict.fromkeys(fields):
+            if len(name) > 0 and not name.isdecimal():
+                self._out_named(name)
         self.code_gen.add_instruction(OpCode.OUT, IoOp.PRINTF, format_str)
         return True
 
+    def _out_named(self, name) -> None:
+        """
+        If a named field refers to a variable or constant, its value is
+        passed along with the format string. Anything else, including a
+        register, is looked up by name when the output is formatted.
+        """
+        if Register.from_string(name) is not None:
+            return
+        symbol = self.context.get_symbol(name)
+        if symbol.symbol_type is SymbolType.CONSTANT:
+            self.code_gen.pushq(symbol.value)
+        elif symbol.symbol_type is SymbolType.VAR:
+            self.code_gen.push(symbol.slot)
+        else:
+            return
+        self.code_gen.pop(Register.RESULT)
+        self.code_gen.add_instruction(OpCode.OUT, IoOp.NAMED, name)
+
     def _out_rvalue(self, end=None) -> bool:
         if not self.rvalue():
             return False
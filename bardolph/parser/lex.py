@@ -6,6 +6,11 @@ from bardolph.parser.token import Token, TokenTypes
 
 
 class Lex:
+    """
+    Every kind of token has a named group in one regular expression, so the
+    group that matched determines the type of the token. The alternatives are
+    tried in order, and anything else that isn't whitespace is an error.
+    """
     _CMP_SPEC = r'==|<=|>=|!=|[<>]'
     _REG = ('hue saturation brightness kelvin red green blue default duration '
              'time')
@@ -15,75 +20,73 @@ class Lex:
     _NON_ALNUM_SPEC = r'==|!=|<=|>=|&&|\|\||!|[\[\]\(\){}+\-*<>/#:\^]'
     _NUMBER_SPEC = r'[0-9]*\.?[0-9]+'
     _LITERAL_STRING_SPEC = r'"([^"]|(?<=\\)")*"'
-    _DEFAULT_SPEC = '[^\s]+'
+    _DEFAULT_SPEC = r'[^\s]+'
 
-    _STRING = re.compile(_LITERAL_STRING_SPEC)
-    _TOKEN_SPEC = '|'.join((
-        TimePattern.REGEX_SPEC,
-        _CMP_SPEC,
-        _LITERAL_STRING_SPEC,
-        _NUMBER_SPEC,
-        _NAME_SPEC,
-        _NON_ALNUM_SPEC,
-        _DEFAULT_SPEC))
-
-    _CMP = re.compile(_CMP_SPEC)
+    _TOKEN_SPEC = '|'.join(
+        '(?P<{}>{})'.format(group, spec) for group, spec in (
+            ('time_pattern', TimePattern.REGEX_SPEC),
+            ('compare', _CMP_SPEC),
+            ('literal_string', _LITERAL_STRING_SPEC),
+            ('number', _NUMBER_SPEC),
+            ('name', _NAME_SPEC),
+            ('mark', _NON_ALNUM_SPEC),
+            ('error', _DEFAULT_SPEC)))
     _TOKEN = re.compile(_TOKEN_SPEC)
-    _NAME = re.compile(_NAME_SPEC)
-    _NUMBER = re.compile(_NUMBER_SPEC)
-    _TIME_PATTERN = TimePattern.REGEX
     _INT = re.compile(r'^\-?[0-9]*$')
 
+    _GROUP_TYPES = {
+        'compare': TokenTypes.COMPARE,
+        'error': TokenTypes.ERROR,
+        'literal_string': TokenTypes.LITERAL_STRING,
+        'mark': TokenTypes.MARK,
+        'number': TokenTypes.NUMBER,
+        'time_pattern': TokenTypes.TIME_PATTERN
+    }
+
+    # Keywords are not case-sensitive.
+    _KEYWORDS = dict(TokenTypes.__members__)
+    _REGISTERS = frozenset(_REG_LIST)
+    _ABBREVIATIONS = {
+        'H': 'hue', 'S': 'saturation', 'B': 'brightness', 'K': 'kelvin'
+    }
+
     def __init__(self, input_string, source=''):
         self._lines = iter(input_string.split('\n'))
         self._source = source
 
     def tokens(self):
-        line_num = 0
-        for line in self._lines:
-            line_num += 1
-            for match in self._TOKEN.finditer(line):
-                matched = match.string[match.start():match.end()]
-                u_matched = self._unabbreviate(matched)
-                if u_matched == '#':
+        source = self._source
+        group_types = Lex._GROUP_TYPES
+        keywords = Lex._KEYWORDS
+        registers = Lex._REGISTERS
+        abbreviations = Lex._ABBREVIATIONS
+        finditer = Lex._TOKEN.finditer
+        for line_num, line in enumerate(self._lines, 1):
+            for match in finditer(line):
+                group = match.lastgroup
+                word = match.group()
+                if group == 'name':
+                    word = abbreviations.get(word, word)
+                    token_type = keywords.get(word.upper())
+                    if token_type is None:
+                        if word in registers:
+                            token_type = TokenTypes.REGISTER
+                        else:
+                            token_type = TokenTypes.NAME
+                elif group == 'literal_string':
+                    word = word[1:-1].replace(r'\"', '"')
+                    token_type = TokenTypes.LITERAL_STRING
+                elif word == '#':
                     break
-                if u_matched in self._NON_ALNUM_LIST:
-                    token_type = TokenTypes.MARK
                 else:
-                    token_type = self._token_type(u_matched)
-                    if token_type is TokenTypes.LITERAL_STRING:
-                        u_matched = u_matched[1:-1]
-                        u_matched = u_matched.replace(r'\"', '"')
-                yield Token(token_type, u_matched, line_num, self._source)
+                    token_type = group_types[group]
+                yield Token(token_type, word, line_num, source)
         yield Token(TokenTypes.EOF)
 
     @staticmethod
     def is_int(text):
         return Lex._INT.match(text) is not None
 
-    def _token_type(self, word):
-        token_type = TokenTypes.__members__.get(word.upper())
-        if token_type is not None:
-            return token_type
-        if word in self._REG_LIST:
-            return TokenTypes.REGISTER
-        pairs = (
-            (self._CMP, TokenTypes.COMPARE),
-            (self._TIME_PATTERN, TokenTypes.TIME_PATTERN),
-            (self._STRING, TokenTypes.LITERAL_STRING),
-            (self._NUMBER, TokenTypes.NUMBER),
-            (self._NAME, TokenTypes.NAME))
-        for reg_expr, token_type in pairs:
-            if reg_expr.match(word):
-                return token_type
-        return TokenTypes.ERROR
-
-    @staticmethod
-    def _unabbreviate(token):
-        return {
-            'H': 'hue', 'S': 'saturation', 'B': 'brightness', 'K': 'kelvin'
-        }.get(token, token)
-
 
 def main():
     args = sys.argv[1:]
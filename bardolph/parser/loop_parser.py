@@ -190,15 +190,13 @@ class LoopParser(SubParser):
         self.next_token()
         if not self.current_token.is_a(TokenTypes.NAME):
             return self.token_error('Expected name for lights, got "{}"')
-        self._light_var = str(self.current_token)
-        context_stack.add_variable(self._light_var)
+        self._light_var = context_stack.add_variable(str(self.current_token))
         return self.next_token()
 
     def _init_index_var(self, context_stack) -> bool:
         if not self.current_token.is_a(TokenTypes.NAME):
             return self.token_error('Not a variable name: "{}"')
-        self._index_var = str(self.current_token)
-        context_stack.add_variable(self._index_var)
+        self._index_var = context_stack.add_variable(str(self.current_token))
         return self.next_token()
 
     def _index_var_range(self, code_gen) -> bool:
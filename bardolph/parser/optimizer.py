@@ -1,5 +1,10 @@
+from enum import Enum
+from numbers import Number
+
 from bardolph.vm.instruction import Instruction
-from bardolph.vm.vm_codes import OpCode
+from bardolph.vm.vm_codes import JumpCondition, OpCode, Operand, Operator
+from bardolph.vm.vm_codes import Register
+from bardolph.vm.vm_math import VmMath
 
 
 class _InstFrame:
@@ -9,27 +14,98 @@ class _InstFrame:
         self.target = None
         self.targeted = False
 
+
 class Optimizer:
+    """
+    The program goes through a series of passes. A pass that gets rid of an
+    instruction turns it into a NOP. After each pass, the NOPs are dropped and
+    the jump offsets are recalculated.
+
+    For every time a pass runs, the report contains its name and the number
+    of instructions before and after.
+    """
+
+    _MAX_ROUNDS = 5
+
+    # Operators that take one operand.
+    _UNARY = (Operator.NOT, Operator.UADD, Operator.USUB)
+
+    # Instructions that neither read nor write any register. A JUMP isn't
+    # here because a conditional one pops its condition into RESULT.
+    _NO_REGISTERS = (
+        OpCode.CONSTANT, OpCode.CTX, OpCode.END_CTX, OpCode.END_LOOP,
+        OpCode.LOOP, OpCode.NOP, OpCode.OP, OpCode.PUSHQ)
+
+    # Instructions that may read any register but write only the ones listed.
+    _WRITES = {
+        OpCode.COLOR: (Register.DEFAULT, Register.MATRIX),
+        OpCode.DISC: (Register.RESULT,),
+        OpCode.DISCM: (Register.RESULT,),
+        OpCode.DNEXT: (Register.RESULT,),
+        OpCode.DNEXTM: (Register.RESULT,),
+        OpCode.OUT: (),
+        OpCode.PARAM: (),
+        OpCode.PAUSE: (),
+        OpCode.POWER: (),
+        OpCode.PUSH: (),
+        OpCode.WAIT: ()
+    }
+
+    # Instructions after which control doesn't simply go to the next one.
+    _TERMINATORS = (
+        OpCode.END, OpCode.JSR, OpCode.JUMP, OpCode.RETURN, OpCode.STOP)
+
     def __init__(self):
-        self._program = None
         self._frames = None
+        self._report = []
 
     def optimize(self, program: list) -> list:
-        self._frames = [_InstFrame(inst) for inst in program]
-        any_jumps = self._find_jumps()
-        any_push_pop = self._fold_push_pop()
-        if any_push_pop:
-            if any_jumps:
-                self._set_addresses()
-                self._fix_jumps()
-            return [frame.inst for frame in self._frames
-                        if frame.inst.op_code is not OpCode.NOP]
-        return program
+        """
+        Return an optimized copy of program. The passes work on copies of
+        the instructions, so the ones in program are never modified.
+        """
+        self._report = []
+        self._frames = [_InstFrame(inst.copy()) for inst in program]
+        for _ in range(0, Optimizer._MAX_ROUNDS):
+            # Removing code can make room for more improvements, so the
+            # passes are repeated until they stop finding anything.
+            round_change = False
+            for name, opt_pass in (
+                    ('fold_constants', self._fold_constants),
+                    ('fold_push_pop', self._fold_push_pop),
+                    ('thread_jumps', self._thread_jumps),
+                    ('remove_unreachable', self._remove_unreachable),
+                    ('remove_dead_stores', self._remove_dead_stores),
+                    ('remove_redundant_stores',
+                        self._remove_redundant_stores)):
+                before = len(self._frames)
+                self._find_jumps()
+                if opt_pass():
+                    round_change = True
+                    self._compact()
+                self._report.append((name, before, len(self._frames)))
+            if not round_change:
+                break
+        return [frame.inst for frame in self._frames]
+
+    def get_report(self) -> list:
+        """
+        Returns a list of (pass name, instructions before, instructions after)
+        for every pass run by the most recent call to optimize(), in order.
+        """
+        return self._report
+
+    def report_text(self) -> str:
+        return ''.join(
+            '{:24} {:6d} -> {:6d}\n'.format(name, before, after)
+            for name, before, after in self._report)
 
     def _find_jumps(self) -> bool:
         # Returns True if any jumps were found, False otherwise.
         inst_pos = 0
         any_jump = False
+        for frame in self._frames:
+            frame.targeted = False
         for frame in self._frames:
             inst = frame.inst
             if inst.op_code is OpCode.JUMP:
@@ -40,6 +116,95 @@ class Optimizer:
             inst_pos += 1
         return any_jump
 
+    def _fold_constants(self) -> bool:
+        """
+        Evaluate operations on literal values. For example:
+            OpCode.PUSHQ, 2
+            OpCode.PUSHQ, 3
+            OpCode.OP, Operator.MUL
+        becomes:
+            OpCode.PUSHQ, 6
+
+        A conditional jump that tests a literal value either becomes an
+        unconditional jump or goes away altogether.
+        """
+        any_change = False
+        for inst_pos, frame in enumerate(self._frames):
+            inst = frame.inst
+            if inst.op_code is OpCode.OP:
+                any_change |= self._fold_op(inst_pos)
+            elif (inst.op_code is OpCode.JUMP
+                    and inst.param0 is not JumpCondition.ALWAYS):
+                any_change |= self._fold_jump(inst_pos)
+        return any_change
+
+    def _fold_op(self, inst_pos) -> bool:
+        operator = self._frames[inst_pos].inst.param0
+        num_operands = 1 if operator in Optimizer._UNARY else 2
+        operand_pos = self._preceding(inst_pos, num_operands)
+        if operand_pos is None:
+            return False
+        operands = [self._frames[pos].inst.param0 for pos in operand_pos]
+        if not all(Optimizer._is_number(operand) for operand in operands):
+            return False
+
+        vm_math = VmMath(None, None)
+        for operand in operands:
+            vm_math.pushq(operand)
+        try:
+            vm_math.op(operator)
+        except (ArithmeticError, TypeError, ValueError):
+            # Leave it for run time, where the error gets reported.
+            return False
+        value = vm_math.pop_value()
+
+        self._frames[operand_pos[0]].inst.param0 = value
+        for pos in operand_pos[1:]:
+            self._frames[pos].inst.nop()
+        self._frames[inst_pos].inst.nop()
+        return True
+
+    def _fold_jump(self, inst_pos) -> bool:
+        operand_pos = self._preceding(inst_pos, 1)
+        if operand_pos is None:
+            return False
+        value = self._frames[operand_pos[0]].inst.param0
+        if not (Optimizer._is_number(value) or isinstance(value, str)):
+            return False
+
+        jump = self._frames[inst_pos].inst
+        if bool(value) is (jump.param0 is JumpCondition.IF_TRUE):
+            jump.param0 = JumpCondition.ALWAYS
+        else:
+            jump.nop()
+        self._frames[operand_pos[0]].inst.nop()
+        return True
+
+    def _preceding(self, inst_pos, count):
+        """
+        Returns the positions of the count PUSHQ instructions immediately
+        before the one at inst_pos, skipping NOPs. Returns None if they
+        aren't there, or if a jump can land anywhere after the first of them.
+        """
+        result = []
+        pos = inst_pos
+        while len(result) < count:
+            if self._frames[pos].targeted:
+                return None
+            pos -= 1
+            if pos < 0:
+                return None
+            op_code = self._frames[pos].inst.op_code
+            if op_code is OpCode.PUSHQ:
+                result.insert(0, pos)
+            elif op_code is not OpCode.NOP:
+                return None
+        return result
+
+    @staticmethod
+    def _is_number(value) -> bool:
+        return isinstance(value, Number) and not isinstance(value, Enum)
+
     def _fold_push_pop(self) -> bool:
         """
         Replace push followed by immediate pop with move.
@@ -52,37 +217,319 @@ class Optimizer:
 
         Returns True if any changes were make, False otherwise.
         """
-        inst_pos = 0
         any_change = False
-        for frame in self._frames:
+        for inst_pos, frame in enumerate(self._frames[:-1]):
+            inst = frame.inst
+            if inst.op_code not in (OpCode.PUSH, OpCode.PUSHQ):
+                continue
+            # A jump can land on the push, but not on the pop.
+            next_frame = self._frames[inst_pos + 1]
+            next_inst = next_frame.inst
+            if (next_inst.op_code is OpCode.POP
+                    and next_inst.param0 is not None
+                    and not next_frame.targeted):
+                any_change = True
+                if inst.op_code is OpCode.PUSH:
+                    inst.op_code = OpCode.MOVE
+                else:
+                    inst.op_code = OpCode.MOVEQ
+                inst.param1 = next_inst.param0
+                next_inst.op_code = OpCode.NOP
+        return any_change
+
+    def _thread_jumps(self) -> bool:
+        """
+        A jump to an unconditional jump goes straight to the final
+        destination instead. An unconditional jump to a STOP becomes a STOP,
+        and an unconditional jump to the next instruction goes away.
+        """
+        any_change = False
+        for inst_pos, frame in enumerate(self._frames):
             inst = frame.inst
-            if inst.op_code in (OpCode.PUSH, OpCode.PUSHQ):
-                if not frame.targeted:
-                    next_pos = inst_pos + 1
-                    next_frame = self._frames[next_pos]
-                    next_inst = next_frame.inst
-                    if (next_inst.op_code is OpCode.POP
-                            and not next_frame.targeted):
+            if inst.op_code is not OpCode.JUMP:
+                continue
+            target = frame.target
+            visited = {id(frame)}
+            while (target.inst.op_code is OpCode.JUMP
+                    and target.inst.param0 is JumpCondition.ALWAYS
+                    and id(target) not in visited):
+                visited.add(id(target))
+                target = target.target
+            if target is not frame.target:
+                frame.target = target
+                any_change = True
+            if inst.param0 is not JumpCondition.ALWAYS:
+                continue
+            if target.inst.op_code is OpCode.STOP:
+                frame.inst = Instruction(OpCode.STOP)
+                any_change = True
+            elif self._is_next(inst_pos, target):
+                inst.nop()
+                any_change = True
+        return any_change
+
+    def _is_next(self, inst_pos, target) -> bool:
+        # True if nothing but NOPs lies between inst_pos and the target.
+        for frame in self._frames[inst_pos + 1:]:
+            if frame is target:
+                return True
+            if frame.inst.op_code is not OpCode.NOP:
+                return False
+        return False
+
+    def _remove_unreachable(self) -> bool:
+        """
+        Remove code that can't be reached from the start of the program or
+        from the start of a routine, such as anything that follows an
+        unconditional jump or a return and isn't the target of a jump. The
+        markers for the beginning and end of a routine are always kept.
+        """
+        positions = {id(frame): pos for pos, frame in enumerate(self._frames)}
+        ends = self._routine_ends()
+        reachable = set()
+        to_visit = [self._next_pos(-1, ends)]
+        for routine_pos in ends:
+            reachable.add(routine_pos)
+            reachable.add(ends[routine_pos])
+            to_visit.append(routine_pos + 1)
+
+        while len(to_visit) > 0:
+            pos = to_visit.pop()
+            if pos >= len(self._frames) or pos in reachable:
+                continue
+            reachable.add(pos)
+            to_visit.extend(self._successors(pos, positions, ends))
+
+        any_change = False
+        for pos, frame in enumerate(self._frames):
+            if (pos not in reachable
+                    and frame.inst.op_code is not OpCode.NOP):
+                frame.inst.nop()
+                any_change = True
+        return any_change
+
+    def _routine_ends(self) -> dict:
+        # Map the position of each ROUTINE to the position of its END.
+        ends = {}
+        start = None
+        for pos, frame in enumerate(self._frames):
+            inst = frame.inst
+            if inst.op_code is OpCode.ROUTINE:
+                start = pos
+            elif (start is not None and inst.op_code is OpCode.END
+                    and inst.param0 == self._frames[start].inst.param0):
+                ends[start] = pos
+                start = None
+        return ends
+
+    def _successors(self, pos, positions, ends) -> list:
+        inst = self._frames[pos].inst
+        op_code = inst.op_code
+        if op_code is OpCode.JUMP:
+            target = positions[id(self._frames[pos].target)]
+            if inst.param0 is JumpCondition.ALWAYS:
+                return [target]
+            return [target, self._next_pos(pos, ends)]
+        if op_code is OpCode.END:
+            if inst.param0 is Operand.MATRIX:
+                return [self._next_pos(pos, ends)]
+            return []
+        if op_code in (OpCode.RETURN, OpCode.STOP):
+            return []
+        if op_code is OpCode.JSR:
+            # A routine ending with "return" resumes one past the usual
+            # return address.
+            next_pos = self._next_pos(pos, ends)
+            return [next_pos, self._next_pos(next_pos, ends)]
+        return [self._next_pos(pos, ends)]
+
+    def _next_pos(self, pos, ends) -> int:
+        # The main line of the program goes around routine definitions.
+        next_pos = pos + 1
+        while next_pos in ends:
+            next_pos = ends[next_pos] + 1
+        return next_pos
+
+    def _remove_dead_stores(self) -> bool:
+        """
+        Within a basic block, remove a MOVE or MOVEQ to a register that gets
+        overwritten before anything can read it. For example, in
+        "hue 10 hue 20 set all", the first value never gets used.
+        """
+        any_change = False
+        pending = {}
+        for pos, frame in enumerate(self._frames):
+            inst = frame.inst
+            op_code = inst.op_code
+            if self._is_leader(pos):
+                pending.clear()
+
+            if op_code in (OpCode.MOVE, OpCode.MOVEQ, OpCode.POP):
+                if op_code is OpCode.MOVE:
+                    pending.pop(inst.param0, None)
+                dest = Optimizer._dest(inst)
+                if dest is Register.UNIT_MODE:
+                    # Changing the units converts the colors.
+                    pending.clear()
+                elif Optimizer._is_plain_reg(dest):
+                    if dest in pending:
+                        pending.pop(dest).inst.nop()
                         any_change = True
-                        if inst.op_code is OpCode.PUSH:
-                            inst.op_code = OpCode.MOVE
-                        else:
-                            inst.op_code = OpCode.MOVEQ
-                        inst.param1 = next_inst.param0
-                        next_inst.op_code = OpCode.NOP
-            inst_pos += 1
+                    if op_code is not OpCode.POP:
+                        pending[dest] = frame
+            elif op_code is OpCode.PUSH:
+                pending.pop(inst.param0, None)
+            elif (op_code is OpCode.JUMP
+                    and inst.param0 is JumpCondition.ALWAYS):
+                pass
+            elif op_code not in Optimizer._NO_REGISTERS:
+                pending.clear()
         return any_change
 
-    def _set_addresses(self):
+    def _remove_redundant_stores(self) -> bool:
+        """
+        Remove a MOVEQ that puts a value into a register that already
+        contains it on every path leading to that point.
+
+        For example, in a loop over the lights, Register.OPERAND is set to
+        Operand.LIGHT before the loop starts, and again at the bottom of the
+        loop, just before the DNEXT. Nothing in between changes it, so the
+        second MOVEQ can go.
+        """
+        leaders = [
+            pos for pos in range(0, len(self._frames)) if self._is_leader(pos)]
+        ends = self._routine_ends()
+        positions = {id(frame): pos for pos, frame in enumerate(self._frames)}
+        entries = {self._next_pos(-1, ends)}
+        entries.update(start + 1 for start in ends)
+
+        block_ends = {}
+        preds = {leader: [] for leader in leaders}
+        for index, leader in enumerate(leaders):
+            if index + 1 < len(leaders):
+                last = leaders[index + 1] - 1
+            else:
+                last = len(self._frames) - 1
+            block_ends[leader] = last
+            for succ in self._successors(last, positions, ends):
+                if succ in preds:
+                    preds[succ].append(leader)
+
+        # Known register values at the start of each block, worked out by
+        # iterating until nothing changes. None means not reached yet.
+        known_in = {leader: None for leader in leaders}
+        known_out = {leader: None for leader in leaders}
+        any_change = True
+        while any_change:
+            any_change = False
+            for leader in leaders:
+                if leader in entries:
+                    known = {}
+                else:
+                    known = Optimizer._meet(
+                        known_out[pred] for pred in preds[leader])
+                    if known is None:
+                        continue
+                known_in[leader] = dict(known)
+                for frame in self._frames[leader:block_ends[leader] + 1]:
+                    Optimizer._track_known(frame.inst, known)
+                if known != known_out[leader]:
+                    known_out[leader] = known
+                    any_change = True
+
+        any_removed = False
+        for leader in leaders:
+            known = known_in[leader]
+            if known is None:
+                continue
+            for frame in self._frames[leader:block_ends[leader] + 1]:
+                inst = frame.inst
+                if (inst.op_code is OpCode.MOVEQ
+                        and Optimizer._is_plain_reg(inst.param1)
+                        and inst.param1 in known
+                        and Optimizer._same(known[inst.param1], inst.param0)):
+                    inst.nop()
+                    any_removed = True
+                else:
+                    Optimizer._track_known(inst, known)
+        return any_removed
+
+    @staticmethod
+    def _meet(states):
+        # Keep only the values that are the same in every state.
+        result = None
+        for state in states:
+            if state is None:
+                continue
+            if result is None:
+                result = dict(state)
+            else:
+                result = {
+                    reg: value for reg, value in result.items()
+                    if reg in state and Optimizer._same(state[reg], value)}
+        return result
+
+    @staticmethod
+    def _track_known(inst, known) -> None:
+        op_code = inst.op_code
+        if op_code in (OpCode.MOVE, OpCode.MOVEQ, OpCode.POP):
+            dest = Optimizer._dest(inst)
+            if dest is Register.UNIT_MODE:
+                known.clear()
+            elif Optimizer._is_plain_reg(dest):
+                if (op_code is OpCode.MOVEQ
+                        and Optimizer._is_immutable(inst.param0)):
+                    known[dest] = inst.param0
+                else:
+                    known.pop(dest, None)
+        elif op_code in Optimizer._WRITES:
+            for reg in Optimizer._WRITES[op_code]:
+                known.pop(reg, None)
+        elif op_code is OpCode.JUMP:
+            if inst.param0 is not JumpCondition.ALWAYS:
+                known.pop(Register.RESULT, None)
+        elif op_code not in Optimizer._NO_REGISTERS:
+            known.clear()
+
+    def _is_leader(self, pos) -> bool:
+        # True if the instruction at pos starts a basic block.
+        if pos == 0 or self._frames[pos].targeted:
+            return True
+        if self._frames[pos].inst.op_code is OpCode.ROUTINE:
+            return True
+        return self._frames[pos - 1].inst.op_code in (
+            Optimizer._TERMINATORS + (OpCode.ROUTINE,))
+
+    @staticmethod
+    def _dest(inst):
+        return inst.param0 if inst.op_code is OpCode.POP else inst.param1
+
+    @staticmethod
+    def _is_plain_reg(operand) -> bool:
+        return (isinstance(operand, Register)
+                and operand not in (Register.PC, Register.UNIT_MODE))
+
+    @staticmethod
+    def _is_immutable(value) -> bool:
+        return value is None or isinstance(value, (Enum, Number, str))
+
+    @staticmethod
+    def _same(value0, value1) -> bool:
+        return type(value0) is type(value1) and value0 == value1
+
+    def _compact(self) -> None:
+        """
+        Drop the NOPs and recalculate the offsets of the jumps. A jump to
+        an instruction that was removed goes to the next one that wasn't.
+        """
         address = 0
         for frame in self._frames:
-            if frame.inst.op_code is OpCode.NOP:
-                frame.address = None
-            else:
-                frame.address = address
+            frame.address = address
+            if frame.inst.op_code is not OpCode.NOP:
                 address += 1
-
-    def _fix_jumps(self):
         for frame in self._frames:
             if frame.inst.op_code is OpCode.JUMP:
                 frame.inst.param1 = frame.target.address - frame.address
+        self._frames = [
+            _InstFrame(frame.inst) for frame in self._frames
+            if frame.inst.op_code is not OpCode.NOP]
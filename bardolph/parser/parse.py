@@ -274,11 +274,13 @@ class Parser:
         return True
 
     def _var_operand(self) -> bool:
-        name = str(self._current_token)
-        if not self._context.has_symbol_typed(
-                name, SymbolType.CONSTANT, SymbolType.VAR):
+        symbol = self._context.get_symbol(str(self._current_token))
+        if symbol.symbol_type is SymbolType.CONSTANT:
+            self._add_instruction(OpCode.MOVEQ, symbol.value, Register.NAME)
+        elif symbol.symbol_type is SymbolType.VAR:
+            self._add_instruction(OpCode.MOVE, symbol.slot, Register.NAME)
+        else:
             return self.token_error('Undefined: {}')
-        self._add_instruction(OpCode.MOVE, name, Register.NAME)
         return self.next_token()
 
     def _set_units(self) -> bool:
@@ -370,11 +372,11 @@ class Parser:
             return self._array_assignment(dest_name)
         if not self._rvalue(self._code_gen):
             return False
-        self._code_gen.pop(dest_name)
-        self._context.add_variable(dest_name)
+        self._code_gen.pop(self._context.add_variable(dest_name))
         return True
 
     def _array_assignment(self, array_name) -> bool:
+        array_name = self._context.get_slot(array_name)
         op_code = OpCode.DEREF
         while self._current_token == '[':
             if not self._at_rvalue():
@@ -406,13 +408,17 @@ class Parser:
         if self.current_token.is_a(TokenTypes.LITERAL_STRING):
             code_gen.pushq(token_str)
             return self.next_token()
-        if self._context.has_symbol_typed(
-                token_str, SymbolType.VAR, SymbolType.CONSTANT):
-            code_gen.push(token_str)
+        symbol = self._context.get_symbol(token_str)
+        if symbol.symbol_type is SymbolType.CONSTANT:
+            code_gen.pushq(symbol.value)
+            return self.next_token()
+        if symbol.symbol_type is SymbolType.VAR:
+            code_gen.push(symbol.slot)
             return self.next_token()
         return self.token_error('Expected string, got {}')
 
     def _rvalue_array(self, array_name, dest, code_gen) -> bool:
+        array_name = self._context.get_slot(array_name)
         keep_going = True
         op_code = OpCode.DEREF
         while keep_going:
@@ -460,6 +466,7 @@ class Parser:
         if self.current_token != '[':
             return self.token_error(
                 'Excpected opening "[" in array declaration, got: {}')
+        slot = self._context.add_array(name, 0)
         num_dimensions = 0
         while self.current_token == '[':
             num_dimensions += 1
@@ -470,7 +477,7 @@ class Parser:
                     .format(name))
             if not self._rvalue(self._code_gen):
                 return False
-            self._code_gen.add_instruction(OpCode.ARRAY, name, Register.RESULT)
+            self._code_gen.add_instruction(OpCode.ARRAY, slot, Register.RESULT)
             if self.current_token != ']':
                 return self.trigger_error(
                     'Missing  closing "]" in array declaration.')
@@ -507,10 +514,9 @@ class Parser:
         if self._context.in_routine():
             return self.trigger_error('Nested definitions are not allowed.')
 
-        self._context.enter_routine()
-        self._add_instruction(OpCode.ROUTINE, name)
-
         routine = Routine(name)
+        self._context.enter_routine(routine)
+        self._add_instruction(OpCode.ROUTINE, name)
         self._context.add_routine(routine)
         if self._current_token.is_a(TokenTypes.WITH):
             self.next_token()
@@ -543,7 +549,7 @@ class Parser:
         if self._current_token == '[':
             return self._add_array_param(name, routine)
         routine.add_param(name)
-        self._context.add_variable(name)
+        self._context.add_param(name)
         return True
 
     def _add_array_param(self, name: str, routine: Routine) -> bool:
@@ -555,7 +561,7 @@ class Parser:
                 return self.token_error('Param missing closing "]"".')
             self.next_token()
         routine.add_param(name)
-        self._context.add_array(name, depth)
+        self._context.add_param(name, SymbolType.ARRAY, depth)
         return True
 
     def _macro_definition(self, name):
@@ -80,6 +80,8 @@ class TokenTypes(Enum):
             TokenTypes.WHILE, TokenTypes.WAIT)
 
 class Token:
+    __slots__ = ('_token_type', '_content', '_line_number', '_file_name')
+
     def __init__(self,
             token_type, content='', line_number=0, file_name=''):
         self._token_type = token_type
@@ -136,7 +138,7 @@ class Token:
 
     @property
     def file_name(self):
-        return self.file_name
+        return self._file_name
 
     @property
     def is_binop(self):
@@ -11,11 +11,9 @@ def builtin(fn):
 
     @functools.wraps(fn)
     def wrapper(*args):
+        # Parameters occupy the first slots of the frame, in order.
         stack_frame = args[0]
-        param_names = params(fn)
-        actual_params = [
-            stack_frame.get_parameter(name) for name in param_names]
-        return fn(*actual_params)
+        return fn(*stack_frame.get_parameters(len(params(fn))))
     return wrapper
 
 
@@ -21,38 +21,32 @@ class QueryImpl:
         QueryImpl._the_instance = QueryImpl()
 
     @staticmethod
-    @inject(LightSet)
-    def _is_color(name, light_set) -> int:
-        light = light_set.get_light(name)
+    def _is_color(light) -> int:
         return 1 if light is not None and light.is_color() else 0
 
     @staticmethod
-    @inject(LightSet)
-    def _is_matrix(name, light_set) -> int:
-        light = light_set.get_light(name)
+    def _is_matrix(light) -> int:
         return 1 if light is not None and isinstance(light, MatrixLight) else 0
 
     @staticmethod
-    @inject(LightSet)
-    def _is_multizone(name, light_set) -> int:
-        light = light_set.get_light(name)
+    def _is_multizone(light) -> int:
         return 1 if light is not None and isinstance(light, MultizoneLight) else 0
 
     @staticmethod
-    @inject(LightSet)
-    def _height(name, light_set) -> int:
-        light = light_set.get_light(name)
+    def _height(light) -> int:
         return 0 if light is None else light.get_height()
 
     @staticmethod
-    @inject(LightSet)
-    def _width(name, light_set) -> int:
-        light = light_set.get_light(name)
+    def _width(light) -> int:
         return 0 if light is None else light.get_width()
 
-    def query(self, topic, object_name):
+    @inject(LightSet)
+    def query(self, topic, object_name, light_set):
+        # Each function gets the light, or None if there's no such light.
         fn = self._fn_table.get(topic, None)
-        return fn(object_name) if fn is not None else 0
+        if fn is None:
+            return 0
+        return fn(light_set.get_state().get_light(object_name))
 
 
 @builtin
@@ -1,62 +1,113 @@
-from bardolph.vm.array import Array
+from bardolph.vm.slot import Slot
 from bardolph.vm.vm_codes import LoopVar
 
 
 class StackFrame:
-    def __init__(self, parent=None):
+    """
+    Variables live in lists, indexed by the slot numbers the parser assigns.
+    The root frame's list holds the globals.
+
+    Variables can also be accessed by name. Each name is mapped to a slot in
+    the names dictionary belonging to the frame, and a name seen for the first
+    time gets the next free slot.
+    """
+    def __init__(self, parent=None, size=0):
         self.parent = parent
-        self.vars = parent.vars if parent is not None else {}
-        self.constants = parent.constants if parent is not None else None
-        self.globals = parent.globals if parent is not None else self.vars
-        self.params = {}
+        if parent is None:
+            self.root = self
+            self.vars = []
+            self.names = {}
+            self.constants = {}
+        else:
+            self.root = parent.root
+            self.vars = parent.vars
+            self.names = parent.names
+            self.constants = parent.constants
+        self.globals = self.root.vars
+        self.params = [None] * size
+        self.param_names = {}
         self.return_addr = None
 
-    def put_variable(self, index, value) -> None:
-        if index in self.params:
-            dest = self.params
-        elif index in self.globals:
-            dest = self.globals
-        else:
-            dest = self.vars
-        dest[index] = value
+    def put_variable(self, name, value) -> None:
+        index = self.names.get(name)
+        if index is not None:
+            self.vars[index] = value
+            return
+        index = self.root.names.get(name)
+        if index is not None:
+            self.globals[index] = value
+            return
+        self.names[name] = len(self.vars)
+        self.vars.append(value)
 
     def put_constant(self, name: str, value) -> None:
         self.constants[name] = value
 
-    def get_variable(self, identifier):
-        for place in (self.constants, self.vars, self.params, self.globals):
-            if identifier in place:
-                return place[identifier]
+    def get_variable(self, name):
+        if name in self.constants:
+            return self.constants[name]
+        index = self.names.get(name)
+        if index is not None:
+            return self.vars[index]
+        index = self.root.names.get(name)
+        if index is not None:
+            return self.globals[index]
         return None
 
     def get_parameter(self, name):
-        return self.params.get(name, None)
+        index = self.names.get(name)
+        return None if index is None else self.vars[index]
+
+    def get_parameters(self, count) -> list:
+        return self.vars[:count]
+
+    def put_param(self, name, value) -> None:
+        index = self.param_names.get(name)
+        if index is None:
+            index = len(self.param_names)
+            self.param_names[name] = index
+        StackFrame._put_at(self.params, index, value)
+
+    @staticmethod
+    def _put_at(dest, index, value) -> None:
+        try:
+            dest[index] = value
+        except IndexError:
+            dest.extend([None] * (index - len(dest) + 1))
+            dest[index] = value
 
 
 class LoopFrame(StackFrame):
+    _loop_index = {loop_var: index for index, loop_var in enumerate(LoopVar)}
+
     def __init__(self, parent):
         super().__init__(parent)
-        self._loop_var = {}
+        self._loop_var = [None] * len(LoopVar)
 
     def get_loop_var(self, index):
-        return self._loop_var.get(index, None)
+        return self._loop_var[LoopFrame._loop_index[index]]
 
     def set_loop_var(self, index, value):
-        self._loop_var[index] = value
+        self._loop_var[LoopFrame._loop_index[index]] = value
 
 
 class CallStack:
     """
     The CallStack is initialzed with a root-level StackFrame.
 
-    Prior to a JSR, a CTX command leads to a call to push_stack_frame(), which
+    Prior to a JSR, a CTX command leads to a call to new_frame(), which
     pushes self._top onto the stack and creates a new instance of StackFrame,
-    therefore establishing a new context.
+    therefore establishing a new context. The CTX carries the number of slots
+    the routine needs.
 
-    Also prior to the JSR, optional PARAM instructions may place values into the
-    current context (self._top) as named variables.
+    Also prior to the JSR, optional PARAM instructions place values into the
+    parameter slots of the new context (self._top). The parameters become the
+    routine's local variables once it's entered.
 
     After the JSR. an END_CTX command pops the top of the stack into self._top.
+
+    Variables are normally identified by a Slot, which the parser assigns, but
+    they can also be accessed by name.
     """
 
     def __init__(self):
@@ -64,26 +115,63 @@ class CallStack:
 
     def reset(self) -> None:
         self._top = StackFrame()
-        self._top.constants = {}
+        self._globals = self._top.vars
 
     def get_top(self) -> StackFrame:
         return self._top
 
-    def new_frame(self):
-        self._top = StackFrame(self._top)
+    def reserve_globals(self, names) -> None:
+        """
+        names: dict mapping the name of each global to its slot, as found in
+        the compiled program. Makes sure that all of the slots exist.
+        """
+        root = self._top.root
+        root.names.update(names)
+        if len(names) > 0:
+            StackFrame._put_at(self._globals, max(names.values()), None)
+
+    def new_frame(self, size=0):
+        self._top = StackFrame(self._top, size)
         return self._top
 
     def put_param(self, name, value=None) -> None:
-        self._top.params[name] = value
+        if isinstance(name, Slot):
+            StackFrame._put_at(self._top.params, name.index, value)
+        else:
+            self._top.put_param(name, value)
 
     def enter_routine(self) -> None:
         self._top.vars = self._top.params
+        self._top.names = self._top.param_names
 
     def exit_routine(self) -> None:
         self._top = self._top.parent
 
+    def get_global(self, index):
+        try:
+            return self._globals[index]
+        except IndexError:
+            return None
+
+    def put_global(self, index, value) -> None:
+        StackFrame._put_at(self._globals, index, value)
+
+    def get_local(self, index):
+        try:
+            return self._top.vars[index]
+        except IndexError:
+            return None
+
+    def put_local(self, index, value) -> None:
+        StackFrame._put_at(self._top.vars, index, value)
+
     def put_variable(self, index, value) -> None:
-        if isinstance(index, LoopVar):
+        if isinstance(index, Slot):
+            if index.is_global:
+                StackFrame._put_at(self._globals, index.index, value)
+            else:
+                StackFrame._put_at(self._top.vars, index.index, value)
+        elif isinstance(index, LoopVar):
             self._top.set_loop_var(index, value)
         else:
             self._top.put_variable(index, value)
@@ -92,6 +180,10 @@ class CallStack:
         self._top.put_constant(name, value)
 
     def get_variable(self, index):
+        if isinstance(index, Slot):
+            if index.is_global:
+                return self.get_global(index.index)
+            return self.get_local(index.index)
         if isinstance(index, LoopVar):
             return self._top.get_loop_var(index)
         return self._top.get_variable(index)
@@ -116,4 +208,4 @@ class CallStack:
 
     def unwind_loops(self) -> None:
         while isinstance(self._top, LoopFrame):
-            self._top = self.parent
+            self._top = self._top.parent
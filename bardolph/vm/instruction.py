@@ -6,6 +6,8 @@ from .vm_codes import OpCode
 
 
 class Instruction:
+    __slots__ = ('op_code', 'param0', 'param1')
+
     def __init__(self, op_code, param0=None, param1=None):
         self.op_code = op_code
         self.param0 = param0
@@ -33,6 +35,9 @@ class Instruction:
                 and self.param0 == other.param0
                 and self.param1 == other.param1)
 
+    def copy(self):
+        return Instruction(self.op_code, self.param0, self.param1)
+
     def nop(self):
         self.op_code = OpCode.NOP
 
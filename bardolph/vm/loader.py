@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
 import argparse
-import copy ###
 import logging
 
 from bardolph.controller.routine import Routine, RuntimeRoutine
@@ -13,47 +12,71 @@ if __name__ == '__main__':
 from bardolph.lib.injection import inject
 from bardolph.runtime import i_runtime
 from bardolph.vm.instruction import Instruction
+from bardolph.vm.program import Program
+from bardolph.vm.slot import Slot
 from bardolph.vm.vm_codes import JumpCondition, OpCode
 
 
 class Loader:
+    """
+    Turns the instructions generated by the parser into a Program. The code
+    is optimized, and every routine is moved into a segment of its own,
+    which the program jumps over when it starts.
+    """
     def __init__(self):
         self._main_segment = []
         self._routine_segment = []
         self._routines = {}
+        self._globals = {}
+        self._optimizer = Optimizer()
+        self._program = Program()
         self._iter = None
 
     def _next_inst(self):
         if self._iter is None:
             return None
         try:
-            return next(self._iter)
+            inst = next(self._iter)
         except StopIteration:
             self._iter = None
             return None
-
-    def load(self, instructions: list):
+        self._add_globals(inst)
+        return inst
+
+    def _add_globals(self, inst) -> None:
+        for param in (inst.param0, inst.param1):
+            if isinstance(param, Slot) and param.is_global:
+                self._globals[param.name] = param.index
+
+    def load(self, instructions: list) -> Program:
+        """
+        The Optimizer works on copies, so instructions is left as it was.
+        """
         self._main_segment.clear()
         self._routine_segment.clear()
         self._routines.clear()
-        self._load_runtime()
+        self._globals.clear()
         if instructions is not None:
-            original = copy.deepcopy(instructions) ###
-            optimized = Optimizer().optimize(instructions)
-            self._iter = iter(optimized)
+            self._iter = iter(self._optimizer.optimize(instructions))
             inst = self._next_inst()
             while inst is not None:
                 if inst.op_code is OpCode.ROUTINE:
                     rtn = self._load_routine(inst)
-                    self._routines[rtn.name] = rtn
+                    self._routines[rtn.name] = rtn.get_address()
                 else:
                     self._main_segment.append(inst)
                 inst = self._next_inst()
+        self._program = Program(
+            self._build_code(), self._routines, self._globals)
+        return self._program
 
+    @staticmethod
     @inject(i_runtime.Runtime)
-    def _load_runtime(self, runtime):
-        for name, fn in runtime.get_fns().items():
-            self._routines[name] = RuntimeRoutine(name, fn)
+    def runtime_routines(runtime) -> dict:
+        return {
+            name: RuntimeRoutine(name, fn)
+            for name, fn in runtime.get_fns().items()
+        }
 
     def _load_routine(self, current_inst):
         routine_name = current_inst.param0
@@ -71,7 +94,7 @@ class Loader:
         new_routine.set_return(len(self._routine_segment) + 1)
         return new_routine
 
-    def get_code(self):
+    def _build_code(self):
         if len(self._routine_segment) == 0:
             return self._main_segment
         ret_value = [Instruction(
@@ -80,13 +103,38 @@ class Loader:
         ret_value.extend(self._main_segment)
         return ret_value
 
-    def get_routines(self):
-        return self._routines
+    def get_program(self) -> Program:
+        return self._program
+
+    def get_code(self) -> tuple:
+        return self._program.code
+
+    def get_routines(self) -> dict:
+        """
+        Map the name of every routine, including the ones supplied by the
+        runtime, to an instance of Routine.
+        """
+        routines = Loader.runtime_routines()
+        for name, address in self._program.routines.items():
+            routines[name] = Routine(name, address)
+        return routines
+
+    def get_optimizer_report(self) -> str:
+        return self._optimizer.report_text()
+
+    def get_globals(self) -> dict:
+        """
+        Map the name of every global variable in the program to its slot.
+        """
+        return self._program.globals
 
 
 def main():
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument('file', help='name of the script file')
+    arg_parser.add_argument(
+        '-r', '--report', help='print instruction counts per optimizer pass',
+        action='store_true')
     args = arg_parser.parse_args()
 
     logging.basicConfig(
@@ -94,18 +142,16 @@ def main():
         format='%(filename)s(%(lineno)d) %(funcName)s(): %(message)s')
 
     parser = Parser()
-    parser_code = parser.parse_file(args.file)
-
-    loader = Loader()
-    loader.load(parser_code)
-    if loader.get_code() is not None:
-        inst_num = 0
-        for inst in loader.get_code():
-            print('{:5d}: {}'.format(inst_num, inst))
-            inst_num += 1
-    else:
+    if not parser.parse_file(args.file):
         print("Error parsing: {}".format(parser.get_errors()))
+        return
 
+    loader = Loader()
+    program = loader.load(parser.get_program())
+    for inst_num, inst in enumerate(program):
+        print('{:5d}: {}'.format(inst_num, inst))
+    if args.report:
+        print(loader.get_optimizer_report(), end='')
 
 if __name__ == '__main__':
     main()
@@ -1,4 +1,7 @@
+import copy
+import functools
 import logging
+import operator
 import traceback
 
 from bardolph.controller import units
@@ -7,7 +10,7 @@ from bardolph.controller.color_matrix import Rect
 from bardolph.controller.get_key import getch
 from bardolph.controller.i_controller import (LightSet, MatrixLight,
                                               MultizoneLight)
-from bardolph.controller.routine import RuntimeRoutine
+from bardolph.controller.routine import Routine, RuntimeRoutine
 from bardolph.controller.units import UnitMode
 from bardolph.lib.i_lib import Clock, TimePattern
 from bardolph.lib.injection import inject, provide
@@ -15,6 +18,8 @@ from bardolph.lib.symbol import Symbol
 from bardolph.vm.array import Array
 from bardolph.vm.call_stack import CallStack
 from bardolph.vm.loader import Loader
+from bardolph.vm.program import Program
+from bardolph.vm.slot import Slot
 from bardolph.vm.vm_codes import (JumpCondition, LoopVar, OpCode, Operand,
                                   Register, SetOp)
 from bardolph.vm.vm_discover import VmDiscover
@@ -23,6 +28,21 @@ from bardolph.vm.vm_math import VmMath
 
 
 class Registers:
+    """
+    The register file. Each register is a slot, and the accessors for every
+    Register enum are looked up once, after the class is defined, so access
+    by enum doesn't need to build an attribute name each time.
+    """
+    __slots__ = (
+        'blue', 'brightness', 'default', 'disc_forward', 'duration',
+        'first_column', 'first_row', 'first_zone', 'green', 'hue', 'kelvin',
+        'last_column', 'last_row', 'last_zone', 'mat_body', 'mat_tip',
+        'matrix', 'name', 'operand', 'pc', 'power', 'red', 'result',
+        'saturation', 'time', 'unit_mode', '_color_view')
+
+    _getters = {}
+    _setters = {}
+
     def __init__(self):
         self.blue = 0.0
         self.brightness = 0.0
@@ -38,6 +58,8 @@ class Registers:
         self.last_column = None
         self.last_row = None
         self.last_zone = 0
+        self.mat_body = None
+        self.mat_tip = None
         self.matrix = None
         self.name = None
         self.operand = Operand.NULL
@@ -48,12 +70,41 @@ class Registers:
         self.saturation = 0.0
         self.time = 0.0  # ms.
         self.unit_mode = UnitMode.LOGICAL
+        self._color_view = [0.0, 0.0, 0.0, 0.0]
+
+    @staticmethod
+    def getter(reg):
+        # Function that takes a Registers and returns the value of reg.
+        return Registers._getters[reg]
+
+    @staticmethod
+    def setter(reg):
+        # Function that takes a Registers and a value and stores it in reg.
+        return Registers._setters[reg]
 
     def get_color(self):
         if self.unit_mode is not UnitMode.RGB:
             return [self.hue, self.saturation, self.brightness, self.kelvin]
         return [self.red, self.green, self.blue, self.kelvin]
 
+    def color_view(self):
+        """
+        Same as get_color(), except that the list belongs to the register file
+        and is overwritten by the next call. Use it only where the color is
+        consumed right away and not retained.
+        """
+        color = self._color_view
+        if self.unit_mode is not UnitMode.RGB:
+            color[0] = self.hue
+            color[1] = self.saturation
+            color[2] = self.brightness
+        else:
+            color[0] = self.red
+            color[1] = self.green
+            color[2] = self.blue
+        color[3] = self.kelvin
+        return color
+
     def store_color(self, color) -> None:
         if self.unit_mode is not UnitMode.RGB:
             self.hue, self.saturation, self.brightness, self.kelvin = color
@@ -61,10 +112,10 @@ class Registers:
             self.red, self.green, self.blue, self.kelvin = color
 
     def get_by_enum(self, reg):
-        return getattr(self, reg.name.lower())
+        return Registers._getters[reg](self)
 
     def set_by_enum(self, reg, value):
-        setattr(self, reg.name.lower(), value)
+        Registers._setters[reg](self, value)
 
     def reset(self):
         self.__init__()
@@ -73,6 +124,12 @@ class Registers:
         return 65535 if self.power else 0
 
 
+Registers._getters.update({
+    reg: operator.attrgetter(reg.name.lower()) for reg in Register})
+Registers._setters.update({
+    reg: getattr(Registers, reg.name.lower()).__set__ for reg in Register})
+
+
 class MachineState:
     def __init__(self, reg, call_stack):
         self.reg = reg
@@ -80,11 +137,24 @@ class MachineState:
 
 
 class Machine:
+    # Operands of these instructions are passed to their handlers.
+    _ONE_PARAM = (
+        OpCode.CTX, OpCode.DISCM, OpCode.DNEXT, OpCode.END, OpCode.JSR,
+        OpCode.OP, OpCode.POP, OpCode.PUSH, OpCode.PUSHQ)
+    _TWO_PARAM = (
+        OpCode.ARRAY, OpCode.CONSTANT, OpCode.DEREF, OpCode.DNEXTM,
+        OpCode.INDEX, OpCode.JUMP, OpCode.MOVE, OpCode.MOVEQ, OpCode.OUT,
+        OpCode.PARAM, OpCode.TIME_PATTERN)
+
+    # These instructions set the program counter themselves.
+    _NO_ADVANCE = (OpCode.END, OpCode.JSR, OpCode.JUMP)
+
     def __init__(self):
         self._cue_time = 0
         self._clock = provide(Clock)
         self._routines = {}
-        self._program = []
+        self._program = Program()
+        self._code = []
         self._reg = Registers()
         self._call_stack = CallStack()
         self._vm_io = VmIo(self._call_stack, self._reg)
@@ -92,6 +162,9 @@ class Machine:
         self._vm_discover = VmDiscover(self._call_stack, self._reg)
         self._enable_pause = True
         self._keep_running = True
+        self._stop_requested = False
+        self._sliced = False
+        self._wake_time = None
         excluded = (OpCode.STOP, OpCode.ROUTINE)
         op_codes = [code for code in OpCode if code not in excluded]
         self._fn_table = {
@@ -107,27 +180,22 @@ class Machine:
         self._call_stack.reset()
         self._vm_math.reset()
         self._keep_running = True
+        self._stop_requested = False
         self._enable_pause = True
 
     def run(self, program) -> None:
-        loader = Loader()
-        loader.load(program)
-        self._routines = loader.get_routines()
-        self._program = loader.get_code()
-        self._keep_running = True
+        """
+        program: a Program, which is only read from, or a list of
+        instructions from the parser, which is loaded first.
+        """
+        self._load(program)
+        self._sliced = False
 
         logging.debug('Starting to execute.')
         self._clock.start()
-        program_len = len(self._program)
+        program_len = len(self._code)
         try:
-            while self._keep_running and self._reg.pc < program_len:
-                inst = self._program[self._reg.pc]
-                if inst.op_code == OpCode.STOP:
-                    break
-                fn = self._fn_table[inst.op_code]
-                fn()
-                if inst.op_code not in (OpCode.END, OpCode.JSR, OpCode.JUMP):
-                    self._reg.pc += 1
+            self._execute()
             self._clock.stop()
             self._vm_io.flush()
             logging.debug(
@@ -139,7 +207,302 @@ class Machine:
             logging.error("Script stopped due to {} at instruction {}"
                           .format(ex, self._reg.pc))
 
+    def start(self, program) -> None:
+        """
+        Prepare to run program a slice at a time by calling resume(), so that
+        one thread can take turns running any number of machines. Instead of
+        blocking, a wait ends the slice.
+        """
+        self._load(program)
+        self._sliced = True
+        self._wake_time = None
+        logging.debug('Starting to execute in slices.')
+        self._clock.start()
+
+    def resume(self):
+        """
+        Run the program started by start() until it waits or ends. Returns
+        when to resume again, in terms of time.monotonic(), or None if the
+        program is done.
+        """
+        self._wake_time = None
+        self._keep_running = True
+        if self._stop_requested:
+            return self._finish_slices()
+        try:
+            self._execute()
+        except Exception as ex:
+            logging.debug(traceback.format_exc())
+            logging.error("Script stopped due to {} at instruction {}"
+                          .format(ex, self._reg.pc))
+            return None
+        if self._wake_time is None or self._stop_requested:
+            return self._finish_slices()
+        return self._wake_time
+
+    def _finish_slices(self) -> None:
+        self._clock.stop()
+        self._vm_io.flush()
+        logging.debug('Stopped, _pc = {}'.format(self._reg.pc))
+
+    def _load(self, program) -> None:
+        if not isinstance(program, Program):
+            program = Loader().load(program)
+        self._program = program
+        self._bind_routines(program.routines.items())
+        self._call_stack.reserve_globals(program.globals)
+        self._code = [self._decode(inst) for inst in program.code]
+        self._keep_running = not self._stop_requested
+
+    def run_native(self, blocks, routines, global_vars=None) -> None:
+        """
+        Run a program produced by NativeGen. blocks maps an address to the
+        function for the basic block that starts there; routines contains
+        the name and address of each routine defined by the script, and
+        global_vars maps the name of each global variable to its slot.
+        """
+        self._program = Program()
+        self._bind_routines(routines)
+        self._call_stack.reserve_globals(global_vars or {})
+        self._code = []
+        self._keep_running = True
+
+        logging.debug('Starting to execute native code.')
+        self._clock.start()
+        try:
+            self._execute_native(blocks)
+            self._clock.stop()
+            self._vm_io.flush()
+            logging.debug('Stopped, _keep_running = {}, _pc = {}'.format(
+                self._keep_running, self._reg.pc))
+        except Exception as ex:
+            logging.debug(traceback.format_exc())
+            logging.error("Script stopped due to {} at block {}"
+                          .format(ex, self._reg.pc))
+
+    def _bind_routines(self, routines) -> None:
+        """
+        routines: (name, address) for every routine defined by the script.
+        """
+        self._routines = Loader.runtime_routines()
+        for name, address in routines:
+            self._routines[name] = Routine(name, address)
+
+    def _execute_native(self, blocks) -> None:
+        reg = self._reg
+        vm_math = self._vm_math
+        call_stack = self._call_stack
+        global_vars = call_stack.get_top().globals
+        block = blocks.get(reg.pc)
+        while self._keep_running and block is not None:
+            reg.pc = block(self, reg, vm_math, call_stack, global_vars)
+            block = blocks.get(reg.pc)
+
+    def _execute(self) -> None:
+        """
+        Each element of self._code is a callable with the operands of its
+        instruction already bound to it. Every one of them is responsible for
+        updating the program counter.
+        """
+        reg = self._reg
+        code = self._code
+        program_len = len(code)
+        while self._keep_running and reg.pc < program_len:
+            code[reg.pc]()
+
+    def _decode(self, inst):
+        """
+        Turn an instruction into a callable that takes no parameters. The most
+        frequently executed instructions get specialized closures; everything
+        else goes through the generic handler with its operands pre-bound.
+        """
+        op_code = inst.op_code
+        decoder = {
+            OpCode.JSR: self._decode_jsr,
+            OpCode.JUMP: self._decode_jump,
+            OpCode.MOVE: self._decode_move,
+            OpCode.MOVEQ: self._decode_moveq,
+            OpCode.NOP: self._decode_nop,
+            OpCode.END_CTX: self._decode_nop,
+            OpCode.OP: self._decode_op,
+            OpCode.POP: self._decode_pop,
+            OpCode.PUSH: self._decode_push,
+            OpCode.PUSHQ: self._decode_pushq,
+            OpCode.ROUTINE: self._decode_nop,
+            OpCode.STOP: self._decode_stop
+        }.get(op_code)
+        if decoder is not None:
+            return decoder(inst)
+
+        fn = self._fn_table[op_code]
+        if op_code in Machine._TWO_PARAM:
+            fn = functools.partial(fn, inst.param0, inst.param1)
+        elif op_code in Machine._ONE_PARAM:
+            fn = functools.partial(fn, inst.param0)
+        if op_code in Machine._NO_ADVANCE:
+            return fn
+        return self._advancing(fn)
+
+    def _advancing(self, fn):
+        reg = self._reg
+        def step():
+            fn()
+            reg.pc += 1
+        return step
+
+    def _decode_stop(self, _):
+        def step():
+            self._keep_running = False
+        return step
+
+    def _decode_nop(self, _):
+        reg = self._reg
+        def step():
+            reg.pc += 1
+        return step
+
+    def _decode_jsr(self, inst):
+        address = self._program.get_address(inst.param0)
+        if address is None:
+            return functools.partial(self._jsr, inst.param0)
+
+        reg = self._reg
+        call_stack = self._call_stack
+        def step():
+            call_stack.enter_routine()
+            call_stack.set_return(reg.pc + 1)
+            reg.pc = address
+        return step
+
+    def _decode_jump(self, inst):
+        reg = self._reg
+        offset = inst.param1
+        if inst.param0 is JumpCondition.ALWAYS:
+            def step():
+                reg.pc += offset
+            return step
+
+        pop = self._vm_math.pop
+        jump_if_true = inst.param0 is not JumpCondition.IF_FALSE
+        def step():
+            pop(Register.RESULT)
+            if bool(reg.result) is jump_if_true:
+                reg.pc += offset
+            else:
+                reg.pc += 1
+        return step
+
+    def _decode_push(self, inst):
+        srce = inst.param0
+        if isinstance(srce, Register) and srce is not Register.UNIT_MODE:
+            reg = self._reg
+            push = self._vm_math.push_value
+            get = Registers.getter(srce)
+            def step():
+                push(get(reg))
+                reg.pc += 1
+            return step
+        if isinstance(srce, Slot):
+            reg = self._reg
+            push = self._vm_math.push_value
+            get = self._slot_getter(srce)
+            index = srce.index
+            def step():
+                push(get(index))
+                reg.pc += 1
+            return step
+        return self._advancing(functools.partial(self._push, srce))
+
+    def _decode_pushq(self, inst):
+        reg = self._reg
+        push = self._vm_math.pushq
+        value = inst.param0
+        def step():
+            push(value)
+            reg.pc += 1
+        return step
+
+    def _decode_pop(self, inst):
+        reg = self._reg
+        dest = inst.param0
+        if isinstance(dest, Register):
+            pop = self._vm_math.pop_value
+            put = Registers.setter(dest)
+            def step():
+                put(reg, pop())
+                reg.pc += 1
+            return step
+        if isinstance(dest, Slot):
+            pop = self._vm_math.pop_value
+            put = self._slot_setter(dest)
+            index = dest.index
+            def step():
+                put(index, pop())
+                reg.pc += 1
+            return step
+        return self._advancing(functools.partial(self._pop, dest))
+
+    def _decode_op(self, inst):
+        return self._advancing(self._vm_math.op_fn(inst.param0))
+
+    def _decode_move(self, inst):
+        srce, dest = inst.param0, inst.param1
+        if isinstance(srce, Slot) and Machine._is_plain_reg(dest):
+            reg = self._reg
+            get = self._slot_getter(srce)
+            put = Registers.setter(dest)
+            index = srce.index
+            def step():
+                put(reg, get(index))
+                reg.pc += 1
+            return step
+        if Machine._is_plain_reg(srce) and isinstance(dest, Slot):
+            reg = self._reg
+            get = Registers.getter(srce)
+            put = self._slot_setter(dest)
+            index = dest.index
+            def step():
+                put(index, get(reg))
+                reg.pc += 1
+            return step
+        return self._advancing(functools.partial(self._move, srce, dest))
+
+    def _decode_moveq(self, inst):
+        value, dest = inst.param0, inst.param1
+        if isinstance(dest, Register) and dest is not Register.UNIT_MODE:
+            reg = self._reg
+            put = Registers.setter(dest)
+            def step():
+                put(reg, value)
+                reg.pc += 1
+            return step
+        if isinstance(dest, Slot):
+            reg = self._reg
+            put = self._slot_setter(dest)
+            index = dest.index
+            def step():
+                put(index, value)
+                reg.pc += 1
+            return step
+        return self._advancing(functools.partial(self._moveq, value, dest))
+
+    @staticmethod
+    def _is_plain_reg(operand) -> bool:
+        return (isinstance(operand, Register)
+                and operand is not Register.UNIT_MODE)
+
+    def _slot_getter(self, slot):
+        if slot.is_global:
+            return self._call_stack.get_global
+        return self._call_stack.get_local
+
+    def _slot_setter(self, slot):
+        if slot.is_global:
+            return self._call_stack.put_global
+        return self._call_stack.put_local
+
     def stop(self) -> None:
+        self._stop_requested = True
         self._keep_running = False
         self._clock.stop()
 
@@ -156,7 +519,7 @@ class Machine:
     def _param_value(self, value):
         if isinstance(value, Register):
             return self._reg.get_by_enum(value)
-        elif isinstance(value, (str, LoopVar)):
+        elif isinstance(value, (Slot, str, LoopVar)):
             return self._call_stack.get_variable(value)
         return value
 
@@ -191,16 +554,14 @@ class Machine:
 
     @inject(LightSet)
     def _color_all(self, light_set) -> None:
-        color = self._as_raw_color(self._reg.get_color())
+        color = self._raw_color()
         duration = self._as_raw_time(self._reg.duration)
         light_set.set_color_all_lights(color, duration)
 
     def _color_light(self) -> None:
         light = self._get_named_light()
         if light is not None:
-            light.set_color(
-                self._as_raw_color(self._reg.get_color()),
-                self._as_raw_time(self._reg.duration))
+            self._color_multiple((light.get_name(),))
 
     def _color_matrix(self) -> None:
         color = self._reg.get_color()
@@ -211,25 +572,27 @@ class Machine:
                 self._reg.first_column, self._reg.last_column)
             mat.overlay_color(rect, color)
 
-    def _color_matrix_light(self) -> None:
+    @inject(LightSet)
+    def _color_matrix_light(self, light_set) -> None:
         light = self._get_named_light()
         if light is not None:
             mat = self._as_raw_matrix(self._reg.matrix)
             if mat.height > 0 and mat.width > 0:
                 mat.find_replace(None, self._reg.default or [0, 0, 0, 0])
                 duration = self._as_raw_time(self._reg.duration)
-                light.set_matrix(mat, duration)
+                light_set.set_light_matrix(light, mat, duration)
 
-    def _color_mz_light(self) -> None:
+    @inject(LightSet)
+    def _color_mz_light(self, light_set) -> None:
         light = self._get_named_light()
         if light is not None and self._zone_check(light):
             start_index = self._reg.first_zone
             end_index = self._reg.last_zone
             if end_index is None:
                 end_index = start_index
-            light.set_zone_colors(
-                start_index, end_index + 1,
-                self._as_raw_color(self._reg.get_color()),
+            light_set.set_light_zone_colors(
+                light, start_index, end_index + 1,
+                self._raw_color(),
                 self._as_raw_time(self._reg.duration))
 
     @inject(LightSet)
@@ -238,8 +601,7 @@ class Machine:
         if light_names is None:
             logging.warning("Unknown group: {}".format(self._reg.name))
         else:
-            self._color_multiple(
-                [light_set.get_light(name) for name in light_names])
+            self._color_multiple(light_names)
 
     @inject(LightSet)
     def _color_location(self, light_set) -> None:
@@ -247,18 +609,17 @@ class Machine:
         if light_names is None:
             logging.warning("Unknown location: {}".format(self._reg.name))
         else:
-            self._color_multiple(
-                [light_set.get_light(name) for name in light_names])
+            self._color_multiple(light_names)
 
-    def _color_multiple(self, lights) -> None:
-        color = self._as_raw_color(self._reg.get_color())
+    @inject(LightSet)
+    def _color_multiple(self, light_names, light_set) -> None:
+        color = self._raw_color()
         duration = self._as_raw_time(self._reg.duration)
-        for light in lights:
-            light.set_color(color, duration)
+        light_set.set_color_lights(light_names, color, duration)
 
     def _color_default(self) -> None:
         # The "default" register must always contain raw values.
-        self._reg.default = self._as_raw_color(self._reg.get_color())
+        self._reg.default = self._raw_color()
 
     def _power(self) -> None:
         {
@@ -279,8 +640,9 @@ class Machine:
         if light is None:
             Machine._report_missing(self._reg.name)
         else:
-            duration = self._as_raw_time(self._reg.duration)
-            light.set_power(self._reg.get_power(), duration)
+            light_set.set_power_lights(
+                (light.get_name(),), self._reg.get_power(),
+                self._as_raw_time(self._reg.duration))
 
     @inject(LightSet)
     def _power_group(self, light_set) -> None:
@@ -289,8 +651,7 @@ class Machine:
             logging.warning(
                 'Power invoked for unknown group "{}"'.format(self._reg.name))
         else:
-            self._power_multiple(
-                [light_set.get_light(name) for name in light_names])
+            self._power_multiple(light_names)
 
     @inject(LightSet)
     def _power_location(self, light_set) -> None:
@@ -299,13 +660,12 @@ class Machine:
             logging.warning(
                 "Power invoked for unknown location: {}".format(self._reg.name))
         else:
-            self._power_multiple(
-                [light_set.get_light(name) for name in light_names])
+            self._power_multiple(light_names)
 
-    def _power_multiple(self, lights) -> None:
-        power = self._reg.get_power()
-        for light in lights:
-            light.set_power(power, self._reg.duration)
+    @inject(LightSet)
+    def _power_multiple(self, light_names, light_set) -> None:
+        light_set.set_power_lights(
+            light_names, self._reg.get_power(), self._reg.duration)
 
     @inject(LightSet)
     def _get_color(self, light_set) -> None:
@@ -321,31 +681,27 @@ class Machine:
                 color = light.get_color()
                 self._color_to_reg(self._assure_units(color))
 
-    def _ctx(self) -> None:
-        self._call_stack.new_frame()
+    def _ctx(self, frame_size) -> None:
+        self._call_stack.new_frame(frame_size or 0)
 
     def _end_ctx(self) -> None:
         pass
 
-    def _param(self) -> None:
+    def _param(self, name, value) -> None:
         """
         param instruction: the name of the parameter is in param0, and its
         value is in param1. If the value is a Symbol or Register, it needs to
         be dereferenced.
         """
-        inst = self.current_inst
-        value = inst.param1
         if isinstance(value, Symbol):
             value = self._call_stack.get_variable(value.name)
         elif isinstance(value, Register):
             value = self._reg.get_by_enum(value)
-        self._call_stack.put_param(inst.param0, value)
+        self._call_stack.put_param(name, value)
 
-    def _jsr(self) -> None:
+    def _jsr(self, routine_name) -> None:
         self._call_stack.enter_routine()
-        inst = self.current_inst
         self._call_stack.set_return(self._reg.pc + 1)
-        routine_name = inst.param0
         rtn = self._routines.get(routine_name, None)
         if isinstance(rtn, RuntimeRoutine):
             self._vm_math.pushq(rtn.invoke(self._call_stack.get_top()))
@@ -353,8 +709,8 @@ class Machine:
         else:
             self._reg.pc = rtn.get_address()
 
-    def _end(self) -> None:
-        if self.current_inst.param0 is Operand.MATRIX:
+    def _end(self, name) -> None:
+        if name is Operand.MATRIX:
             self._reg.pc += 1
         else:
             self._return()
@@ -364,15 +720,14 @@ class Machine:
         self._reg.pc = self._call_stack.get_return()
         self._call_stack.exit_routine()
 
-    def _jump(self) -> None:
-        inst = self.current_inst
-        if inst.param0 is JumpCondition.ALWAYS:
-            self._reg.pc += inst.param1
+    def _jump(self, condition, offset) -> None:
+        if condition is JumpCondition.ALWAYS:
+            self._reg.pc += offset
         else:
             self._vm_math.pop(Register.RESULT)
             if (bool(self._reg.result) ^
-                    (inst.param0 is JumpCondition.IF_FALSE)):
-                self._reg.pc += inst.param1
+                    (condition is JumpCondition.IF_FALSE)):
+                self._reg.pc += offset
             else:
                 self._reg.pc += 1
 
@@ -399,29 +754,25 @@ class Machine:
             width = light.get_width() or 0
         self._reg.matrix = ColorMatrix.new_from_constant(height, width, None)
 
-    def _array(self):
-        array_name = self.current_inst.param0
-        array_len = self._param_value(self.current_inst.param1)
-        stack_top = self._call_stack.get_top()
-        var = stack_top.get_variable(array_name)
+    def _array(self, array_name, array_len):
+        array_len = self._param_value(array_len)
+        var = self._call_stack.get_variable(array_name)
         if var is None:
             self._call_stack.put_variable(array_name, Array(array_len))
         else:
             var.add_dimension(array_len)
         return True
 
-    def _deref(self):
+    def _deref(self, array_name, offset):
         # Should put the result on the top of the expression stack.
-        offset = self._param_value(self.current_inst.param1)
-        array_name = self.current_inst.param0
+        offset = self._param_value(offset)
         array = self._call_stack.get_variable(array_name)
         array.deref(offset)
         return True
 
-    def _index(self):
+    def _index(self, array_name, offset):
         # Should put the result on the top of the expression stack.
-        offset = self._param_value(self.current_inst.param1)
-        array_name = self.current_inst.param0
+        offset = self._param_value(offset)
         array = self._call_stack.get_variable(array_name)
         array.index(offset)
         return True
@@ -433,17 +784,17 @@ class Machine:
         logging.debug("Machine._unimpl() called")
         return True
 
-    def _push(self) -> None:
-        self._vm_math.push(self.current_inst.param0)
+    def _push(self, srce) -> None:
+        self._vm_math.push(srce)
 
-    def _pushq(self) -> None:
-        self._vm_math.pushq(self.current_inst.param0)
+    def _pushq(self, value) -> None:
+        self._vm_math.pushq(value)
 
-    def _pop(self) -> None:
-        self._vm_math.pop(self.current_inst.param0)
+    def _pop(self, dest) -> None:
+        self._vm_math.pop(dest)
 
-    def _op(self) -> None:
-        self._vm_math.op(self.current_inst.param0)
+    def _op(self, operator) -> None:
+        self._vm_math.op(operator)
 
     def _bin_op(self, operator) -> None:
         try:
@@ -458,18 +809,17 @@ class Machine:
     def _disc(self) -> None:
         self._vm_discover.disc()
 
-    def _discm(self) -> None:
-            self._vm_discover.discm(self.current_inst.param0)
+    def _discm(self, name) -> None:
+        self._vm_discover.discm(name)
 
-    def _dnext(self) -> None:
-        self._vm_discover.dnext(self.current_inst.param0)
+    def _dnext(self, current) -> None:
+        self._vm_discover.dnext(current)
 
-    def _dnextm(self) -> None:
-        self._vm_discover.dnextm(
-            self.current_inst.param0, self.current_inst.param1)
+    def _dnextm(self, name, current) -> None:
+        self._vm_discover.dnextm(name, current)
 
-    def _out(self) -> None:
-        self._vm_io.out(self.current_inst)
+    def _out(self, io_op, param) -> None:
+        self._vm_io.out(io_op, param)
 
     def _pause(self) -> None:
         if self._enable_pause:
@@ -483,25 +833,45 @@ class Machine:
                 if char == '!':
                     self._enable_pause = False
 
-    def _constant(self) -> None:
-        name = self.current_inst.param0
-        value = self.current_inst.param1
+    def _constant(self, name, value) -> None:
         self._call_stack.put_constant(name, value)
 
     def _wait(self) -> None:
         time = self._reg.time
         if isinstance(time, TimePattern):
-            self._clock.wait_until(time)
+            if not self._sliced:
+                self._clock.wait_until(time)
+            else:
+                deadline = self._clock.check_pattern(time)
+                if deadline is not None:
+                    # Come back to this instruction to check again.
+                    self._reg.pc -= 1
+                    self._end_slice(deadline)
         elif time > 0:
             if self._reg.unit_mode is UnitMode.RAW:
                 time /= 1000.0
-            self._clock.pause_for(time)
+            if not self._sliced:
+                self._clock.pause_for(time)
+            else:
+                self._end_slice(self._clock.cue(time))
+
+    def _end_slice(self, deadline) -> None:
+        if deadline is not None:
+            self._wake_time = deadline
+            self._keep_running = False
 
     def _as_raw_time(self, value) -> int:
         if self._reg.unit_mode in (UnitMode.LOGICAL, UnitMode.RGB):
             return units.time_raw(value)
         return value
 
+    def _raw_color(self):
+        # In raw mode the color goes out untouched and may be retained by the
+        # receiver, so it needs its own list.
+        if self._reg.unit_mode is UnitMode.RAW:
+            return self._reg.get_color()
+        return self._as_raw_color(self._reg.color_view())
+
     def _as_raw_color(self, color):
         if self._reg.unit_mode is UnitMode.RAW:
             return color
@@ -510,11 +880,12 @@ class Machine:
         return units.logical_to_raw(color)
 
     def _as_raw_matrix(self, srce):
+        # Always a new matrix, which can wait in the queue while the script
+        # goes on to change the one in the register.
         if self._reg.unit_mode is UnitMode.RAW:
-            return srce
-        xform_fn = units.convert_fn(self._reg.unit_mode, UnitMode.RAW)
-        return ColorMatrix.new_from_iterable(srce.height, srce.width,
-            (xform_fn(color) for color in srce.get_colors()))
+            return srce.standardized()
+        return srce.standardized().transformed(
+            units.convert_batch_fn(self._reg.unit_mode, UnitMode.RAW))
 
     def _assure_units(self, color):
         """
@@ -529,27 +900,21 @@ class Machine:
     def _assure_units_matrix(self, srce):
         if self._reg.unit_mode is UnitMode.RAW:
             return srce
+        return srce.transformed(
+            units.convert_batch_fn(UnitMode.RAW, self._reg.unit_mode))
 
-        xform_fn = units.convert_fn(UnitMode.RAW, self._reg.unit_mode)
-        return ColorMatrix.new_from_iterable(
-            (xform_fn(color) for color in srce.as_list()), 6, 5)
-
-    def _move(self) -> None:
+    def _move(self, value, dest) -> None:
         # Move from variable/register to variable/register.
-        inst = self.current_inst
-        value, dest = inst.param0, inst.param1
         if isinstance(value, Register):
             value = self._reg.get_by_enum(value)
-        elif isinstance(value, (str, LoopVar)):
+        elif isinstance(value, (Slot, str, LoopVar)):
             value = self._call_stack.get_variable(value)
             ### if isinstance(value, Array, ArrayBranch):
             ###    value = value.get_value()
         self._do_put_value(dest, value)
 
-    def _moveq(self) -> None:
+    def _moveq(self, value, dest) -> None:
         # Copy a literal value within the instruction to a register or variable.
-        inst = self.current_inst
-        value, dest = inst.param0, inst.param1
         if dest is Register.UNIT_MODE:
             self._switch_unit_mode(value)
         else:
@@ -559,7 +924,6 @@ class Machine:
         if isinstance(dest, Register):
             self._reg.set_by_enum(dest, value)
         else:
-            current_value = self._call_stack.get_variable(dest)
             ### if isinstance(current_value, Array):
             ###     current_value.set_value(value)
             ### else:
@@ -570,7 +934,7 @@ class Machine:
         if from_mode is to_mode:
             return
 
-        original_color = self._reg.get_color()
+        original_color = self._reg.color_view()
         self._reg.unit_mode = to_mode
         converter = self._convert_units_fn(from_mode, to_mode)
         self._reg.store_color(converter(original_color))
@@ -596,12 +960,13 @@ class Machine:
                         for from_mode, to_mode, fn in converters}
         return convert_dict[key(from_mode, to_mode)]
 
-    def _time_pattern(self) -> None:
-        inst = self.current_inst
-        if inst.param0 == SetOp.INIT:
-            self._reg.time = inst.param1
+    def _time_pattern(self, set_op, pattern) -> None:
+        if set_op == SetOp.INIT:
+            # The pattern belongs to the Program, which may be shared, and
+            # a later union changes the one in the register.
+            self._reg.time = copy.deepcopy(pattern)
         else:
-            self._reg.time.union(inst.param1)
+            self._reg.time.union(pattern)
 
     def _zone_check(self, light) -> bool:
         if not isinstance(light, MultizoneLight):
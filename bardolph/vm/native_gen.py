@@ -0,0 +1,296 @@
+from enum import Enum
+from numbers import Number
+
+from bardolph.lib.time_pattern import TimePattern
+from bardolph.vm.slot import Slot
+from bardolph.vm.vm_codes import (JumpCondition, LoopVar, OpCode, Operand,
+                                  Operator, Register)
+
+
+class NativeGenException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class NativeGen:
+    """
+    Translate loaded code into Python source. The program is split into basic
+    blocks, and each block becomes a function whose body calls straight into
+    the Machine with its operands written out as literals. A block returns the
+    address of the next block to run; an address with no block stops the
+    program.
+
+    The generated text defines BLOCKS, which maps an address to the function
+    for the block starting there, ROUTINES, which holds the name and address
+    of every routine defined by the script, and GLOBALS, which maps the name
+    of every global variable to its slot. Machine.run_native() executes them.
+
+    Every global slot exists before the program starts, so global variables
+    are accessed by indexing straight into the list that holds them.
+    """
+
+    # Instructions that always end a block.
+    _TERMINATORS = (OpCode.END, OpCode.JSR, OpCode.JUMP, OpCode.RETURN,
+                    OpCode.STOP)
+
+    # Instructions that have no effect at run time.
+    _SKIPPED = (OpCode.END_CTX, OpCode.NOP, OpCode.ROUTINE)
+
+    # Handlers that receive the instruction's operands.
+    _ONE_PARAM = (OpCode.CTX, OpCode.DISCM, OpCode.DNEXT)
+    _TWO_PARAM = (
+        OpCode.ARRAY, OpCode.CONSTANT, OpCode.DEREF, OpCode.DNEXTM,
+        OpCode.INDEX, OpCode.OUT, OpCode.PARAM, OpCode.TIME_PATTERN)
+
+    # Python equivalents of the operations in VmMath. Logical operators
+    # evaluate both sides, just as the VM does.
+    _BINARY_OPS = {
+        Operator.ADD: '({} + {})',
+        Operator.AND: '(bool({}) & bool({}))',
+        Operator.DIV: '({} / {})',
+        Operator.EQ: '({} == {})',
+        Operator.GT: '({} > {})',
+        Operator.GTE: '({} >= {})',
+        Operator.LT: '({} < {})',
+        Operator.LTE: '({} <= {})',
+        Operator.MOD: '({} % {})',
+        Operator.MUL: '({} * {})',
+        Operator.NOTEQ: '({} != {})',
+        Operator.OR: '(bool({}) | bool({}))',
+        Operator.POW: '({} ** {})',
+        Operator.SUB: '({} - {})'
+    }
+    _UNARY_OPS = {
+        Operator.NOT: '(not {})',
+        Operator.USUB: '(-{})'
+    }
+
+    def __init__(self):
+        self._code = []
+        self._routines = {}
+        self._lines = []
+        self._pending = []
+
+    def generate(self, program) -> str:
+        """
+        program: a Program, as returned by Loader.load(). Runtime routines are
+        bound when the program is run, so they aren't written out here.
+        """
+        self._code = program.code
+        self._routines = program.routines
+        leaders = self._find_leaders()
+
+        text = ''
+        starts = sorted(leaders)
+        for index, start in enumerate(starts):
+            end = starts[index + 1] if index + 1 < len(starts) else len(self._code)
+            text += self._block_text(start, end)
+            text += '\n'
+
+        text += 'BLOCKS = {\n'
+        text += ''.join(
+            '    {0}: _block_{0},\n'.format(start) for start in starts)
+        text += '}\n\n'
+        text += 'ROUTINES = (\n'
+        text += ''.join(
+            '    ({}, {}),\n'.format(repr(name), address)
+            for name, address in self._routines.items())
+        text += ')\n\n'
+        text += 'GLOBALS = {\n'
+        text += ''.join(
+            '    {}: {},\n'.format(repr(name), index)
+            for name, index in program.globals.items())
+        text += '}\n'
+        return text
+
+    def _find_leaders(self):
+        code_len = len(self._code)
+        leaders = {0}
+        leaders.update(self._routines.values())
+        for pc, inst in enumerate(self._code):
+            op_code = inst.op_code
+            if op_code is OpCode.JUMP:
+                leaders.add(pc + inst.param1)
+                leaders.add(pc + 1)
+            elif op_code is OpCode.JSR:
+                # A routine ending with "return" resumes one past the usual
+                # return address.
+                leaders.add(pc + 1)
+                leaders.add(pc + 2)
+            elif op_code in NativeGen._TERMINATORS:
+                leaders.add(pc + 1)
+        return {leader for leader in leaders if 0 <= leader < code_len}
+
+    def _block_text(self, start, end) -> str:
+        self._lines = []
+        self._pending = []
+        terminated = False
+        for pc in range(start, end):
+            inst = self._code[pc]
+            self._add_inst(pc, inst)
+            if inst.op_code in NativeGen._TERMINATORS and not (
+                    inst.op_code is OpCode.END
+                    and inst.param0 is Operand.MATRIX):
+                terminated = True
+                break
+        if not terminated:
+            self._flush()
+            self._lines.append('return {}'.format(end))
+
+        text = 'def _block_{}(m, reg, vm_math, call_stack, global_vars):\n'
+        text = text.format(start)
+        text += ''.join('    {}\n'.format(line) for line in self._lines)
+        return text
+
+    def _emit(self, *lines) -> None:
+        self._lines.extend(lines)
+
+    def _flush(self) -> None:
+        """
+        Values on the evaluation stack are kept as Python expressions until
+        something outside of the block needs them, at which point they are
+        pushed for real.
+        """
+        for expr in self._pending:
+            self._emit('vm_math.pushq({})'.format(expr))
+        self._pending.clear()
+
+    def _add_inst(self, pc, inst) -> None:
+        op_code = inst.op_code
+        param0, param1 = inst.param0, inst.param1
+        if op_code in NativeGen._SKIPPED:
+            return
+        if op_code is OpCode.PUSHQ:
+            self._pending.append(self._literal(param0))
+            return
+        if op_code is OpCode.PUSH:
+            self._pending.append(self._push_expr(param0))
+            return
+        if op_code is OpCode.OP:
+            self._add_op(param0)
+            return
+        if op_code is OpCode.POP:
+            self._add_pop(param0)
+            return
+
+        if op_code is OpCode.JUMP:
+            target = pc + param1
+            if param0 is JumpCondition.ALWAYS:
+                self._flush()
+                self._emit('return {}'.format(target))
+                return
+            self._add_pop(Register.RESULT)
+            self._flush()
+            if param0 is JumpCondition.IF_FALSE:
+                taken, not_taken = pc + 1, target
+            else:
+                taken, not_taken = target, pc + 1
+            self._emit(
+                'return {} if reg.result else {}'.format(taken, not_taken))
+            return
+
+        self._flush()
+        if op_code is OpCode.JSR:
+            self._emit(
+                'reg.pc = {}'.format(pc),
+                'm._jsr({})'.format(self._literal(param0)),
+                'return reg.pc')
+        elif op_code is OpCode.END:
+            if param0 is not Operand.MATRIX:
+                self._emit('m._end({})'.format(self._literal(param0)),
+                           'return reg.pc')
+        elif op_code is OpCode.RETURN:
+            self._emit('m._return()', 'return reg.pc + 1')
+        elif op_code is OpCode.STOP:
+            self._emit('return {}'.format(len(self._code)))
+        elif op_code is OpCode.MOVE:
+            self._add_store(param1, self._value_expr(param0))
+        elif op_code is OpCode.MOVEQ and param1 is not Register.UNIT_MODE:
+            self._add_store(param1, self._literal(param0))
+        else:
+            handler = 'm._' + op_code.name.lower()
+            if op_code is OpCode.MOVEQ or op_code in NativeGen._TWO_PARAM:
+                self._emit('{}({}, {})'.format(
+                    handler, self._literal(param0), self._literal(param1)))
+            elif op_code in NativeGen._ONE_PARAM:
+                self._emit('{}({})'.format(handler, self._literal(param0)))
+            else:
+                self._emit('{}()'.format(handler))
+
+    def _add_op(self, operator) -> None:
+        pending = self._pending
+        if operator is Operator.UADD:
+            return
+        if operator in NativeGen._UNARY_OPS and len(pending) > 0:
+            pending.append(
+                NativeGen._UNARY_OPS[operator].format(pending.pop()))
+        elif operator in NativeGen._BINARY_OPS and len(pending) > 1:
+            op2, op1 = pending.pop(), pending.pop()
+            pending.append(NativeGen._BINARY_OPS[operator].format(op1, op2))
+        else:
+            # Operands come from outside of this block, e.g. a function's
+            # return value.
+            self._flush()
+            self._emit('vm_math.op({})'.format(self._literal(operator)))
+
+    def _add_pop(self, dest) -> None:
+        if len(self._pending) == 0:
+            if isinstance(dest, (Register, Slot)):
+                self._add_store(dest, 'vm_math.pop_value()')
+            else:
+                self._emit('vm_math.pop({})'.format(self._literal(dest)))
+            return
+
+        expr = self._pending.pop()
+        # Anything left underneath has to be evaluated before the store.
+        self._flush()
+        self._add_store(dest, expr)
+
+    def _add_store(self, dest, expr) -> None:
+        if isinstance(dest, Register):
+            self._emit('{} = {}'.format(self._reg(dest), expr))
+        elif isinstance(dest, Slot) and dest.is_global:
+            self._emit('global_vars[{}] = {}'.format(dest.index, expr))
+        elif isinstance(dest, Slot):
+            self._emit(
+                'call_stack.put_local({}, {})'.format(dest.index, expr))
+        else:
+            self._emit('call_stack.put_variable({}, {})'.format(
+                self._literal(dest), expr))
+
+    def _push_expr(self, srce) -> str:
+        if (isinstance(srce, Number)
+                or srce in (Register.UNIT_MODE, Operand.NULL)):
+            return self._literal(srce)
+        return self._value_expr(srce)
+
+    def _value_expr(self, srce) -> str:
+        if isinstance(srce, Register):
+            return self._reg(srce)
+        if isinstance(srce, Slot) and srce.is_global:
+            return 'global_vars[{}]'.format(srce.index)
+        if isinstance(srce, Slot):
+            return 'call_stack.get_local({})'.format(srce.index)
+        if isinstance(srce, (str, LoopVar)):
+            return 'call_stack.get_variable({})'.format(self._literal(srce))
+        return self._literal(srce)
+
+    @staticmethod
+    def _is_plain_reg(value) -> bool:
+        return isinstance(value, Register) and value is not Register.UNIT_MODE
+
+    @staticmethod
+    def _reg(register) -> str:
+        return 'reg.' + register.name.lower()
+
+    @staticmethod
+    def _literal(value) -> str:
+        if isinstance(value, Enum):
+            return '{}.{}'.format(type(value).__name__, value.name)
+        if isinstance(value, (Slot, TimePattern)):
+            return repr(value)
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return repr(value)
+        raise NativeGenException(
+            'No literal representation for {}'.format(repr(value)))
@@ -0,0 +1,71 @@
+from types import MappingProxyType
+
+
+class Program:
+    """
+    A compiled program, as produced by the Loader and run by the Machine.
+
+    A Program is never modified once it has been created, and the Machine
+    only reads from it. Therefore, one instance can be shared by any number
+    of Machines, including ones running at the same time, without being
+    copied.
+
+    code: tuple of instructions, with every routine moved into a segment
+    that follows the initial jump.
+
+    routines: maps the name of every routine defined by the script to its
+    address. Runtime routines are bound by each Machine when it runs the
+    program.
+
+    globals: maps the name of every global variable to its slot.
+    """
+    __slots__ = ('_code', '_routines', '_globals')
+
+    def __init__(self, code=(), routines=None, global_vars=None):
+        object.__setattr__(self, '_code', tuple(code))
+        object.__setattr__(
+            self, '_routines', MappingProxyType(dict(routines or {})))
+        object.__setattr__(
+            self, '_globals', MappingProxyType(dict(global_vars or {})))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Program is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Program is immutable')
+
+    def __reduce__(self):
+        return (Program,
+                (self._code, dict(self._routines), dict(self._globals)))
+
+    def __len__(self):
+        return len(self._code)
+
+    def __iter__(self):
+        return iter(self._code)
+
+    def __getitem__(self, address):
+        return self._code[address]
+
+    def __repr__(self):
+        return 'Program({} instructions, {} routines)'.format(
+            len(self._code), len(self._routines))
+
+    @property
+    def code(self) -> tuple:
+        return self._code
+
+    @property
+    def routines(self):
+        return self._routines
+
+    @property
+    def globals(self):
+        return self._globals
+
+    def get_address(self, routine_name):
+        """
+        Return the address of a routine defined by the script, or None if
+        there isn't one with that name.
+        """
+        return self._routines.get(routine_name)
@@ -0,0 +1,36 @@
+from enum import Enum, auto
+
+
+class Scope(Enum):
+    GLOBAL = auto()
+    LOCAL = auto()
+
+
+class Slot:
+    """
+    A variable as resolved by the parser: the frame that holds it and its
+    position within that frame. The name is kept for listings and for
+    anything that needs to look the variable up by name after the fact.
+    """
+    __slots__ = ('name', 'scope', 'index')
+
+    def __init__(self, name, scope, index):
+        self.name = name
+        self.scope = scope
+        self.index = index
+
+    def __repr__(self):
+        return 'Slot("{}", {}, {})'.format(self.name, self.scope, self.index)
+
+    def __eq__(self, other):
+        if not isinstance(other, Slot):
+            return False
+        return (self.name == other.name and self.scope is other.scope
+                and self.index == other.index)
+
+    def __hash__(self):
+        return hash((self.name, self.scope, self.index))
+
+    @property
+    def is_global(self) -> bool:
+        return self.scope is Scope.GLOBAL
@@ -123,6 +123,7 @@ class Operand(Enum):
 
 class IoOp(Enum):
     LITERAL = auto()
+    NAMED = auto()
     PRINT = auto()
     PRINT_END = auto()
     PRINTF = auto()
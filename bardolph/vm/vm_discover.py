@@ -12,13 +12,19 @@ class VmDiscover:
 
     The order of the lights is determined by the the contents of the
     disc_forward register.
+
+    Starting an iteration takes the current LightSetState, and the rest of
+    the iteration uses it, so that discovery can't change the lights, groups,
+    or locations out from under it.
     """
     def __init__(self, call_stack, reg):
         self._call_stack = call_stack
         self._reg = reg
+        self._state = None
 
     def disc(self) -> None:
         # Start the iteration over all lights, groups, or locations.
+        self._state = self._get_state()
         name_list = self._names_by_oper()
         if len(name_list) == 0:
             self._reg.result = Operand.NULL
@@ -28,6 +34,7 @@ class VmDiscover:
 
     def discm(self, name) -> None:
         # Start the iteration over members of a group or location.
+        self._state = self._get_state()
         name_list = self._set_by_oper(self._param_to_value(name))
         if name_list and len(name_list) > 0:
             index = 0 if self._reg.disc_forward else -1
@@ -48,7 +55,9 @@ class VmDiscover:
         # Go to the next object in the member iteration.
         name_list = self._set_by_oper(self._param_to_value(name))
         current = self._param_to_value(current)
-        if not self._reg.disc_forward:
+        if name_list is None:
+            self._reg.result = Operand.NULL
+        elif not self._reg.disc_forward:
             self._reg.result = name_list.prev(current) or Operand.NULL
         else:
             self._reg.result = name_list.next(current) or Operand.NULL
@@ -60,19 +69,31 @@ class VmDiscover:
             return self._reg.get_by_enum(param)
         return self._call_stack.get_variable(param)
 
+    @staticmethod
     @inject(LightSet)
-    def _set_by_oper(self, name, light_set):
+    def _get_state(light_set):
+        return light_set.get_state()
+
+    def _current_state(self):
+        # An iteration that's already under way keeps the state it started
+        # with.
+        if self._state is None:
+            self._state = self._get_state()
+        return self._state
+
+    def _set_by_oper(self, name):
+        state = self._current_state()
         if self._reg.operand is Operand.GROUP:
-            return light_set.get_group_lights(name)
+            return state.get_group_lights(name)
         elif self._reg.operand is Operand.LOCATION:
-            return light_set.get_location_lights(name)
+            return state.get_location_lights(name)
         return None
 
-    @inject(LightSet)
-    def _names_by_oper(self, light_set):
+    def _names_by_oper(self):
+        state = self._current_state()
         if self._reg.operand is Operand.GROUP:
-            return light_set.get_group_names()
+            return state.get_group_names()
         elif self._reg.operand is Operand.LOCATION:
-            return light_set.get_location_names()
+            return state.get_location_names()
         assert self._reg.operand is Operand.LIGHT, "incorrect operand"
-        return light_set.get_light_names()
+        return state.get_light_names()
@@ -10,14 +10,18 @@ class VmIo:
         self._call_stack = call_stack
         self._reg = reg
         self._unnamed = []
+        self._named = {}
 
     @inject(Output)
-    def out(self, inst, output):
-        match inst.param0:
+    def out(self, io_op, param, output):
+        match io_op:
             case IoOp.LITERAL:
-                self._unnamed.append(inst.param1)
+                self._unnamed.append(param)
+            case IoOp.NAMED:
+                # Named field for printf, already resolved by the parser.
+                self._named[param] = self._reg.result
             case IoOp.REGISTER:
-                self._unnamed.append(self._reg.get_by_enum(inst.param1))
+                self._unnamed.append(self._reg.get_by_enum(param))
             case IoOp.PRINT:
                 if len(self._unnamed) > 0:
                     output.out(self._unnamed[0])
@@ -25,13 +29,14 @@ class VmIo:
             case IoOp.PRINT_END:
                 output.newline()
             case IoOp.PRINTF:
-                self._printf(inst)
+                self._printf(param)
             case _:
                 logging.error(
-                    "print command internal error: {}".format(inst.param0))
+                    "print command internal error: {}".format(io_op))
 
     def reset(self):
         self._unnamed.clear()
+        self._named.clear()
 
     @inject(Output)
     def flush(self, output):
@@ -41,16 +46,18 @@ class VmIo:
         self.reset()
 
     @inject(Output)
-    def _printf(self, inst, output):
-        format_str = inst.param1.replace('\\n', '\n')
+    def _printf(self, format_str, output):
+        format_str = format_str.replace('\\n', '\n')
         named = {}
         for field in string.Formatter().parse(format_str):
             name = field[1]
             if name is not None and len(name) > 0 and not name.isdecimal():
                 reg = Register.from_string(name)
-                if reg is not None:
+                if name in self._named:
+                    named[name] = self._named[name]
+                elif reg is not None:
                     named[name] = self._reg.get_by_enum(reg)
                 else:
                     named[name] = self._call_stack.get_variable(name)
         output.out(format_str.format(*self._unnamed, **named))
-        self._unnamed.clear()
+        self.reset()
@@ -2,6 +2,7 @@ import operator
 from numbers import Number
 
 from bardolph.vm.eval_stack import EvalStack
+from bardolph.vm.slot import Slot
 from bardolph.vm.vm_codes import LoopVar, Operand, Operator, Register
 
 
@@ -36,9 +37,12 @@ class VmMath:
             value = srce
         elif isinstance(srce, Register):
             value = self._reg.get_by_enum(srce)
-        elif isinstance(srce, (str, LoopVar)):
-             value = self._call_stack.get_variable(srce)
+        elif isinstance(srce, (Slot, str, LoopVar)):
+            value = self._call_stack.get_variable(srce)
 
+        self.push_value(value)
+
+    def push_value(self, value) -> None:
         assert value is not None, "pushing None onto eval stack"
         self._eval_stack.push(value)
 
@@ -51,16 +55,32 @@ class VmMath:
             return
         if isinstance(dest, Register):
             self._reg.set_by_enum(dest, value)
-        elif isinstance(dest, (str, LoopVar)):
+        elif isinstance(dest, (Slot, str, LoopVar)):
             self._call_stack.put_variable(dest, value)
 
+    def pop_value(self):
+        return self._eval_stack.pop()
+
     def op(self, operator) -> None:
+        self.op_fn(operator)()
+
+    def op_fn(self, operator):
+        """
+        Return a callable that takes no parameters and performs the operation
+        on the eval stack. Used by the VM to resolve the operator only once.
+        """
         if operator in (Operator.UADD, Operator.USUB, Operator.NOT):
-            self.unary_op(operator)
-        elif operator in (Operator.AND, Operator.OR):
-            self.logical_op(operator)
-        else:
-            self.bin_op(operator)
+            return lambda: self.unary_op(operator)
+        if operator in (Operator.AND, Operator.OR):
+            return lambda: self.logical_op(operator)
+
+        stack = self._eval_stack
+        fn = VmMath._fn_table[operator]
+        def bin_op():
+            op2 = stack.pop()
+            op1 = stack.pop()
+            stack.push(fn(op1, op2))
+        return bin_op
 
     def unary_op(self, operator) -> None:
         if operator is Operator.USUB:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+Measures how long it takes to build one frame of a matrix animation: paint
+a few rectangles, fill in the cells that weren't painted, convert the
+colors to raw units, and get them ready to send to the light.
+
+The ColorMatrix kept in numpy arrays, with colors converted by the batch
+functions in controller.units, is compared with the one kept in lists of
+lists, converting one color at a time, which is what both fall back to
+when numpy isn't installed.
+
+Usage:
+    python -m benchmarks.color_matrix_benchmark [-r REPEAT] [CELLS ...]
+"""
+
+import argparse
+import time
+from unittest.mock import patch
+
+from bardolph.controller import color_matrix, units
+from bardolph.controller.color_matrix import ColorMatrix, Rect
+from bardolph.controller.units import UnitMode
+
+_WIDTH = 8
+
+
+def _frame(height, frame_number):
+    mat = ColorMatrix.new_from_constant(height, _WIDTH, None)
+    for i in range(0, 4):
+        top = (frame_number + i * 3) % height
+        mat.overlay_color(
+            Rect(top, min(top + 2, height - 1), i, i + 3),
+            [i * 90.0, 100.0, 50.0, 2700])
+    mat.find_replace(None, [0, 0, 0, 0])
+    mat = mat.standardized().transformed(
+        units.convert_batch_fn(UnitMode.LOGICAL, UnitMode.RAW))
+    return mat.get_colors()
+
+
+def _time_frames(height, repeat):
+    best = None
+    for frame_number in range(0, repeat):
+        start = time.perf_counter()
+        colors = _frame(height, frame_number)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, colors
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        'cells', help='numbers of cells to try', type=int, nargs='*',
+        default=[64, 320, 1024, 4096])
+    arg_parser.add_argument(
+        '-r', '--repeat', help='number of frames per size', type=int,
+        default=20)
+    args = arg_parser.parse_args()
+
+    if color_matrix.numpy is None:
+        print('numpy is not installed.')
+        return
+    print('{:>8} {:>12} {:>12} {:>8}'.format(
+        'cells', 'lists (ms)', 'numpy (ms)', 'gain'))
+    for num_cells in args.cells:
+        height = max(1, num_cells // _WIDTH)
+        with patch.object(color_matrix, 'numpy', None), \
+                patch.object(units, 'numpy', None):
+            old_time, old_colors = _time_frames(height, args.repeat)
+        new_time, new_colors = _time_frames(height, args.repeat)
+        if old_colors != new_colors:
+            print('Colors differ.')
+        print('{:>8,d} {:>12.3f} {:>12.3f} {:>7.1f}x'.format(
+            height * _WIDTH, old_time * 1000, new_time * 1000,
+            old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
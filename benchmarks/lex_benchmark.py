@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+"""
+Measures how fast the lexer gets through a large script. The script is a
+ScriptSnapshot of the fake lights, repeated until it reaches the requested
+size.
+
+The lexer, which classifies each token by the named group that matched it,
+is compared with one that matches first and then classifies every word by
+trying each kind of token in turn, the way the lexer used to work.
+
+Usage:
+    python -m benchmarks.lex_benchmark [-m MEGABYTES] [-r REPEAT]
+"""
+
+import argparse
+import re
+import time
+
+from bardolph.controller.snapshot import ScriptSnapshot
+from bardolph.lib.time_pattern import TimePattern
+from bardolph.parser.lex import Lex
+from bardolph.parser.token import Token, TokenTypes
+from tests import test_module
+
+
+class _ReclassifyingLex(Lex):
+    _CMP = re.compile(Lex._CMP_SPEC)
+    _NAME = re.compile(Lex._NAME_SPEC)
+    _NUMBER = re.compile(Lex._NUMBER_SPEC)
+    _STRING = re.compile(Lex._LITERAL_STRING_SPEC)
+    _TOKEN = re.compile('|'.join((
+        TimePattern.REGEX_SPEC,
+        Lex._CMP_SPEC,
+        Lex._LITERAL_STRING_SPEC,
+        Lex._NUMBER_SPEC,
+        Lex._NAME_SPEC,
+        Lex._NON_ALNUM_SPEC,
+        Lex._DEFAULT_SPEC)))
+
+    def tokens(self):
+        line_num = 0
+        for line in self._lines:
+            line_num += 1
+            for match in self._TOKEN.finditer(line):
+                matched = match.string[match.start():match.end()]
+                u_matched = self._unabbreviate(matched)
+                if u_matched == '#':
+                    break
+                if u_matched in self._NON_ALNUM_LIST:
+                    token_type = TokenTypes.MARK
+                else:
+                    token_type = self._token_type(u_matched)
+                    if token_type is TokenTypes.LITERAL_STRING:
+                        u_matched = u_matched[1:-1]
+                        u_matched = u_matched.replace(r'\"', '"')
+                yield Token(token_type, u_matched, line_num, self._source)
+        yield Token(TokenTypes.EOF)
+
+    def _token_type(self, word):
+        token_type = TokenTypes.__members__.get(word.upper())
+        if token_type is not None:
+            return token_type
+        if word in self._REG_LIST:
+            return TokenTypes.REGISTER
+        pairs = (
+            (self._CMP, TokenTypes.COMPARE),
+            (TimePattern.REGEX, TokenTypes.TIME_PATTERN),
+            (self._STRING, TokenTypes.LITERAL_STRING),
+            (self._NUMBER, TokenTypes.NUMBER),
+            (self._NAME, TokenTypes.NAME))
+        for reg_expr, token_type in pairs:
+            if reg_expr.match(word):
+                return token_type
+        return TokenTypes.ERROR
+
+    @staticmethod
+    def _unabbreviate(token):
+        return {
+            'H': 'hue', 'S': 'saturation', 'B': 'brightness', 'K': 'kelvin'
+        }.get(token, token)
+
+
+def _script(megabytes) -> str:
+    snapshot = ScriptSnapshot().generate(None).text
+    copies = int(megabytes * 1024 * 1024 / len(snapshot)) + 1
+    return snapshot * copies
+
+
+def _time_lex(lex_class, script, repeat):
+    best = None
+    num_tokens = 0
+    for _ in range(0, repeat):
+        start = time.perf_counter()
+        num_tokens = sum(1 for _ in lex_class(script).tokens())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, num_tokens
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        '-m', '--megabytes', help='size of the script', type=float,
+        default=4.0)
+    arg_parser.add_argument(
+        '-r', '--repeat', help='number of runs per lexer', type=int,
+        default=3)
+    args = arg_parser.parse_args()
+
+    test_module.configure()
+    script = _script(args.megabytes)
+    old_time, num_tokens = _time_lex(_ReclassifyingLex, script, args.repeat)
+    new_time, new_tokens = _time_lex(Lex, script, args.repeat)
+    if new_tokens != num_tokens:
+        print('Token counts differ: {} vs. {}'.format(num_tokens, new_tokens))
+
+    megabytes = len(script) / (1024 * 1024)
+    print('{:.1f} MB, {:,d} tokens'.format(megabytes, num_tokens))
+    print('{:14} {:>14} {:>10}'.format('lexer', 'tokens/s', 'MB/s'))
+    for name, elapsed in (
+            ('reclassifying', old_time), ('named groups', new_time)):
+        print('{:14} {:>14,.0f} {:>10.2f}'.format(
+            name, num_tokens / elapsed, megabytes / elapsed))
+    print('gain: {:.2f}x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
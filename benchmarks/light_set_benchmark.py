@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""
+Measures how long LightSet takes to refresh a large number of lights whose
+groups and locations haven't changed, which is what nearly every periodic
+discovery amounts to.
+
+The LightSet, which looks up each light's current group and location in a
+reverse index, is compared with one that removes the light from every
+group and location and then adds it back, the way LightSet used to work.
+
+Usage:
+    python -m benchmarks.light_set_benchmark [-g GROUPS] [-r REPEAT]
+                                             [LIGHTS ...]
+"""
+
+import argparse
+import time
+
+from bardolph.controller.light_set import LightSet
+from bardolph.fakes import fake_light_api
+from bardolph.lib import injection, settings
+
+
+class _WalkingLightSet(LightSet):
+    @staticmethod
+    def _update_memberships(light_name, set_name, member_sets, index):
+        _WalkingLightSet._remove_memberships(light_name, member_sets, index)
+        member_sets.for_write(set_name).add(light_name)
+
+    @staticmethod
+    def _remove_memberships(light_name, member_sets, index):
+        for list_name in list(member_sets.names()):
+            if member_sets.get(list_name).has(light_name):
+                light_list = member_sets.for_write(list_name)
+                light_list.remove(light_name)
+                if len(light_list) == 0:
+                    member_sets.discard(list_name)
+
+
+def _configure(num_lights, num_groups):
+    injection.configure()
+    settings.using({
+        'log_to_console': True,
+        'single_light_discover': True,
+        'use_fakes': True
+    }).configure()
+    fake_light_api.using([
+        ('Light {:05d}'.format(i),
+         'Group {:03d}'.format(i % num_groups),
+         'Location {:03d}'.format(i % (num_groups // 4 + 1)))
+        for i in range(0, num_lights)
+    ]).configure()
+
+
+def _time_refresh(light_set_class, repeat):
+    light_set = light_set_class()
+    light_set.discover()
+    best = None
+    for _ in range(0, repeat):
+        start = time.perf_counter()
+        light_set.discover()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, light_set
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        'lights', help='numbers of lights to try', type=int, nargs='*',
+        default=[1000, 2000, 4000, 8000])
+    arg_parser.add_argument(
+        '-g', '--groups', help='number of groups', type=int, default=200)
+    arg_parser.add_argument(
+        '-r', '--repeat', help='number of refreshes per light set',
+        type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print('{:>8} {:>8} {:>14} {:>14} {:>8}'.format(
+        'lights', 'groups', 'walking (ms)', 'indexed (ms)', 'gain'))
+    for num_lights in args.lights:
+        _configure(num_lights, args.groups)
+        old_time, old_set = _time_refresh(_WalkingLightSet, args.repeat)
+        new_time, new_set = _time_refresh(LightSet, args.repeat)
+        if old_set.get_group_names() != new_set.get_group_names():
+            print('Groups differ.')
+        print('{:>8,d} {:>8,d} {:>14.2f} {:>14.2f} {:>7.1f}x'.format(
+            num_lights, len(new_set.get_group_names()), old_time * 1000,
+            new_time * 1000, old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+Measures the threads and memory used by a large number of background
+scripts that spend nearly all of their time waiting, which is what a house
+full of always-on effects looks like.
+
+Running each script on a thread of its own, the way JobControl always used
+to, is compared with running all of them a slice at a time on the
+Scheduler's single thread. Each mode runs in a separate process so that its
+memory can be measured from a clean start.
+
+Usage:
+    python -m benchmarks.scheduler_benchmark [-d DURATION] [JOBS ...]
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+from bardolph.controller import i_controller
+from bardolph.controller.script_job import ScriptJob
+from bardolph.lib import clock, settings
+from bardolph.lib.injection import provide
+from bardolph.lib.job_control import JobControl
+from bardolph.lib.scheduler import Scheduler
+from tests import test_module
+
+_SCRIPT = """
+    units raw time 100 saturation 65535 brightness 30000 kelvin 2700
+    assign the_hue 0
+    repeat begin
+        hue the_hue set "Top" wait
+        assign the_hue {(the_hue + 1000) % 65536}
+    end
+"""
+
+
+def _rss_kb() -> int:
+    # Resident set size of this process, from Linux's /proc.
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _run_mode(mode, num_jobs, duration):
+    test_module.configure()
+    settings.using({'sleep_time': 0.01}).configure()
+    clock.configure()
+    light = provide(i_controller.LightSet).get_light('Top')
+    light.quietly()
+    jobs = JobControl(Scheduler() if mode == 'scheduler' else None)
+    scripts = [ScriptJob.from_string(_SCRIPT) for _ in range(0, num_jobs)]
+
+    rss_before = _rss_kb()
+    for i, script in enumerate(scripts):
+        jobs.spawn_job(script, 'job {}'.format(i))
+    time.sleep(duration)
+    threads = threading.active_count()
+    rss_after = _rss_kb()
+
+    start = time.perf_counter()
+    jobs.stop_background()
+    while jobs.has_jobs():
+        time.sleep(0.001)
+    stop_time = time.perf_counter() - start
+    print(threads, rss_after - rss_before, stop_time)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        'jobs', help='numbers of scripts to try', type=int, nargs='*',
+        default=[100, 1000])
+    arg_parser.add_argument(
+        '-d', '--duration', help='seconds to let the scripts run',
+        type=float, default=2.0)
+    arg_parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.mode is not None:
+        _run_mode(args.mode, args.jobs[0], args.duration)
+        return
+
+    print('{:>8} {:>10} {:>8} {:>12} {:>10}'.format(
+        'scripts', 'mode', 'threads', 'memory (MB)', 'stop (ms)'))
+    for num_jobs in args.jobs:
+        for mode in ('threads', 'scheduler'):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.scheduler_benchmark',
+                 '--mode', mode, '-d', str(args.duration), str(num_jobs)],
+                check=True, capture_output=True, text=True).stdout
+            threads, rss_kb, stop_time = output.split()
+            print('{:>8,d} {:>10} {:>8} {:>12.1f} {:>10.1f}'.format(
+                num_jobs, mode, threads, int(rss_kb) / 1024,
+                float(stop_time) * 1000))
+
+
+if __name__ == '__main__':
+    main()
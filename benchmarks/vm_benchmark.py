@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+"""
+Measures how many VM instructions per second the Machine executes for a few
+loop-heavy scripts running against fake lights.
+
+The pre-decoded dispatch loop is compared with an interpreting loop that
+decodes every instruction on every step, the way the VM used to work, and
+with the basic-block functions generated by "lsc --native".
+
+The interpreting loop is only an approximation of the old VM: it runs the
+same instruction handlers as the others, which use the Slots and Registers
+that came later, so it shows what decoding costs, not how fast the VM was
+before any of these changes.
+
+Usage:
+    python -m benchmarks.vm_benchmark [-r REPEAT]
+"""
+
+import argparse
+import time
+
+from bardolph.controller import lsc
+from bardolph.controller.script_job import ScriptJob
+from bardolph.vm.machine import Machine
+from bardolph.vm.vm_codes import OpCode
+from tests import test_module
+
+_SCRIPTS = {
+    'counted': """
+        assign total 0
+        repeat 2000 with i from 0 to 1999 begin
+            assign total {total + i * 2 - 1}
+            if {total % 2 == 0} assign total {total + 1}
+        end
+    """,
+    'nested': """
+        assign n 0
+        repeat 60 begin
+            repeat 60 begin
+                assign n {n + 1}
+            end
+        end
+    """,
+    'lights': """
+        hue 120 saturation 80 brightness 50 kelvin 2700
+        repeat 40 with brt from 0 to 100 begin
+            brightness brt
+            repeat all as the_light set the_light
+        end
+    """,
+    'cycle': """
+        saturation 90 brightness 60
+        repeat 300 with the_hue cycle begin
+            hue the_hue
+            set "Top" and "Middle" and "Bottom"
+        end
+    """
+}
+
+
+class _InterpretingMachine(Machine):
+    """
+    Decodes every instruction as it goes, without using the pre-bound code.
+    The instructions are still carried out by the current handlers.
+    """
+    def _execute(self) -> None:
+        reg = self._reg
+        program = self._program
+        program_len = len(program)
+        while self._keep_running and reg.pc < program_len:
+            inst = program[reg.pc]
+            if inst.op_code is OpCode.STOP:
+                break
+            fn = self._fn_table[inst.op_code]
+            if inst.op_code in Machine._TWO_PARAM:
+                fn(inst.param0, inst.param1)
+            elif inst.op_code in Machine._ONE_PARAM:
+                fn(inst.param0)
+            else:
+                fn()
+            if inst.op_code not in Machine._NO_ADVANCE:
+                reg.pc += 1
+
+
+class _CountingMachine(Machine):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def _execute(self) -> None:
+        reg = self._reg
+        code = self._code
+        program_len = len(code)
+        while self._keep_running and reg.pc < program_len:
+            self.count += 1
+            code[reg.pc]()
+
+
+def _compile(script):
+    return ScriptJob.from_string(script).program
+
+
+def _time_run(machine, script, repeat) -> float:
+    program = _compile(script)
+    best = None
+    for _ in range(0, repeat):
+        machine.reset()
+        start = time.perf_counter()
+        machine.run(program)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _native_blocks(script):
+    namespace = {}
+    exec(lsc.program_code(lsc.native_text(_compile(script)), native=True),
+         namespace)
+    return namespace['BLOCKS'], namespace['ROUTINES'], namespace['GLOBALS']
+
+
+def _time_native(script, repeat) -> float:
+    blocks, routines, global_vars = _native_blocks(script)
+    machine = Machine()
+    best = None
+    for _ in range(0, repeat):
+        machine.reset()
+        start = time.perf_counter()
+        machine.run_native(blocks, routines, global_vars)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        '-r', '--repeat', help='number of runs per script', type=int,
+        default=5)
+    args = arg_parser.parse_args()
+
+    test_module.configure()
+    print('{:10} {:>10} {:>14} {:>14} {:>14} {:>8}'.format(
+        'script', 'insts', 'interp ips', 'decoded ips', 'native ips', 'gain'))
+    for name, script in _SCRIPTS.items():
+        counter = _CountingMachine()
+        counter.run(_compile(script))
+        num_insts = counter.count
+
+        interp_time = _time_run(_InterpretingMachine(), script, args.repeat)
+        decoded_time = _time_run(Machine(), script, args.repeat)
+        native_time = _time_native(script, args.repeat)
+        print('{:10} {:>10d} {:>14,.0f} {:>14,.0f} {:>14,.0f} {:>7.2f}x'.format(
+            name, num_insts, num_insts / interp_time,
+            num_insts / decoded_time, num_insts / native_time,
+            interp_time / native_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 
 import unittest
 from bardolph.vm.call_stack import CallStack
+from bardolph.vm.slot import Scope, Slot
 
 class CallStackTest(unittest.TestCase):
     def test_routine(self):
@@ -24,6 +25,26 @@ class CallStackTest(unittest.TestCase):
         self.assertEqual(stack.get_variable('x'), 100)
         self.assertEqual(stack.get_variable('y'), 200)
 
+    def test_slots(self):
+        stack = CallStack()
+        stack.reserve_globals({'g': 0, 'h': 1})
+        stack.put_variable(Slot('g', Scope.GLOBAL, 0), 100)
+        stack.put_variable(Slot('h', Scope.GLOBAL, 1), 200)
+
+        stack.new_frame(2)
+        stack.put_param(Slot('a', Scope.LOCAL, 0), 300)
+        stack.enter_routine()
+        stack.put_variable(Slot('b', Scope.LOCAL, 1), 400)
+        self.assertEqual(stack.get_local(0), 300)
+        self.assertEqual(stack.get_variable(Slot('b', Scope.LOCAL, 1)), 400)
+        self.assertEqual(stack.get_global(1), 200)
+
+        # Globals are also visible by name.
+        self.assertEqual(stack.get_variable('g'), 100)
+        stack.put_global(0, 500)
+        stack.exit_routine()
+        self.assertEqual(stack.get_variable('g'), 500)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,31 +1,31 @@
 #!/usr/bin/env python
 
+import time
 import unittest
+from datetime import datetime, timedelta
 from unittest.mock import patch
 
 from bardolph.lib import clock, injection, settings, time_pattern
 
 class MockNow:
+    """
+    Stands in for the wall clock and for sleeping: each sleep moves the time
+    of day forward instead of waiting.
+    """
     def __init__(self, hour, minute):
-        self._hour = hour
-        self._minute = minute
-
-    @property
-    def hour(self):
-        self._minute += 1
-        if self._minute == 60:
-            self._minute = 0
-            self._hour += 1
-            if self._hour == 24:
-                self._hour = 0
-        return self._hour
-
-    @property
-    def minute(self):
-        return self._minute
+        self._now = datetime(2020, 1, 1, hour, minute, 30)
+        self.sleeps = 0
+
+    def now(self):
+        return self._now
+
+    def sleep_until(self, deadline) -> bool:
+        self._now += timedelta(seconds=deadline - time.monotonic())
+        self.sleeps += 1
+        return True
 
     def time_equals(self, hour, minute):
-        return hour == self._hour and minute == self._minute
+        return hour == self._now.hour and minute == self._now.minute
 
 
 class ClockTest(unittest.TestCase):
@@ -49,10 +49,11 @@ class ClockTest(unittest.TestCase):
     @patch('bardolph.lib.clock.datetime')
     def test_time_pattern(self, patch_datetime):
         mock_now = MockNow(9, 55)
-        patch_datetime.now = lambda: mock_now
+        patch_datetime.now = mock_now.now
 
         clk = clock.Clock()
         clk.start()
+        clk._sleep_until = mock_now.sleep_until
 
         clk.wait_until(time_pattern.TimePattern.from_string('10:*'))
         self.assertTrue(mock_now.time_equals(10, 0))
@@ -63,6 +64,12 @@ class ClockTest(unittest.TestCase):
         clk.wait_until(time_pattern.TimePattern.from_string('10:*5'))
         self.assertTrue(mock_now.time_equals(10, 15))
 
+        # Hours away, but woken only once a minute at most.
+        mock_now.sleeps = 0
+        clk.wait_until(time_pattern.TimePattern.from_string('13:00'))
+        self.assertTrue(mock_now.time_equals(13, 0))
+        self.assertLessEqual(mock_now.sleeps, 3 * 60)
+
         clk.stop()
 
 
@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 
 import copy
+import pickle
 import unittest
+from unittest.mock import patch
 
+from bardolph.controller import color_matrix
 from bardolph.controller.color_matrix import ColorMatrix, Rect
 
 # colors
@@ -109,6 +112,96 @@ class ColorMatrixTest(unittest.TestCase):
         rect = Rect(2, 5, 6, None)
         self.assertEqual(matrix._normalize_rect(rect), Rect(2, 5, 6, 6))
 
+    def test_none(self):
+        mat = ColorMatrix.new_from_constant(6, 5, None)
+        mat.overlay_color(Rect(1, 2, 3, 4), x)
+        colors = mat.as_list()
+        self.assertIsNone(colors[0])
+        self.assertListEqual(colors[8], x)
+        self.assertIsNone(mat.matrix[0][0])
+        self.assertListEqual(mat.matrix[1][3], x)
+
+        mat.find_replace(None, a)
+        expected = [x if color == x else a for color in colors]
+        self.assertListEqual(mat.as_list(), expected)
+
+    def test_find_replace(self):
+        mat = ColorMatrix.new_from_iterable(6, 5, iterable_srce())
+        mat.find_replace(f, None)
+        expected = [None if color == f else color for color in iterable_srce()]
+        self.assertListEqual(mat.as_list(), expected)
+
+    def test_get_colors(self):
+        mat = ColorMatrix.new_from_iterable(
+            1, 4, ([-1, 0.4, 0.6, 1.5], [2.5, 65535.2, 70000, 9], None, a))
+        self.assertListEqual(mat.get_colors(), [
+            [0, 0, 1, 2], [2, 65535, 65535, 9], None, a])
+        self.assertListEqual(
+            mat.standardized().as_list(), mat.get_colors())
+
+    def test_transformed(self):
+        srce = iterable_srce()
+        srce[3] = None
+        mat = ColorMatrix.new_from_iterable(6, 5, srce)
+        result = mat.transformed(
+            lambda colors: [[2 * value for value in color] for color in colors])
+        expected = [
+            None if color is None else [2 * value for value in color]
+            for color in srce]
+        self.assertListEqual(result.as_list(), expected)
+        self.assertListEqual(mat.as_list(), srce)
+
+    def test_set_from_matrix(self):
+        srce = ColorMatrix.new_from_iterable(6, 5, iterable_srce())
+        srce.overlay_color(Rect(0, 0, 0, 0), None)
+        mat = ColorMatrix(6, 5).set_from_matrix(srce)
+        self.assertListEqual(mat.as_list(), srce.as_list())
+
+    def test_copy(self):
+        srce = iterable_srce()
+        srce[3] = None
+        mat = ColorMatrix.new_from_iterable(6, 5, srce)
+        for copied in (copy.copy(mat), copy.deepcopy(mat),
+                       pickle.loads(pickle.dumps(mat))):
+            self.assertIs(type(copied), type(mat))
+            self.assertEqual(copied.height, 6)
+            self.assertEqual(copied.width, 5)
+            self.assertListEqual(copied.as_list(), srce)
+
+        copied = copy.deepcopy(mat)
+        copied.overlay_color(Rect(0, 0, 0, 0), x)
+        self.assertListEqual(mat.as_list(), srce)
+
+
+class ListColorMatrixTest(ColorMatrixTest):
+    """ The same tests, without numpy. """
+    def setUp(self):
+        patcher = patch.object(color_matrix, 'numpy', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_list(self):
+        self.assertNotIsInstance(
+            ColorMatrix(6, 5), color_matrix.ArrayColorMatrix)
+
+
+@unittest.skipIf(color_matrix.numpy is None, 'numpy is not installed')
+class ArrayColorMatrixTest(unittest.TestCase):
+    def test_read_only(self):
+        mat = ColorMatrix.new_from_constant(6, 5, a)
+        self.assertIsInstance(mat, color_matrix.ArrayColorMatrix)
+        with self.assertRaises(TypeError):
+            mat.matrix[0][0] = b
+        self.assertListEqual(mat.as_list(), [a] * 30)
+
+    def test_copy_list_matrix(self):
+        # A matrix pickled without numpy comes back the same way.
+        with patch.object(color_matrix, 'numpy', None):
+            data = pickle.dumps(ColorMatrix.new_from_constant(6, 5, a))
+        mat = pickle.loads(data)
+        self.assertNotIsInstance(mat, color_matrix.ArrayColorMatrix)
+        self.assertListEqual(mat.as_list(), [a] * 30)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+import threading
+import time
+import unittest
+
+from bardolph.controller.command_queue import CommandQueue
+from bardolph.lib import injection, settings
+
+
+class _Light:
+    def __init__(self, name='light'):
+        self._name = name
+        self.sent = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_uid(self):
+        return hash(self)
+
+    def get_name(self):
+        return self._name
+
+    def set_color(self, color):
+        self.entered.set()
+        self.release.wait()
+        self.sent.append(('color', color))
+
+    def set_power(self, power):
+        self.sent.append(('power', power))
+
+    def set_zone_colors(self, first_zone, last_zone, color):
+        self.sent.append(('zones', first_zone, last_zone, color))
+
+
+def _color(color):
+    return lambda light: light.set_color(color)
+
+
+def _zones(first_zone, last_zone, color):
+    return (
+        ('zones', first_zone, last_zone),
+        lambda light: light.set_zone_colors(first_zone, last_zone, color))
+
+
+def _power(power):
+    return lambda light: light.set_power(power)
+
+
+class CommandQueueTest(unittest.TestCase):
+    def setUp(self):
+        injection.configure()
+        settings.using({'min_send_interval': 0.0}).configure()
+
+    def test_idle(self):
+        queue = CommandQueue()
+        light = _Light()
+        for i in range(0, 5):
+            queue.submit(light, 'color', _color(i))
+        self.assertListEqual(light.sent, [('color', i) for i in range(0, 5)])
+        self.assertDictEqual(
+            queue.get_counters(),
+            {'submitted': 5, 'sent': 5, 'coalesced': 0})
+
+    def test_busy(self):
+        queue = CommandQueue()
+        light = _Light()
+        light.release.clear()
+        sender = threading.Thread(
+            target=queue.submit, args=(light, 'color', _color(0)))
+        sender.start()
+        light.entered.wait()
+
+        # These arrive while the first one is still being sent.
+        for i in range(1, 5):
+            queue.submit(light, 'color', _color(i))
+        queue.submit(light, 'power', _power(1))
+        light.release.set()
+        sender.join()
+
+        self.assertListEqual(
+            light.sent, [('color', 0), ('color', 4), ('power', 1)])
+        self.assertDictEqual(
+            queue.get_counters(),
+            {'submitted': 6, 'sent': 3, 'coalesced': 3})
+
+    def test_zones(self):
+        # Zones go out in order with the colors. Only a newer command for
+        # the same zones replaces one that's waiting.
+        queue = CommandQueue()
+        light = _Light()
+        light.release.clear()
+        sender = threading.Thread(
+            target=queue.submit, args=(light, 'color', _color(0)))
+        sender.start()
+        light.entered.wait()
+
+        queue.submit(light, 'color', _color(1))
+        queue.submit(light, *_zones(0, 5, 2))
+        queue.submit(light, *_zones(6, 8, 3))
+        queue.submit(light, *_zones(0, 5, 4))
+        light.release.set()
+        sender.join()
+
+        self.assertListEqual(light.sent, [
+            ('color', 0), ('color', 1), ('zones', 6, 8, 3),
+            ('zones', 0, 5, 4)])
+
+    def test_separate_lights(self):
+        queue = CommandQueue()
+        busy_light = _Light('busy')
+        busy_light.release.clear()
+        sender = threading.Thread(
+            target=queue.submit, args=(busy_light, 'color', _color(0)))
+        sender.start()
+        busy_light.entered.wait()
+
+        other_light = _Light('other')
+        queue.submit(other_light, 'color', _color(1))
+        queue.submit(other_light, 'color', _color(2))
+        self.assertListEqual(other_light.sent, [('color', 1), ('color', 2)])
+        busy_light.release.set()
+        sender.join()
+
+    def test_min_interval(self):
+        queue = CommandQueue(0.1)
+        light = _Light()
+        for i in range(0, 10):
+            queue.submit(light, 'color', _color(i))
+        self.assertListEqual(light.sent, [('color', 0)])
+        time.sleep(0.3)
+        self.assertListEqual(light.sent, [('color', 0), ('color', 9)])
+        self.assertEqual(queue.get_counters()['coalesced'], 8)
+
+    def test_exception(self):
+        queue = CommandQueue()
+        light = _Light()
+        def fail(_):
+            raise ValueError('no response')
+        self.assertRaises(ValueError, queue.submit, light, 'color', fail)
+        queue.submit(light, 'color', _color(1))
+        self.assertListEqual(light.sent, [('color', 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+import logging
+import os
+import tempfile
+import unittest
+
+from bardolph.controller.script_job import ScriptJob
+from bardolph.lib import settings
+from bardolph.parser.compile_cache import CompileCache
+from tests import test_module
+
+
+class CompileCacheTest(unittest.TestCase):
+    _script = """
+        define show with x begin println x end
+        assign y 5
+        repeat 3 with i from 1 to 3 begin
+            show {y + i}
+        end
+    """
+
+    def setUp(self):
+        test_module.configure()
+        settings.using({
+            'log_level': logging.ERROR,
+            'log_to_console': True,
+            'use_compile_cache': True,
+            'use_fakes': True
+        }).configure()
+        self._dir = tempfile.TemporaryDirectory()
+        self._file_name = os.path.join(self._dir.name, 'script.ls')
+        with open(self._file_name, 'w') as dest:
+            dest.write(self._script)
+        self._cache_dir = os.path.join(self._dir.name, CompileCache.DIR_NAME)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _run_file(self):
+        output = test_module.replace_print()
+        job = ScriptJob.from_file(self._file_name)
+        job.execute()
+        return output.get_objects()
+
+    def _entries(self):
+        if not os.path.isdir(self._cache_dir):
+            return []
+        return os.listdir(self._cache_dir)
+
+    def test_key(self):
+        cache = CompileCache(self._cache_dir)
+        self.assertEqual(cache.key('assign x 1'), cache.key('assign x 1'))
+        self.assertNotEqual(cache.key('assign x 1'), cache.key('assign x 2'))
+
+    def test_miss_then_hit(self):
+        cache = CompileCache.for_script(self._file_name)
+        self.assertEqual(cache.cache_dir, self._cache_dir)
+        self.assertIsNone(cache.get(self._script))
+
+        expected = [6, '\n', 7, '\n', 8, '\n']
+        self.assertListEqual(self._run_file(), expected)
+        self.assertEqual(len(self._entries()), 1)
+        self.assertIsNotNone(cache.get(self._script))
+
+        self.assertListEqual(self._run_file(), expected)
+        self.assertEqual(len(self._entries()), 1)
+
+    def test_changed_source(self):
+        self._run_file()
+        with open(self._file_name, 'w') as dest:
+            dest.write('println 10')
+        self.assertListEqual(self._run_file(), [10, '\n'])
+        self.assertEqual(len(self._entries()), 2)
+
+    def test_corrupt_entry(self):
+        cache = CompileCache.for_script(self._file_name)
+        os.makedirs(self._cache_dir)
+        with open(cache.path(self._script), 'wb') as dest:
+            dest.write(b'not a program')
+        self.assertIsNone(cache.get(self._script))
+        self.assertListEqual(self._run_file(), [6, '\n', 7, '\n', 8, '\n'])
+        self.assertIsNotNone(cache.get(self._script))
+
+    def test_writable_by_others(self):
+        # An entry anyone else could have written is never unpickled.
+        self._run_file()
+        cache = CompileCache.for_script(self._file_name)
+        path = cache.path(self._script)
+        os.chmod(path, 0o666)
+        self.assertIsNone(cache.get(self._script))
+
+        os.chmod(path, 0o644)
+        program = cache.get(self._script)
+        self.assertIsNotNone(program)
+        os.chmod(self._cache_dir, 0o777)
+        self.assertIsNone(cache.get(self._script))
+        self.assertFalse(cache.put(self._script, program))
+        self.assertListEqual(self._run_file(), [6, '\n', 7, '\n', 8, '\n'])
+
+    def test_disabled(self):
+        settings.using({
+            'log_level': logging.ERROR,
+            'use_compile_cache': False,
+            'use_fakes': True
+        }).configure()
+        self.assertListEqual(self._run_file(), [6, '\n', 7, '\n', 8, '\n'])
+        self.assertListEqual(self._entries(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
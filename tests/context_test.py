@@ -4,6 +4,7 @@ import unittest
 
 from bardolph.controller.routine import Routine
 from bardolph.parser.context import Context
+from bardolph.vm.slot import Scope, Slot
 
 
 class ContextTest(unittest.TestCase):
@@ -37,6 +38,41 @@ class ContextTest(unittest.TestCase):
         self.assertTrue(context.get_routine('a').undefined)
         self.assertEqual(context.get_routine('routine').name, 'routine')
 
+    def test_slots(self):
+        context = Context()
+        self.assertEqual(
+            context.add_variable('g'), Slot('g', Scope.GLOBAL, 0))
+        self.assertEqual(
+            context.add_variable('h'), Slot('h', Scope.GLOBAL, 1))
+        self.assertEqual(
+            context.add_variable('g', 5), Slot('g', Scope.GLOBAL, 0))
+
+        routine = Routine('routine')
+        context.enter_routine(routine)
+        self.assertEqual(context.add_param('g'), Slot('g', Scope.LOCAL, 0))
+        self.assertEqual(
+            context.add_variable('a'), Slot('a', Scope.LOCAL, 1))
+        self.assertEqual(
+            context.add_variable('h'), Slot('h', Scope.GLOBAL, 1))
+        self.assertEqual(context.get_slot('g'), Slot('g', Scope.LOCAL, 0))
+        context.exit_routine()
+
+        self.assertEqual(routine.frame_size, 2)
+        self.assertEqual(context.get_slot('g'), Slot('g', Scope.GLOBAL, 0))
+        self.assertEqual(
+            context.add_variable('b'), Slot('b', Scope.GLOBAL, 2))
+
+    def test_global_after_routine(self):
+        context = Context()
+        context.enter_routine(Routine('routine'))
+        local = context.add_variable('a')
+        self.assertEqual(local, Slot('a', Scope.LOCAL, 0))
+        context.exit_routine()
+
+        self.assertEqual(context.add_variable('b'), Slot('b', Scope.GLOBAL, 0))
+        self.assertEqual(context.add_variable('a'), Slot('a', Scope.GLOBAL, 1))
+        self.assertEqual(local, Slot('a', Scope.GLOBAL, 1))
+
 
 if __name__ == '__main__':
     unittest.main()
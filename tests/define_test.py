@@ -292,6 +292,35 @@ class DefineTest(unittest.TestCase):
             (Action.SET_COLOR, [500, 0, 0, 0], 0)
         ])
 
+    def test_global_defined_later(self):
+        # A routine that assigns to a name that the script makes global
+        # afterwards assigns to the global.
+        output = test_module.replace_print()
+        script = """
+            define f begin assign x 5 end
+            assign x 1
+            f
+            print x
+        """
+        self._runner.run_script(script)
+        self.assertListEqual(output.get_objects(), [5])
+
+    def test_global_defined_later_recursive(self):
+        output = test_module.replace_print()
+        script = """
+            define f with n begin
+                if {n > 0} begin
+                    assign y n
+                    f {n - 1}
+                end
+            end
+            assign y 0
+            f 3
+            print y
+        """
+        self._runner.run_script(script)
+        self.assertListEqual(output.get_objects(), [1])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import unittest
+
+from bardolph.controller import i_controller, lifx_async_api
+from bardolph.controller.discovery_cache import DiscoveryCache
+from bardolph.controller.light_set import LightSet
+from bardolph.fakes.lan_stand_in import LanStandIn, VirtualDevice
+from bardolph.lib import injection, settings
+from bardolph.lib.injection import provide
+
+
+class DiscoveryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._temp_dir.name, 'discovery.json')
+        self._stand_in = LanStandIn((
+            VirtualDevice(
+                'd0:73:d5:00:00:01', 'Top', 'Pole', 'Home', product=27),
+            VirtualDevice(
+                'd0:73:d5:00:00:03', 'Strip', 'Outside', 'Away',
+                product=0, num_zones=12),
+            VirtualDevice(
+                'd0:73:d5:00:00:04', 'Candle', 'Table', 'Home',
+                product=0, height=6, width=5))).start()
+        injection.configure()
+        settings.using({
+            'discovery_cache_file': self._path,
+            'lan_broadcast': '127.0.0.1',
+            'lan_port': self._stand_in.port,
+            'lan_retries': 0,
+            'lan_timeout': 0.1,
+            'single_light_discover': True,
+            'use_discovery_cache': True
+        }).configure()
+        lifx_async_api.configure()
+
+    def tearDown(self):
+        provide(i_controller.LightApi).close()
+        self._stand_in.stop()
+        self._temp_dir.cleanup()
+
+    def test_save(self):
+        light_set = LightSet(DiscoveryCache(self._path))
+        self.assertFalse(light_set.restore())
+        self.assertTrue(light_set.discover())
+        records = {
+            record['label']: record
+            for record in DiscoveryCache(self._path).load()
+        }
+        self.assertSetEqual(set(records), {'Top', 'Strip', 'Candle'})
+        self.assertEqual(records['Top']['mac'], 'd0:73:d5:00:00:01')
+        self.assertEqual(records['Top']['port'], self._stand_in.port)
+        self.assertEqual(records['Strip']['num_zones'], 12)
+        self.assertTrue(records['Strip']['features']['multizone'])
+        self.assertEqual(records['Candle']['height'], 6)
+        self.assertEqual(records['Candle']['width'], 5)
+
+    def test_restore(self):
+        LightSet(DiscoveryCache(self._path)).discover()
+        self._stand_in.get_device('d0:73:d5:00:00:01').responsive = False
+        received = len(self._stand_in.get_device('d0:73:d5:00:00:03').received)
+
+        light_set = LightSet(DiscoveryCache(self._path))
+        self.assertTrue(light_set.restore())
+        self.assertListEqual(
+            list(light_set.get_light_names()), ['Candle', 'Strip', 'Top'])
+        self.assertListEqual(list(light_set.get_group_lights('Pole')), ['Top'])
+        self.assertEqual(light_set.get_light('Strip').get_width(), 12)
+        self.assertEqual(light_set.get_light('Candle').get_height(), 6)
+
+        # Nothing was sent to the devices.
+        self.assertEqual(
+            len(self._stand_in.get_device('d0:73:d5:00:00:03').received),
+            received)
+
+    def test_rename(self):
+        LightSet(DiscoveryCache(self._path)).discover()
+        self._stand_in.get_device('d0:73:d5:00:00:01').label = 'Upper'
+
+        light_set = LightSet(DiscoveryCache(self._path))
+        light_set.restore()
+        self.assertIsNotNone(light_set.get_light('Top'))
+        light_set.discover()
+        self.assertIsNone(light_set.get_light('Top'))
+        self.assertIsNotNone(light_set.get_light('Upper'))
+        self.assertListEqual(
+            list(light_set.get_group_lights('Pole')), ['Upper'])
+        labels = [record['label']
+                  for record in DiscoveryCache(self._path).load()]
+        self.assertIn('Upper', labels)
+        self.assertNotIn('Top', labels)
+
+    def test_bad_file(self):
+        with open(self._path, 'w') as dest:
+            dest.write('{"version": 1, "lights": [{"label": "x"}')
+        self.assertListEqual(DiscoveryCache(self._path).load(), [])
+        light_set = LightSet(DiscoveryCache(self._path))
+        self.assertFalse(light_set.restore())
+
+
+if __name__ == '__main__':
+    unittest.main()
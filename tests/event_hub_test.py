@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+import json
+import threading
+import unittest
+
+from web.event_hub import EventHub
+
+
+def _parse(text):
+    fields = {}
+    for line in text.strip().split('\n'):
+        key, _, value = line.partition(': ')
+        fields[key] = value
+    if 'data' in fields:
+        fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+class EventHubTest(unittest.TestCase):
+    def test_publish(self):
+        hub = EventHub()
+        stream = hub.subscribe(keep_alive=1.0)
+        hub.publish('jobs', {'current': 'a'})
+        hub.publish('lights', {'Top': {'power': 1}})
+        first = _parse(next(stream))
+        second = _parse(next(stream))
+        self.assertEqual(first['event'], 'jobs')
+        self.assertDictEqual(first['data'], {'current': 'a'})
+        self.assertEqual(second['event'], 'lights')
+        self.assertEqual(int(second['id']), int(first['id']) + 1)
+
+    def test_full_state(self):
+        hub = EventHub()
+        hub.publish('lights', {'a': 1}, {'a': 1, 'b': 2})
+        hub.publish('jobs', {'current': None}, {'current': None})
+        stream = hub.subscribe(keep_alive=1.0)
+        initial = [_parse(next(stream)) for _ in range(0, 2)]
+        self.assertListEqual(
+            [event['data'] for event in initial],
+            [{'a': 1, 'b': 2}, {'current': None}])
+
+        hub.publish('lights', {'b': None}, {'a': 1})
+        self.assertDictEqual(_parse(next(stream))['data'], {'b': None})
+
+    def test_shared_text(self):
+        # Every subscriber gets the same text, which was formatted once.
+        hub = EventHub()
+        streams = [hub.subscribe(keep_alive=1.0) for _ in range(0, 10)]
+        hub.publish('jobs', {'current': 'a'})
+        results = [next(stream) for stream in streams]
+        self.assertTrue(all(text is results[0] for text in results))
+
+    def test_waiting(self):
+        hub = EventHub()
+        stream = hub.subscribe(keep_alive=5.0)
+        results = []
+        reader = threading.Thread(target=lambda: results.append(next(stream)))
+        reader.start()
+        hub.publish('jobs', {'current': 'a'})
+        reader.join(1.0)
+        self.assertEqual(_parse(results[0])['event'], 'jobs')
+
+    def test_keep_alive(self):
+        hub = EventHub()
+        stream = hub.subscribe(keep_alive=0.01)
+        self.assertTrue(next(stream).startswith(':'))
+
+    def test_fall_behind(self):
+        hub = EventHub()
+        stream = hub.subscribe(keep_alive=1.0)
+        for i in range(0, EventHub.MAX_EVENTS + 5):
+            hub.publish('lights', {'a': i}, {'a': i, 'b': 0})
+        self.assertDictEqual(
+            _parse(next(stream))['data'],
+            {'a': EventHub.MAX_EVENTS + 4, 'b': 0})
+
+    def test_max_subscribers(self):
+        # A subscriber past the limit is told to come back later, and its
+        # stream ends, so it doesn't hold on to a thread.
+        hub = EventHub(max_subscribers=1)
+        hub.publish('jobs', {'current': None}, {'current': None})
+        first = hub.subscribe(keep_alive=1.0)
+        self.assertEqual(_parse(next(first))['event'], 'jobs')
+        self.assertEqual(hub.get_num_subscribers(), 1)
+
+        second = hub.subscribe(keep_alive=1.0)
+        self.assertEqual(
+            _parse(next(second))['retry'],
+            str(int(EventHub.BUSY_RETRY * 1000)))
+        self.assertRaises(StopIteration, next, second)
+
+        first.close()
+        self.assertEqual(hub.get_num_subscribers(), 0)
+        third = hub.subscribe(keep_alive=1.0)
+        self.assertEqual(_parse(next(third))['event'], 'jobs')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,10 +11,14 @@ module_names = (
     'candle_test',
     'clock_test',
     'code_gen_test',
+    'command_queue_test',
     'color_matrix_test',
+    'compile_cache_test',
     'context_test',
     'define_test',
+    'discovery_cache_test',
     'end_to_end_test',
+    'event_hub_test',
     'example_test',
     'expr_test',
     'fake_light_builder_test',
@@ -23,21 +27,35 @@ module_names = (
     'io_parser_test',
     'job_control_test',
     'lex_test',
+    'lifx_async_test',
+    'lifx_lan_light_test',
+    'light_dispatch_test',
+    'light_set_state_test',
     'light_set_test',
     'log_config_test',
     'loop_test',
     'ls_module_test',
     'math_runtime_test',
+    'matrix_delta_test',
+    'native_suite_test',
+    'native_test',
     'noneable_test',
     'optimizer_test',
     'param_helper_test',
     'parser_test',
     'print_test',
+    'program_test',
     'query_test',
+    'registers_test',
     'retry_test',
+    'scheduler_test',
+    'script_library_test',
     'settings_test',
+    'shadow_state_test',
     'sorted_list_test',
+    'status_collector_test',
     'time_pattern_test',
+    'timer_service_test',
     'units_test',
     'vm_discover_test',
     'vm_math_test',
@@ -1,9 +1,15 @@
 #!/usr/bin/env python
 
+import threading
 import time
 import unittest.mock
 
+from bardolph.controller import i_controller
+from bardolph.controller.script_job import ScriptJob
 from bardolph.lib import job_control
+from bardolph.lib.injection import provide
+from bardolph.lib.job_control import Priority
+from tests import test_module
 
 
 class TestJob(job_control.Job):
@@ -61,6 +67,23 @@ class TrackedJob(StoppableJob):
         super().execute()
 
 
+class BlockingJob(StoppableJob):
+    """ Runs until it's released or stopped. """
+    def __init__(self, job_id=None, call_list=None):
+        super().__init__()
+        self._id = job_id
+        self._call_list = call_list
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def execute(self):
+        if self._call_list is not None:
+            self._call_list.append(self._id)
+        self.started.set()
+        while not self.release.wait(0.01) and not self.stop_requested:
+            pass
+
+
 class JobControlTest(unittest.TestCase):
     def setUp(self):
         self.failed = False
@@ -104,6 +127,152 @@ class JobControlTest(unittest.TestCase):
         self.assertEqual(job1.call_count, 1)
         self.assertEqual(job2.call_count, 1)
 
+    def test_priority_order(self):
+        j_control = job_control.JobControl()
+        call_list = []
+        first = BlockingJob('first', call_list)
+        j_control.add_job(first)
+        self.assertTrue(first.started.wait(1.0))
+        j_control.add_job(TrackedJob('low', call_list), 'low', Priority.LOW)
+        j_control.add_job(TrackedJob('normal 1', call_list), 'normal 1')
+        j_control.add_job(TrackedJob('normal 2', call_list), 'normal 2')
+        self.assertListEqual(
+            [agent.name for agent in j_control.get_queued()],
+            ['normal 1', 'normal 2', 'low'])
+        first.release.set()
+        self.wait_for_threads(j_control)
+        self.assertListEqual(
+            call_list, ['first', 'normal 1', 'normal 2', 'low'])
+
+    def test_preempt(self):
+        j_control = job_control.JobControl()
+        call_list = []
+        low = BlockingJob('low', call_list)
+        j_control.add_job(low, 'low', Priority.LOW)
+        self.assertTrue(low.started.wait(1.0))
+        j_control.insert_job(TrackedJob('urgent', call_list), 'urgent')
+        self.wait_for_threads(j_control)
+        self.assertTrue(low.stop_requested)
+        self.assertListEqual(call_list, ['low', 'urgent'])
+        history = j_control.get_history()
+        self.assertListEqual(
+            [agent.name for agent in history], ['low', 'urgent'])
+        self.assertTrue(history[0].preempted)
+
+    def test_no_preempt_same_priority(self):
+        j_control = job_control.JobControl()
+        running = BlockingJob()
+        j_control.add_job(running)
+        self.assertTrue(running.started.wait(1.0))
+        j_control.add_job(TestJob())
+        time.sleep(0.05)
+        self.assertFalse(running.stop_requested)
+        running.release.set()
+        self.wait_for_threads(j_control)
+
+    def test_max_workers(self):
+        j_control = job_control.JobControl(max_workers=2)
+        jobs = [BlockingJob() for _ in range(0, 4)]
+        for i, job in enumerate(jobs):
+            j_control.spawn_job(job, 'job {}'.format(i))
+        self.assertTrue(jobs[0].started.wait(1.0))
+        self.assertTrue(jobs[1].started.wait(1.0))
+        time.sleep(0.05)
+        self.assertFalse(jobs[2].started.is_set())
+        self.assertEqual(j_control.get_worker_count(), 2)
+
+        # The finished job's thread moves on to the next job.
+        jobs[0].release.set()
+        self.assertTrue(jobs[2].started.wait(1.0))
+        self.assertEqual(j_control.get_worker_count(), 2)
+        for job in jobs:
+            job.release.set()
+        self.wait_for_threads(j_control)
+        for _ in range(0, 100):
+            if j_control.get_worker_count() == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(j_control.get_worker_count(), 0)
+
+    def test_times(self):
+        j_control = job_control.JobControl()
+        first = BlockingJob()
+        second = BlockingJob()
+        j_control.add_job(first, 'first')
+        j_control.add_job(second, 'second')
+        time.sleep(0.1)
+        first.release.set()
+        second.release.set()
+        self.wait_for_threads(j_control)
+        first_agent, second_agent = j_control.get_history()
+        self.assertLess(first_agent.wait_time, 0.05)
+        self.assertGreaterEqual(first_agent.run_time, 0.1)
+        self.assertGreaterEqual(second_agent.wait_time, 0.1)
+        self.assertLess(second_agent.run_time, 0.05)
+
+    def test_clear_queue(self):
+        # Jobs waiting behind the current one are dropped, and the queue is
+        # only cleared by the thread that holds the lock.
+        j_control = job_control.JobControl()
+        blocking = BlockingJob()
+        self.addCleanup(blocking.release.set)
+        unwanted = UnwantedJob()
+        j_control.add_job(blocking)
+        blocking.started.wait(1.0)
+        j_control.add_job(unwanted)
+
+        holding, done = threading.Event(), threading.Event()
+        self.addCleanup(done.set)
+        def hold_lock():
+            with j_control._lock:
+                holding.set()
+                done.wait(1.0)
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        holding.wait(1.0)
+        clearer = threading.Thread(target=j_control.clear_queue)
+        clearer.start()
+        clearer.join(0.1)
+        self.assertEqual(len(j_control.get_queued()), 1)
+        done.set()
+        holder.join()
+        clearer.join()
+        self.assertListEqual(j_control.get_queued(), [])
+
+        blocking.release.set()
+        self.wait_for_threads(j_control)
+        self.assertFalse(unwanted.failed)
+
+    def test_stop_pending(self):
+        # A job that's stopped while waiting for a worker never runs.
+        j_control = job_control.JobControl(max_workers=1)
+        first = BlockingJob()
+        second = TestJob()
+        j_control.spawn_job(first, 'first')
+        j_control.spawn_job(second, 'second')
+        self.assertTrue(first.started.wait(1.0))
+        self.assertTrue(j_control.stop_job('second'))
+        first.release.set()
+        self.wait_for_threads(j_control)
+        second.execute.assert_not_called()
+
+    def test_stop_pending_script(self):
+        test_module.configure()
+        top = provide(i_controller.LightSet).get_light('Top')
+        j_control = job_control.JobControl(max_workers=1)
+        first = BlockingJob()
+        script = ScriptJob.from_string('hue 100 set "Top"')
+        j_control.spawn_job(first, 'first')
+        j_control.spawn_job(script, 'script')
+        self.assertTrue(first.started.wait(1.0))
+        self.assertTrue(j_control.stop_job('script'))
+        first.release.set()
+        self.wait_for_threads(j_control)
+
+        # Even if the script gets started anyway, the stop isn't forgotten.
+        script.execute()
+        self.assertListEqual(top.get_call_list(), [])
+
 
 if __name__ == "__main__":
     unittest.main()
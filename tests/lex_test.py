@@ -148,6 +148,30 @@ class LexTest(unittest.TestCase):
         ]
         self._lex_and_compare_pairs(input_string, expected)
 
+    def test_classification(self):
+        input_string = 'DEFINE Repeat hue h 12:30) x%2 .5 "open'
+        expected = [
+            TokenTypes.DEFINE, 'DEFINE',
+            TokenTypes.REPEAT, 'Repeat',
+            TokenTypes.REGISTER, 'hue',
+            TokenTypes.NAME, 'h',
+            TokenTypes.NUMBER, '12',
+            TokenTypes.MARK, ':',
+            TokenTypes.NUMBER, '30',
+            TokenTypes.MARK, ')',
+            TokenTypes.NAME, 'x',
+            TokenTypes.ERROR, '%2',
+            TokenTypes.NUMBER, '.5',
+            TokenTypes.ERROR, '"open'
+        ]
+        self._lex_and_compare_pairs(input_string, expected)
+
+    def test_line_numbers(self):
+        tokens = list(Lex('a\n\nb # c\nd', 'f.ls').tokens())
+        self.assertListEqual(
+            [token.line_number for token in tokens[:-1]], [1, 3, 4])
+        self.assertEqual(tokens[0].file_name, 'f.ls')
+
     def _lex_and_compare_pairs(self, input_string, expected):
         it = iter(expected)
         expected_tokens = [Token(token_type, next(it)) for token_type in it]
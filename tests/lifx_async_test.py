@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+import time
+import unittest
+
+from bardolph.controller import i_controller, light_set, lifx_async_api
+from bardolph.controller.color_matrix import ColorMatrix
+from bardolph.controller.lifx_protocol import MessageType
+from bardolph.fakes.lan_stand_in import LanStandIn, VirtualDevice
+from bardolph.lib import injection, settings
+from bardolph.lib.injection import provide
+
+
+class LifxAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self._stand_in = LanStandIn((
+            VirtualDevice(
+                'd0:73:d5:00:00:01', 'Top', 'Pole', 'Home', product=27),
+            VirtualDevice(
+                'd0:73:d5:00:00:02', 'Bottom', 'Pole', 'Home', product=27),
+            VirtualDevice(
+                'd0:73:d5:00:00:03', 'Strip', 'Outside', 'Away',
+                product=0, num_zones=12),
+            VirtualDevice(
+                'd0:73:d5:00:00:04', 'Candle', 'Table', 'Home',
+                product=0, height=6, width=5))).start()
+        injection.configure()
+        settings.using({
+            'lan_broadcast': '127.0.0.1',
+            'lan_port': self._stand_in.port,
+            'lan_retries': 1,
+            'lan_timeout': 0.1,
+            'single_light_discover': True
+        }).configure()
+        lifx_async_api.configure()
+        self._api = provide(i_controller.LightApi)
+
+    def tearDown(self):
+        self._api.close()
+        self._stand_in.stop()
+
+    def _lights(self) -> dict:
+        return {light.get_name(): light for light in self._api.get_lights()}
+
+    @staticmethod
+    def _wait_for(condition) -> bool:
+        # Setting a color doesn't wait for the device.
+        for _ in range(0, 100):
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_discover(self):
+        lights = self._lights()
+        self.assertSetEqual(
+            set(lights), {'Top', 'Bottom', 'Strip', 'Candle'})
+        self.assertEqual(lights['Top'].get_group(), 'Pole')
+        self.assertEqual(lights['Strip'].get_location(), 'Away')
+        self.assertTrue(lights['Strip'].product_features['multizone'])
+        self.assertEqual(lights['Strip'].get_width(), 12)
+        self.assertTrue(lights['Candle'].product_features['matrix'])
+        self.assertEqual(lights['Candle'].get_height(), 6)
+        self.assertEqual(lights['Candle'].get_width(), 5)
+        self.assertFalse(lights['Top'].product_features['multizone'])
+        self.assertFalse(lights['Top'].product_features['matrix'])
+
+    def test_color_and_power(self):
+        light = self._lights()['Top']
+        device = self._stand_in.get_device('d0:73:d5:00:00:01')
+        light.set_color([100, 200, 300, 4000], 0)
+        self.assertTrue(
+            self._wait_for(lambda: device.color == [100, 200, 300, 4000]))
+        self.assertListEqual(light.get_color(), [100, 200, 300, 4000])
+
+        light.set_power(65535, 0)
+        self.assertTrue(self._wait_for(lambda: device.power == 65535))
+        self.assertEqual(light.get_power(), 65535)
+
+    def test_zones(self):
+        light = self._lights()['Strip']
+        device = self._stand_in.get_device('d0:73:d5:00:00:03')
+        light.set_zone_colors(2, 10, [1, 2, 3, 4], 0)
+        self.assertTrue(
+            self._wait_for(lambda: device.zones[9] == [1, 2, 3, 4]))
+        colors = light.get_zone_colors()
+        self.assertEqual(len(colors), 12)
+        self.assertListEqual(colors[1], [0, 0, 0, 0])
+        self.assertListEqual(colors[2], [1, 2, 3, 4])
+        self.assertListEqual(colors[9], [1, 2, 3, 4])
+        self.assertListEqual(colors[10], [0, 0, 0, 0])
+        self.assertListEqual(light.get_zone_colors(8, 10), colors[8:10])
+
+    def test_matrix(self):
+        light = self._lights()['Candle']
+        device = self._stand_in.get_device('d0:73:d5:00:00:04')
+        matrix = ColorMatrix.new_from_constant(6, 5, [10, 20, 30, 40])
+        light.set_matrix(matrix)
+        self.assertTrue(
+            self._wait_for(lambda: device.cells[0] != [0, 0, 0, 0]))
+        result = light.get_matrix()
+        self.assertEqual(result.height, 6)
+        self.assertListEqual(result.get_colors(), matrix.get_colors())
+
+    def test_no_cells(self):
+        # A matrix light without any cells reports that the set failed.
+        light = self._lights()['Candle']
+        light._device.height = 0
+        matrix = ColorMatrix.new_from_constant(6, 5, [10, 20, 30, 40])
+        self.assertIs(light._set_matrix(matrix), False)
+
+    def test_unresponsive(self):
+        device = self._stand_in.get_device('d0:73:d5:00:00:02')
+        device.responsive = False
+        lights = self._lights()
+        self.assertNotIn('Bottom', lights)
+
+        device.responsive = True
+        light = self._lights()['Bottom']
+        device.responsive = False
+        self.assertListEqual(light.get_color(), [-1, -1, -1, -1])
+        self.assertIsNone(light.get_power())
+
+    def test_unhandled(self):
+        # A plain bulb answers a matrix request with StateUnhandled, which
+        # completes the request without waiting for a timeout.
+        self._lights()
+        endpoint = self._api._lan.endpoint
+        target = self._stand_in.get_device('d0:73:d5:00:00:01').target
+        start = time.perf_counter()
+        responses = self._api._lan.run(endpoint.request(
+            ('127.0.0.1', self._stand_in.port), target,
+            MessageType.GET_DEVICE_CHAIN, (),
+            (MessageType.STATE_DEVICE_CHAIN,)))
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(len(responses), 1)
+        self.assertIs(responses[0][0].msg_type, MessageType.STATE_UNHANDLED)
+
+    def test_light_set(self):
+        light_set.configure()
+        lights = provide(i_controller.LightSet)
+        self.assertListEqual(
+            list(lights.get_group_lights('Pole')), ['Bottom', 'Top'])
+        failed = lights.set_color_lights(
+            lights.get_group_lights('Pole'), [5, 6, 7, 8], 0)
+        self.assertListEqual(failed, [])
+        for mac in ('d0:73:d5:00:00:01', 'd0:73:d5:00:00:02'):
+            device = self._stand_in.get_device(mac)
+            self.assertTrue(
+                self._wait_for(lambda: device.color == [5, 6, 7, 8]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+import time
+import unittest
+
+from lifxlan.errors import WorkflowException
+from lifxlan.msgtypes import SetTileState64
+
+from bardolph.controller import lifx_lan_light
+from bardolph.controller.color_matrix import ColorMatrix, Rect
+from bardolph.lib import injection, settings
+
+# tile_index, length, reserved, x, y, width, duration, then 64 colors.
+_SET_64_BYTES = 10 + 64 * 8
+
+
+class _MatrixImpl:
+    """
+    Stands in for a lifxlan device with one tile. Each SetTileState64 is
+    applied the way the protocol says: the colors fill a window at x and y,
+    row by row, each row as long as the width, and whatever falls off the
+    tile is ignored.
+    """
+    def __init__(self, test_case, height, width):
+        self._test_case = test_case
+        self._height = height
+        self._width = width
+        self.cells = [[0, 0, 0, 0]] * (height * width)
+        self.payloads = []
+
+    def get_mac_addr(self):
+        return 'd0:73:d5:00:00:01'
+
+    def set_color(self, color, duration, rapid):
+        self.cells = [color] * (self._height * self._width)
+
+    def fire_and_forget(self, msg_type, payload, num_repeats):
+        self._test_case.assertIs(msg_type, SetTileState64)
+        message = SetTileState64(None, 0, 0, payload)
+        self._test_case.assertEqual(len(message.get_payload()), _SET_64_BYTES)
+        self.payloads.append(payload)
+        x, y, width = payload['x'], payload['y'], payload['width']
+        for i, color in enumerate(payload['colors']):
+            row, column = y + i // width, x + i % width
+            if row < self._height and column < self._width:
+                self.cells[row * self._width + column] = color
+
+
+class _FailingImpl:
+    """ Stands in for a lifxlan device that never answers. """
+    def __init__(self):
+        self.calls = []
+
+    def get_mac_addr(self):
+        return 'd0:73:d5:00:00:02'
+
+    def get_color(self):
+        self.calls.append('get_color')
+        raise WorkflowException('no answer')
+
+    def set_color(self, color, duration, rapid):
+        self.calls.append('set_color')
+        raise WorkflowException('no answer')
+
+    def set_power(self, power, duration, rapid):
+        self.calls.append('set_power')
+        raise WorkflowException('no answer')
+
+    def fire_and_forget(self, msg_type, payload, num_repeats):
+        self.calls.append('set_matrix')
+        raise WorkflowException('no answer')
+
+
+def _record(height, width):
+    return {
+        'label': 'Matrix',
+        'group': 'Group',
+        'location': 'Location',
+        'features': {'color': True, 'matrix': True},
+        'height': height,
+        'width': width
+    }
+
+
+class LifxLanLightTest(unittest.TestCase):
+    def _configure(self, full_frame_time=10.0):
+        injection.configure()
+        settings.using({
+            'matrix_full_frame_time': full_frame_time,
+            'shadow_ttl': 0.0
+        }).configure()
+
+    def _light(self, height, width):
+        impl = _MatrixImpl(self, height, width)
+        return lifx_lan_light.MatrixLight(impl, _record(height, width)), impl
+
+    def setUp(self):
+        self._configure()
+
+    def test_one_message(self):
+        light, impl = self._light(6, 5)
+        matrix = ColorMatrix.new_from_constant(6, 5, [1, 2, 3, 4])
+        light.set_matrix(matrix)
+        self.assertEqual(len(impl.payloads), 1)
+        self.assertEqual(impl.payloads[0]['width'], 5)
+        self.assertListEqual(impl.cells, matrix.get_colors())
+
+        matrix.overlay_color(Rect(2, 2, 1, 1), [5, 6, 7, 8])
+        light.set_matrix(matrix)
+        self.assertEqual(len(impl.payloads), 2)
+        self.assertListEqual(impl.cells, matrix.get_colors())
+
+    def test_delta(self):
+        light, impl = self._light(8, 16)
+        matrix = ColorMatrix.new_from_constant(8, 16, [1, 2, 3, 4])
+        light.set_matrix(matrix)
+        self.assertListEqual(
+            [(payload['x'], payload['y']) for payload in impl.payloads],
+            [(0, 0), (0, 4)])
+        self.assertListEqual(impl.cells, matrix.get_colors())
+
+        # A narrow change reaching from top to bottom needs one message.
+        impl.payloads.clear()
+        matrix.overlay_color(Rect(0, 7, 2, 3), [5, 6, 7, 8])
+        light.set_matrix(matrix)
+        self.assertEqual(len(impl.payloads), 1)
+        self.assertEqual(impl.payloads[0]['width'], 2)
+        self.assertListEqual(impl.cells, matrix.get_colors())
+
+        # Nothing changed, so nothing is sent.
+        impl.payloads.clear()
+        light.set_matrix(matrix)
+        self.assertListEqual(impl.payloads, [])
+
+    def test_full_frame_time(self):
+        # Even while every set is a delta, the whole matrix goes out again
+        # once matrix_full_frame_time has passed.
+        self._configure(0.05)
+        light, impl = self._light(8, 16)
+        matrix = ColorMatrix.new_from_constant(8, 16, [1, 2, 3, 4])
+        light.set_matrix(matrix)
+        impl.payloads.clear()
+        deadline = time.monotonic() + 0.2
+        hue = 0
+        while time.monotonic() < deadline:
+            hue += 1
+            matrix.overlay_color(Rect(5, 5, 0, 0), [hue, 0, 0, 0])
+            light.set_matrix(matrix)
+            time.sleep(0.01)
+        self.assertIn(
+            (0, 0), [(payload['x'], payload['y']) for payload in impl.payloads])
+        self.assertListEqual(impl.cells, matrix.get_colors())
+
+    def test_set_color(self):
+        light, impl = self._light(8, 16)
+        matrix = ColorMatrix.new_from_constant(8, 16, [1, 2, 3, 4])
+        light.set_matrix(matrix)
+        impl.payloads.clear()
+
+        # Setting the color of the whole light changes every cell.
+        light.set_color([0, 0, 0, 0], 0)
+        light.set_matrix(matrix)
+        self.assertEqual(len(impl.payloads), 2)
+        self.assertListEqual(impl.cells, matrix.get_colors())
+
+    def test_failed_set(self):
+        # A set that never got through isn't remembered by the shadow, so
+        # the same set is tried again.
+        settings.using({'shadow_ttl': 10.0}).configure()
+        impl = _FailingImpl()
+        light = lifx_lan_light.Light(impl, _record(0, 0))
+        for _ in range(0, 2):
+            light.set_color([1, 2, 3, 4], 0)
+            light.set_power(65535, 0)
+        self.assertEqual(impl.calls.count('set_color'), 6)
+        self.assertEqual(impl.calls.count('set_power'), 6)
+        light.get_color()
+        self.assertIn('get_color', impl.calls)
+
+        matrix_light = lifx_lan_light.MatrixLight(impl, _record(6, 5))
+        matrix = ColorMatrix.new_from_constant(6, 5, [1, 2, 3, 4])
+        impl.calls.clear()
+        matrix_light.set_matrix(matrix)
+        matrix_light.set_matrix(matrix)
+        self.assertEqual(impl.calls.count('set_matrix'), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+import concurrent.futures
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from bardolph.controller.light_dispatch import LightDispatch
+from bardolph.lib import injection, settings
+
+
+class _Light:
+    def __init__(self, name, delay=0.0, fail=False):
+        self._name = name
+        self._delay = delay
+        self._fail = fail
+        self.finished = None
+
+    def get_name(self):
+        return self._name
+
+    def set_color(self, color, duration):
+        if self._delay > 0.0:
+            time.sleep(self._delay)
+        if self._fail:
+            raise ValueError('no response')
+        self.finished = time.perf_counter()
+
+
+class LightDispatchTest(unittest.TestCase):
+    def setUp(self):
+        injection.configure()
+        settings.using({
+            'dispatch_deadline': 0.5,
+            'dispatch_threads': 8
+        }).configure()
+        self._dispatch = LightDispatch()
+
+    def tearDown(self):
+        self._dispatch.shutdown()
+
+    @staticmethod
+    def _set_color(light):
+        light.set_color([1, 2, 3, 4], 0)
+
+    def test_all_lights(self):
+        lights = [_Light('light {}'.format(i)) for i in range(0, 20)]
+        failed = self._dispatch.dispatch(lights, self._set_color)
+        self.assertListEqual(failed, [])
+        for light in lights:
+            self.assertIsNotNone(light.finished)
+
+    def test_concurrent(self):
+        lights = [_Light('light {}'.format(i), 0.1) for i in range(0, 8)]
+        start = time.perf_counter()
+        self._dispatch.dispatch(lights, self._set_color)
+        self.assertLess(time.perf_counter() - start, 0.4)
+
+    def test_failure(self):
+        lights = [_Light('good'), _Light('bad', fail=True), _Light('fine')]
+        failed = self._dispatch.dispatch(lights, self._set_color)
+        self.assertListEqual(failed, ['bad'])
+        self.assertIsNotNone(lights[0].finished)
+        self.assertIsNotNone(lights[2].finished)
+
+    def test_deadline(self):
+        slow = _Light('slow', 1.0)
+        fast = _Light('fast')
+        start = time.perf_counter()
+        failed = self._dispatch.dispatch([slow, fast], self._set_color)
+        self.assertLess(time.perf_counter() - start, 0.9)
+        self.assertListEqual(failed, ['slow'])
+        self.assertIsNotNone(fast.finished)
+
+    def test_single(self):
+        light = _Light('only')
+        self.assertListEqual(
+            self._dispatch.dispatch([light], self._set_color), [])
+        self.assertIsNotNone(light.finished)
+        self.assertListEqual(
+            self._dispatch.dispatch(
+                [_Light('bad', fail=True)], self._set_color),
+            ['bad'])
+
+    def test_one_pool(self):
+        # Threads that dispatch at the same time share one pool.
+        executor = concurrent.futures.ThreadPoolExecutor
+        def slow_executor(*args):
+            time.sleep(0.05)
+            return executor(*args)
+
+        lights = [_Light('light {}'.format(i)) for i in range(0, 2)]
+        with patch.object(concurrent.futures, 'ThreadPoolExecutor',
+                          side_effect=slow_executor) as created:
+            threads = [
+                threading.Thread(
+                    target=self._dispatch.dispatch,
+                    args=(lights, self._set_color))
+                for _ in range(0, 4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(created.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
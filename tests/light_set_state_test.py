@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+import threading
+import unittest
+
+from bardolph.controller import light_set
+from bardolph.controller.light_set_state import LightSetState
+from bardolph.fakes import fake_light_api
+from bardolph.lib import injection, settings
+
+
+class LightSetStateTest(unittest.TestCase):
+    def setUp(self):
+        injection.configure()
+        settings.using({
+            'log_to_console': True,
+            'single_light_discover': True,
+            'use_fakes': True
+        }).configure()
+        fake_light_api.using([
+            ('Light 0', 'Group 0', 'Location 0'),
+            ('Light 1', 'Group 0', 'Location 1'),
+            ('Light 2', 'Group 1', 'Location 0')
+        ]).configure()
+
+    def test_version(self):
+        tested_set = light_set.LightSet()
+        self.assertEqual(tested_set.get_version(), 0)
+        tested_set.discover()
+        self.assertEqual(tested_set.get_version(), 1)
+
+        # Nothing has changed, so the same state remains.
+        state = tested_set.get_state()
+        tested_set.discover()
+        self.assertEqual(tested_set.get_version(), 1)
+        self.assertIs(tested_set.get_state(), state)
+
+    def test_copy_on_write(self):
+        tested_set = light_set.LightSet()
+        tested_set.discover()
+        old_state = tested_set.get_state()
+        old_group_names = list(old_state.get_group_names())
+
+        light = tested_set.get_light('Light 0')
+        light._group = 'Group 2'
+        tested_set.discover()
+        new_state = tested_set.get_state()
+        self.assertEqual(new_state.version, old_state.version + 1)
+
+        self.assertListEqual(
+            list(old_state.get_group_lights('Group 0')),
+            ['Light 0', 'Light 1'])
+        self.assertListEqual(list(old_state.get_group_names()),
+                             old_group_names)
+        self.assertIsNone(old_state.get_group_lights('Group 2'))
+
+        self.assertListEqual(
+            list(new_state.get_group_lights('Group 0')), ['Light 1'])
+        self.assertListEqual(
+            list(new_state.get_group_lights('Group 2')), ['Light 0'])
+        self.assertListEqual(
+            list(new_state.get_group_names()),
+            ['Group 0', 'Group 1', 'Group 2'])
+
+        # The locations didn't change, so they're shared.
+        self.assertIs(
+            new_state.get_location_names(), old_state.get_location_names())
+        self.assertIs(
+            new_state.get_location_lights('Location 0'),
+            old_state.get_location_lights('Location 0'))
+
+    def test_garbage_collect(self):
+        tested_set = light_set.LightSet()
+        tested_set.discover()
+        old_state = tested_set.get_state()
+        tested_set.get_light('Light 2')._age = 1000 * 1000
+        tested_set._garbage_collect()
+
+        self.assertEqual(old_state.get_light_count(), 3)
+        self.assertIsNotNone(old_state.get_light('Light 2'))
+        self.assertEqual(tested_set.get_light_count(), 2)
+        self.assertIsNone(tested_set.get_light('Light 2'))
+        self.assertIsNone(tested_set.get_group_lights('Group 1'))
+        self.assertListEqual(
+            list(tested_set.get_light_names()), ['Light 0', 'Light 1'])
+
+    def test_immutable(self):
+        state = LightSetState()
+        with self.assertRaises(AttributeError):
+            state._version = 5
+        with self.assertRaises(TypeError):
+            state._lights['x'] = None
+
+    def test_reader_during_refresh(self):
+        fake_light_api.using([
+            ('Light {:03d}'.format(i), 'Group {}'.format(i % 7), 'Home')
+            for i in range(0, 300)
+        ]).configure()
+        tested_set = light_set.LightSet()
+        tested_set.discover()
+        lights = tested_set.get_lights()
+        problems = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                state = tested_set.get_state()
+                for group_name in state.get_group_names():
+                    members = state.get_group_lights(group_name)
+                    if members is None or len(members) == 0:
+                        problems.append(group_name)
+                total = sum(
+                    len(state.get_group_lights(name))
+                    for name in state.get_group_names())
+                if total != state.get_light_count():
+                    problems.append(total)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for i in range(0, 50):
+            for light in lights:
+                light._group = 'Group {}'.format(
+                    (hash(light.get_name()) + i) % 11)
+            tested_set.discover()
+        done.set()
+        reader.join()
+        self.assertListEqual(problems, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
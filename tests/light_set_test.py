@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import threading
 import unittest
 
 from bardolph.controller import light_set
@@ -7,6 +8,28 @@ from bardolph.fakes import fake_light_api
 from bardolph.lib import injection, settings
 
 
+class _BusyLight:
+    """ Holds on to the first matrix until released. """
+    def __init__(self):
+        self.sent = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def get_uid(self):
+        return 'busy'
+
+    def get_name(self):
+        return 'Busy'
+
+    def set_matrix(self, matrix, duration):
+        self.entered.set()
+        self.release.wait()
+        self.sent.append(('matrix', matrix))
+
+    def set_zone_colors(self, first_zone, last_zone, color, duration):
+        self.sent.append(('zones', first_zone, last_zone, color))
+
+
 class LightSetTest(unittest.TestCase):
     def setUp(self):
         injection.configure()
@@ -116,6 +139,51 @@ class LightSetTest(unittest.TestCase):
         names = tested_set.get_location_lights(self._loc1)
         self._assert_names_match(names, self._light1, self._light3)
 
+    def test_membership_change(self):
+        tested_set = light_set.LightSet()
+        tested_set.discover()
+        light = tested_set.get_light(self._light0)
+        light._group = self._group2
+        light._location = self._loc1
+        tested_set.discover()
+
+        self.assertEqual(len(tested_set.get_group_names()), 3)
+        self._assert_names_match(
+            tested_set.get_group_lights(self._group0), self._light1)
+        self._assert_names_match(
+            tested_set.get_group_lights(self._group2), self._light0)
+        self.assertIsNone(tested_set.get_location_lights(self._loc2))
+        self._assert_names_match(
+            tested_set.get_location_lights(self._loc0), self._light2)
+        self._assert_names_match(
+            tested_set.get_location_lights(self._loc1),
+            self._light0, self._light1, self._light3)
+
+        light._group = self._group0
+        tested_set.discover()
+        self.assertIsNone(tested_set.get_group_lights(self._group2))
+        self._assert_names_match(
+            tested_set.get_group_lights(self._group0),
+            self._light0, self._light1)
+
+    def test_queued_zones_matrix(self):
+        # Zones and matrixes wait behind what the light is busy with, like
+        # colors do, instead of going ahead of it.
+        tested_set = light_set.LightSet()
+        light = _BusyLight()
+        sender = threading.Thread(
+            target=tested_set.set_light_matrix, args=(light, 'first', 0))
+        sender.start()
+        light.entered.wait()
+
+        tested_set.set_light_zone_colors(light, 0, 5, self._color, 0)
+        self.assertListEqual(light.sent, [])
+        light.release.set()
+        sender.join()
+        self.assertListEqual(light.sent, [
+            ('matrix', 'first'), ('zones', 0, 5, self._color)])
+        self.assertEqual(tested_set.get_queue_counters()['submitted'], 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import unittest
+
+from bardolph.controller import matrix_delta
+from bardolph.controller.color_matrix import Rect
+
+a = [1, 2, 3, 4]
+b = [10, 20, 30, 40]
+
+
+def _colors(height, width, changed=()):
+    # All a, except for b in the cells at the (row, column) pairs.
+    colors = [a] * (height * width)
+    for row, column in changed:
+        colors[row * width + column] = b
+    return colors
+
+
+class MatrixDeltaTest(unittest.TestCase):
+    def test_full_frame(self):
+        self.assertListEqual(
+            matrix_delta.full_frame(6, 5), [Rect(0, 5, 0, 4)])
+        self.assertListEqual(
+            matrix_delta.full_frame(8, 16),
+            [Rect(0, 3, 0, 15), Rect(4, 7, 0, 15)])
+
+    def test_unchanged(self):
+        self.assertListEqual(
+            matrix_delta.changed_rects(_colors(8, 16), _colors(8, 16), 8, 16),
+            [])
+
+    def test_one_message(self):
+        # A tile that fits in one message is always sent whole.
+        self.assertIsNone(matrix_delta.changed_rects(
+            _colors(6, 5), _colors(6, 5, ((2, 1),)), 6, 5))
+
+    def test_rows(self):
+        new_colors = _colors(8, 16, ((5, 1), (6, 14)))
+        self.assertListEqual(
+            matrix_delta.changed_rects(_colors(8, 16), new_colors, 8, 16),
+            [Rect(5, 7, 0, 15)])
+
+    def test_narrow(self):
+        # A window as wide as the changes reaches from top to bottom.
+        new_colors = _colors(8, 16, ((0, 2), (7, 3)))
+        self.assertListEqual(
+            matrix_delta.changed_rects(_colors(8, 16), new_colors, 8, 16),
+            [Rect(0, 7, 2, 3)])
+
+    def test_large(self):
+        new_colors = _colors(8, 16, ((0, 0), (7, 15)))
+        self.assertIsNone(
+            matrix_delta.changed_rects(_colors(8, 16), new_colors, 8, 16))
+
+    def test_window_colors(self):
+        colors = [[i, 0, 0, 0] for i in range(0, 30)]
+        result = matrix_delta.window_colors(colors, 5, Rect(1, 5, 3, 4))
+        self.assertEqual(len(result), matrix_delta.MESSAGE_CELLS)
+        self.assertListEqual(
+            [color[0] for color in result[0:10]],
+            [8, 9, 13, 14, 18, 19, 23, 24, 28, 29])
+        self.assertTrue(all(color == [0, 0, 0, 0] for color in result[10:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+"""
+Every test case that runs scripts with a ScriptRunner, run again with the
+scripts compiled to native code, as by "lsc --native".
+"""
+
+import unittest
+from unittest.mock import patch
+
+from tests import (
+    block_candle_test, candle_test, define_test, end_to_end_test,
+    example_test, expr_test, function_test, loop_test, math_runtime_test,
+    optimizer_test, print_test, query_test, units_test)
+from tests.script_runner import ScriptRunner
+
+_modules = (
+    block_candle_test, candle_test, define_test, end_to_end_test,
+    example_test, expr_test, function_test, loop_test, math_runtime_test,
+    optimizer_test, print_test, query_test, units_test)
+
+
+def _native_case(test_class):
+    def setUp(self):
+        patcher = patch.object(ScriptRunner, 'native_by_default', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        test_class.setUp(self)
+
+    return type(
+        'Native' + test_class.__name__, (test_class,), {'setUp': setUp})
+
+
+for _module in _modules:
+    for _test_class in list(vars(_module).values()):
+        if (isinstance(_test_class, type)
+                and issubclass(_test_class, unittest.TestCase)
+                and _test_class.__module__ == _module.__name__):
+            _native_class = _native_case(_test_class)
+            globals()[_native_class.__name__] = _native_class
+
+
+if __name__ == '__main__':
+    unittest.main()
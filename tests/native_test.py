@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+
+import unittest
+
+from bardolph.controller import i_controller, lsc
+from bardolph.controller.color_matrix import ColorMatrix
+from bardolph.lib.injection import provide
+from bardolph.parser.parse import Parser
+from bardolph.vm.machine import Machine
+from tests import test_module
+
+
+class NativeTest(unittest.TestCase):
+    """
+    Run each script with the interpreter and again as code generated by
+    "lsc --native", and verify that the fake lights see the same calls.
+    """
+
+    def _parse(self, script):
+        parser = Parser()
+        self.assertTrue(parser.parse(script), parser.get_errors())
+        return parser.get_program()
+
+    @staticmethod
+    def _comparable(call):
+        return tuple(
+            param.get_colors() if isinstance(param, ColorMatrix) else param
+            for param in call)
+
+    @staticmethod
+    def _activity(output):
+        light_api = provide(i_controller.LightApi)
+        lights = {
+            light.get_name(): [
+                NativeTest._comparable(call) for call in light.get_call_list()]
+            for light in light_api.get_lights()
+        }
+        return lights, light_api.get_call_list(), output.get_objects()
+
+    def _interpreted(self, script, small_set):
+        test_module.configure(small_set)
+        output = test_module.replace_print()
+        Machine().run(self._parse(script))
+        return self._activity(output)
+
+    def _native(self, script, small_set):
+        test_module.configure(small_set)
+        output = test_module.replace_print()
+        source = lsc.program_code(
+            lsc.native_text(self._parse(script)), native=True)
+        namespace = {'__name__': 'native_program'}
+        exec(compile(source, 'native_program', 'exec'), namespace)
+        Machine().run_native(
+            namespace['BLOCKS'], namespace['ROUTINES'], namespace['GLOBALS'])
+        return self._activity(output)
+
+    def _assert_same(self, script, small_set=False):
+        expected = self._interpreted(script, small_set)
+        actual = self._native(script, small_set)
+        expected_lights, expected_global, expected_output = expected
+        actual_lights, actual_global, actual_output = actual
+        self.assertTrue(
+            any(expected_lights.values()) or expected_global
+            or expected_output, 'Script had no visible effect.')
+        self.assertDictEqual(actual_lights, expected_lights)
+        self.assertListEqual(actual_global, expected_global)
+        self.assertListEqual(actual_output, expected_output)
+
+    def test_individual(self):
+        script = """
+            units raw
+            hue 11 saturation 22 brightness 33 kelvin 2500 set "Top"
+            hue 44 saturation 55 brightness 66 set "Bottom"
+            on "Top" off "Bottom"
+        """
+        self._assert_same(script)
+
+    def test_group_location(self):
+        script = """
+            units raw
+            hue 100 saturation 10 brightness 1 kelvin 1000 duration 5
+            set group "Pole"
+            on group "Furniture"
+            set location "Home"
+            set "Table" and group "Pole" and "Strip" zone 0 5
+        """
+        self._assert_same(script)
+
+    def test_get(self):
+        script = """
+            duration 1 hue 30 saturation 75 brightness 100 set "Top"
+            time 1
+            hue 60 set all
+            get "Top" hue 30 set all
+            units raw brightness 10000 units logical saturation 50 set all
+            units rgb red 50 green 25 blue 75 set "Table"
+        """
+        self._assert_same(script)
+
+    def test_loops(self):
+        script = """
+            hue 180 saturation 50 brightness 50 kelvin 1000
+            repeat all as the_light set the_light
+
+            repeat all as the_light with brt from 0 to 100 begin
+                brightness brt
+                set the_light
+            end
+
+            repeat 5 with base_hue cycle begin
+                time 0
+                repeat all as the_light with the_hue cycle base_hue begin
+                    hue the_hue
+                    set the_light
+                end
+            end
+
+            assign y 0
+            define x 100
+            repeat while y < 4 && x == 100 begin
+                set all
+                assign y y + 1
+            end
+
+            repeat in group "Pole" as the_light
+                repeat 2 with i from 1 to 2 begin
+                    kelvin i * 1000
+                    set the_light
+                end
+        """
+        self._assert_same(script)
+
+    def test_small_set_loops(self):
+        script = """
+            hue 45 saturation 25 brightness 75 kelvin 2000 duration 9
+            define light_0 "light_0"
+            assign light_1 "light_1"
+            repeat in light_0 and light_1 and "light_2" as the_light
+                with brt from saturation - brightness to hue - brightness - 30
+            begin
+                brightness brt
+                set the_light
+            end
+        """
+        self._assert_same(script, True)
+
+    def test_if_else(self):
+        script = """
+            units raw
+            repeat with i from 0 to 9 begin
+                if i % 3 == 0 begin
+                    hue i set "Top"
+                end else if i % 3 == 1 begin
+                    hue i set "Middle"
+                end else begin
+                    hue i set "Bottom"
+                end
+                if !(i > 5) || i == 9
+                    print i
+            end
+        """
+        self._assert_same(script)
+
+    def test_routines(self):
+        script = """
+            units raw
+            hue 180 saturation 50 brightness 50 duration 100 time 0 kelvin 0
+
+            define complex_no_params begin
+                kelvin 75
+                brightness 100
+            end
+            complex_no_params
+            set all
+
+            define complex_three_params with x y z begin
+                set x
+                set y
+                set z
+            end
+            hue 90 saturation 75 brightness 33
+            complex_three_params "Bottom" "Middle" "Top"
+
+            define nested with a begin
+                hue a
+                complex_three_params "Top" "Table" "Chair"
+            end
+            nested 45
+        """
+        self._assert_same(script)
+
+    def test_functions(self):
+        script = """
+            assign x 100
+
+            define f with a begin
+                if a > 9
+                    return a
+                return [f a + 1]
+            end
+            define g with a b return a + b
+            define h with y begin
+                assign x x * y
+                return x * 2
+            end
+
+            print [f 0]
+            print [g [f 5] [g 1 2]]
+            println [h 3]
+            print x
+            printf "{} {}" [g 2 3] x
+        """
+        self._assert_same(script)
+
+    def test_runtime_routines(self):
+        script = """
+            print [sin 90] [round 2.6] [trunc -3.5] [sqrt 16]
+            print [random 0 0]
+        """
+        self._assert_same(script)
+
+    def test_matrix(self):
+        script = """
+            time 0 units raw
+            hue 1 saturation 2 brightness 3 kelvin 4 set default
+            hue 120 saturation 50 brightness 25 kelvin 2500
+            set "Candle" row 1 2 column 3 4
+            hue 200
+            set "Candle" begin
+                stage row 0 column 0
+                stage row 5 column 2 4
+            end
+        """
+        self._assert_same(script)
+
+    def test_wait(self):
+        script = """
+            time 0 duration 1
+            repeat 3 with the_hue cycle begin
+                hue the_hue
+                time 2
+                set all
+                wait
+            end
+            time at 10:30 or 11:* wait
+            on all
+        """
+        self._assert_same(script)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,27 @@
 #!/usr/bin/env python
 
 import unittest
+from unittest.mock import call, patch
 
 from bardolph.controller import ls_asm
 from bardolph.parser.optimizer import Optimizer
-from bardolph.vm.vm_codes import JumpCondition, OpCode, Operand, Register
+from tests import test_module
+from tests.script_runner import ScriptRunner
+from bardolph.vm.vm_codes import (JumpCondition, LoopVar, OpCode, Operand,
+                                  Operator, Register)
 
 
 class OptimizerTest(unittest.TestCase):
     def test_quoted(self):
         raw_assembly = (
-            OpCode.JUMP, JumpCondition.ALWAYS, 3,
+            OpCode.JUMP, JumpCondition.IF_TRUE, 3,
             OpCode.PUSHQ, 1,
             OpCode.POP, Register.RESULT,
             OpCode.POWER,
             OpCode.WAIT
         )
         expected_assembly = (
-            OpCode.JUMP, JumpCondition.ALWAYS, 2,
+            OpCode.JUMP, JumpCondition.IF_TRUE, 2,
             OpCode.MOVEQ, 1, Register.RESULT,
             OpCode.POWER,
             OpCode.WAIT
@@ -28,14 +32,14 @@ class OptimizerTest(unittest.TestCase):
 
     def test_unquoted(self):
         raw_assembly = (
-            OpCode.JUMP, JumpCondition.ALWAYS, 3,
+            OpCode.JUMP, JumpCondition.IF_TRUE, 3,
             OpCode.PUSH, "a",
             OpCode.POP, Register.RESULT,
             OpCode.POWER,
             OpCode.WAIT
         )
         expected_assembly = (
-            OpCode.JUMP, JumpCondition.ALWAYS, 2,
+            OpCode.JUMP, JumpCondition.IF_TRUE, 2,
             OpCode.MOVE, "a", Register.RESULT,
             OpCode.POWER,
             OpCode.WAIT
@@ -60,6 +64,205 @@ class OptimizerTest(unittest.TestCase):
         optimized_list = Optimizer().optimize(ls_asm.assemble(raw_assembly))
         self.assertListEqual(expected_list, optimized_list)
 
+    def _assert_optimized(self, raw_assembly, expected_assembly):
+        optimizer = Optimizer()
+        optimized_list = optimizer.optimize(ls_asm.assemble(raw_assembly))
+        expected_list = ls_asm.assemble(expected_assembly)
+        self.assertListEqual(expected_list, optimized_list)
+        return optimizer
+
+    def test_fold_constants(self):
+        raw_assembly = (
+            OpCode.PUSHQ, 2,
+            OpCode.PUSHQ, 3,
+            OpCode.OP, Operator.MUL,
+            OpCode.PUSHQ, 1,
+            OpCode.OP, Operator.ADD,
+            OpCode.POP, "a",
+            OpCode.PUSHQ, 5,
+            OpCode.OP, Operator.USUB,
+            OpCode.POP, "b",
+            OpCode.PUSHQ, 1,
+            OpCode.PUSHQ, 0,
+            OpCode.OP, Operator.DIV,
+            OpCode.POP, "c",
+            OpCode.STOP
+        )
+        expected_assembly = (
+            OpCode.MOVEQ, 7, "a",
+            OpCode.MOVEQ, -5, "b",
+            OpCode.PUSHQ, 1,
+            OpCode.PUSHQ, 0,
+            OpCode.OP, Operator.DIV,
+            OpCode.POP, "c",
+            OpCode.STOP
+        )
+        optimizer = self._assert_optimized(raw_assembly, expected_assembly)
+        self.assertEqual(optimizer.get_report()[0], ('fold_constants', 14, 9))
+
+    def test_fold_jump(self):
+        raw_assembly = (
+            OpCode.PUSHQ, 0,
+            OpCode.JUMP, JumpCondition.IF_TRUE, 3,
+            OpCode.POWER,
+            OpCode.PUSHQ, 1,
+            OpCode.PUSHQ, 1,
+            OpCode.OP, Operator.EQ,
+            OpCode.JUMP, JumpCondition.IF_TRUE, -4,
+            OpCode.STOP
+        )
+        expected_assembly = (
+            OpCode.POWER,
+            OpCode.JUMP, JumpCondition.ALWAYS, -1,
+        )
+        self._assert_optimized(raw_assembly, expected_assembly)
+
+    def test_thread_jumps(self):
+        raw_assembly = (
+            OpCode.PUSH, "a",
+            OpCode.JUMP, JumpCondition.IF_TRUE, 3,
+            OpCode.WAIT,
+            OpCode.POWER,
+            OpCode.JUMP, JumpCondition.ALWAYS, -4
+        )
+        expected_assembly = (
+            OpCode.PUSH, "a",
+            OpCode.JUMP, JumpCondition.IF_TRUE, -1,
+            OpCode.WAIT,
+            OpCode.POWER,
+            OpCode.JUMP, JumpCondition.ALWAYS, -4
+        )
+        self._assert_optimized(raw_assembly, expected_assembly)
+
+        raw_assembly = (
+            OpCode.PUSH, "a",
+            OpCode.JUMP, JumpCondition.IF_TRUE, 3,
+            OpCode.POWER,
+            OpCode.JUMP, JumpCondition.ALWAYS, 2,
+            OpCode.WAIT,
+            OpCode.STOP
+        )
+        expected_assembly = (
+            OpCode.PUSH, "a",
+            OpCode.JUMP, JumpCondition.IF_TRUE, 3,
+            OpCode.POWER,
+            OpCode.STOP,
+            OpCode.WAIT,
+            OpCode.STOP
+        )
+        self._assert_optimized(raw_assembly, expected_assembly)
+
+    def test_remove_unreachable(self):
+        raw_assembly = (
+            OpCode.ROUTINE, "f",
+            OpCode.PUSH, "a",
+            OpCode.RETURN,
+            OpCode.WAIT,
+            OpCode.END, "f",
+            OpCode.POWER,
+            OpCode.JUMP, JumpCondition.ALWAYS, 3,
+            OpCode.PUSHQ, 1,
+            OpCode.POP, Register.RESULT,
+            OpCode.WAIT,
+            OpCode.STOP
+        )
+        expected_assembly = (
+            OpCode.ROUTINE, "f",
+            OpCode.PUSH, "a",
+            OpCode.RETURN,
+            OpCode.END, "f",
+            OpCode.POWER,
+            OpCode.WAIT,
+            OpCode.STOP
+        )
+        self._assert_optimized(raw_assembly, expected_assembly)
+
+    def test_remove_dead_stores(self):
+        raw_assembly = (
+            OpCode.MOVEQ, 10, Register.HUE,
+            OpCode.MOVEQ, 20, Register.HUE,
+            OpCode.MOVE, "a", Register.SATURATION,
+            OpCode.POP, Register.SATURATION,
+            OpCode.MOVEQ, 1, Register.RESULT,
+            OpCode.PUSH, Register.RESULT,
+            OpCode.MOVEQ, 2, Register.RESULT,
+            OpCode.COLOR,
+            OpCode.STOP
+        )
+        expected_assembly = (
+            OpCode.MOVEQ, 20, Register.HUE,
+            OpCode.POP, Register.SATURATION,
+            OpCode.MOVEQ, 1, Register.RESULT,
+            OpCode.PUSH, Register.RESULT,
+            OpCode.MOVEQ, 2, Register.RESULT,
+            OpCode.COLOR,
+            OpCode.STOP
+        )
+        self._assert_optimized(raw_assembly, expected_assembly)
+
+    def test_remove_redundant_stores(self):
+        raw_assembly = (
+            OpCode.MOVEQ, Operand.LIGHT, Register.OPERAND,
+            OpCode.DISC,
+            OpCode.MOVE, Register.RESULT, LoopVar.CURRENT,
+            OpCode.PUSH, LoopVar.CURRENT,
+            OpCode.PUSH, Operand.NULL,
+            OpCode.OP, Operator.NOTEQ,
+            OpCode.JUMP, JumpCondition.IF_FALSE, 5,
+            OpCode.COLOR,
+            OpCode.MOVEQ, Operand.LIGHT, Register.OPERAND,
+            OpCode.DNEXT, LoopVar.CURRENT,
+            OpCode.JUMP, JumpCondition.ALWAYS, -8,
+            OpCode.STOP
+        )
+        expected_assembly = (
+            OpCode.MOVEQ, Operand.LIGHT, Register.OPERAND,
+            OpCode.DISC,
+            OpCode.MOVE, Register.RESULT, LoopVar.CURRENT,
+            OpCode.PUSH, LoopVar.CURRENT,
+            OpCode.PUSH, Operand.NULL,
+            OpCode.OP, Operator.NOTEQ,
+            OpCode.JUMP, JumpCondition.IF_FALSE, 4,
+            OpCode.COLOR,
+            OpCode.DNEXT, LoopVar.CURRENT,
+            OpCode.JUMP, JumpCondition.ALWAYS, -7,
+            OpCode.STOP
+        )
+        self._assert_optimized(raw_assembly, expected_assembly)
+
+        # The body of the loop changes the register, so both stay.
+        raw_assembly = (
+            OpCode.MOVEQ, Operand.LIGHT, Register.OPERAND,
+            OpCode.DISC,
+            OpCode.MOVE, Register.RESULT, LoopVar.CURRENT,
+            OpCode.PUSH, LoopVar.CURRENT,
+            OpCode.PUSH, Operand.NULL,
+            OpCode.OP, Operator.NOTEQ,
+            OpCode.JUMP, JumpCondition.IF_FALSE, 6,
+            OpCode.MOVEQ, Operand.GROUP, Register.OPERAND,
+            OpCode.COLOR,
+            OpCode.MOVEQ, Operand.LIGHT, Register.OPERAND,
+            OpCode.DNEXT, LoopVar.CURRENT,
+            OpCode.JUMP, JumpCondition.ALWAYS, -9,
+            OpCode.STOP
+        )
+        self._assert_optimized(raw_assembly, raw_assembly)
+
+    @patch('builtins.print')
+    def test_conditional_jump_result(self, print_fn):
+        # The conditional jump pops its condition into RESULT, so the second
+        # MOVEQ of 5 into RESULT has to stay.
+        test_module.configure()
+        script = """
+            assign x 1
+            println {5}
+            if {x < 2} begin println {5} end
+        """
+        ScriptRunner(self).run_script(script)
+        self.assertListEqual(
+            print_fn.mock_calls,
+            [call(5, end=''), call(), call(5, end=''), call()])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import pickle
+import unittest
+
+from bardolph.parser.parse import Parser
+from bardolph.vm.loader import Loader
+from bardolph.vm.machine import Machine
+from bardolph.vm.program import Program
+from tests import test_module
+
+
+class ProgramTest(unittest.TestCase):
+    _script = """
+        define show with x begin println x end
+        assign y 5
+        repeat with i from 1 to 3 begin
+            show {y + i}
+        end
+    """
+
+    def setUp(self):
+        test_module.configure()
+        self._output = test_module.replace_print()
+
+    def _parse(self):
+        parser = Parser()
+        self.assertTrue(parser.parse(self._script), parser.get_errors())
+        return parser.get_program()
+
+    def test_immutable(self):
+        program = Loader().load(self._parse())
+        with self.assertRaises(AttributeError):
+            program.code = ()
+        with self.assertRaises(TypeError):
+            program.routines['show'] = 0
+        self.assertIsInstance(program.code, tuple)
+
+    def test_input_unchanged(self):
+        instructions = self._parse()
+        before = [inst.copy() for inst in instructions]
+        Loader().load(instructions)
+        self.assertListEqual(before, instructions)
+
+    def test_routine_table(self):
+        program = Loader().load(self._parse())
+        address = program.get_address('show')
+        self.assertIsNotNone(address)
+        self.assertIsNone(program.get_address('nothing'))
+        self.assertEqual(
+            program[address - 1].param0, 'show', 'address follows ROUTINE')
+        self.assertIn('y', program.globals)
+
+    def test_shared(self):
+        program = Loader().load(self._parse())
+        code = [inst.copy() for inst in program]
+        Machine().run(program)
+        Machine().run(program)
+        self.assertListEqual(
+            self._output.get_objects(),
+            [6, '\n', 7, '\n', 8, '\n'] * 2)
+        self.assertListEqual(code, list(program))
+
+    def test_pickle(self):
+        program = Loader().load(self._parse())
+        copy = pickle.loads(pickle.dumps(program))
+        self.assertListEqual(list(program), list(copy))
+        self.assertDictEqual(dict(program.routines), dict(copy.routines))
+        self.assertDictEqual(dict(program.globals), dict(copy.globals))
+        Machine().run(copy)
+        self.assertListEqual(
+            self._output.get_objects(), [6, '\n', 7, '\n', 8, '\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
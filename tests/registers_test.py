@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+import unittest
+
+from bardolph.controller.units import UnitMode
+from bardolph.vm.machine import Registers
+from bardolph.vm.vm_codes import Register
+
+
+class RegistersTest(unittest.TestCase):
+    def test_by_enum(self):
+        reg = Registers()
+        for index, register in enumerate(Register):
+            reg.set_by_enum(register, index)
+        for index, register in enumerate(Register):
+            self.assertEqual(reg.get_by_enum(register), index)
+            self.assertEqual(getattr(reg, register.name.lower()), index)
+
+    def test_accessors(self):
+        reg = Registers()
+        Registers.setter(Register.KELVIN)(reg, 2700)
+        self.assertEqual(reg.kelvin, 2700)
+        self.assertEqual(Registers.getter(Register.KELVIN)(reg), 2700)
+
+    def test_color_view(self):
+        reg = Registers()
+        reg.store_color([1, 2, 3, 4])
+        view = reg.color_view()
+        self.assertListEqual(view, [1, 2, 3, 4])
+
+        reg.unit_mode = UnitMode.RGB
+        reg.store_color([5, 6, 7, 8])
+        self.assertIs(reg.color_view(), view)
+        self.assertListEqual(view, [5, 6, 7, 8])
+
+        color = reg.get_color()
+        self.assertIsNot(color, view)
+        self.assertListEqual(color, [5, 6, 7, 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+import threading
+import time
+import unittest
+
+from bardolph.controller import i_controller
+from bardolph.controller.script_job import ScriptJob
+from bardolph.fakes.activity_monitor import Action
+from bardolph.lib import clock, settings
+from bardolph.lib.injection import provide
+from bardolph.lib.job_control import JobControl, SlicedJob
+from bardolph.lib.scheduler import Scheduler
+from tests import test_module
+
+
+class CountingJob(SlicedJob):
+    def __init__(self, slices, interval, log):
+        super().__init__()
+        self._slices = slices
+        self._interval = interval
+        self._log = log
+        self.stop_requested = False
+
+    def start(self):
+        self._log.append(('start', self))
+
+    def resume(self):
+        self._log.append(('resume', self))
+        self._slices -= 1
+        if self._slices == 0 or self.stop_requested:
+            return None
+        return time.monotonic() + self._interval
+
+    def request_stop(self):
+        self.stop_requested = True
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        test_module.configure()
+        settings.using({'sleep_time': 0.01}).configure()
+        clock.configure()
+
+    def _wait_for(self, jobs):
+        deadline = time.monotonic() + 5.0
+        while jobs.has_jobs():
+            if time.monotonic() > deadline:
+                self.fail('jobs still running')
+            time.sleep(0.01)
+
+    def test_slices(self):
+        log = []
+        done = threading.Event()
+        scheduler = Scheduler()
+        job = CountingJob(3, 0.01, log)
+        scheduler.submit(job, done.set)
+        self.assertTrue(done.wait(1.0))
+        self.assertListEqual(
+            [action for action, _ in log],
+            ['start', 'resume', 'resume', 'resume'])
+
+    def test_wake(self):
+        log = []
+        done = threading.Event()
+        scheduler = Scheduler()
+        job = CountingJob(100, 60.0, log)
+        task = scheduler.submit(job, done.set)
+        while len(log) < 2:
+            time.sleep(0.01)
+        job.request_stop()
+        scheduler.wake(task)
+        self.assertTrue(done.wait(1.0))
+
+    def test_many_scripts(self):
+        # Each script waits for a total of 0.2 seconds. Run one after the
+        # other, they'd take 10 seconds.
+        scheduler = Scheduler()
+        jobs = JobControl(scheduler)
+        script = """
+            units raw time 50
+            repeat 4 begin hue 1 set "Top" wait end
+        """
+        start = time.monotonic()
+        for i in range(0, 50):
+            jobs.spawn_job(ScriptJob.from_string(script), 'job {}'.format(i))
+        self._wait_for(jobs)
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertEqual(scheduler.get_thread_count(), 1)
+
+        light = provide(i_controller.LightSet).get_light('Top')
+        self.assertEqual(
+            light.get_call_list().count(
+                (Action.SET_COLOR, [1, 0, 0, 0], 0)), 200)
+
+    def test_same_as_run(self):
+        script = """
+            units raw time 10 duration 5
+            hue 100 saturation 200 brightness 300 kelvin 2700 set "Top"
+            wait
+            repeat 3 with i from 1 to 3 begin
+                hue {i * 10} set "Top" wait
+            end
+            time at *:* wait
+            off "Top"
+        """
+        light = provide(i_controller.LightSet).get_light('Top')
+        job = ScriptJob.from_string(script)
+        job.execute()
+        expected = list(light.get_call_list())
+        light.get_call_list().clear()
+
+        jobs = JobControl(Scheduler())
+        jobs.spawn_job(ScriptJob.from_string(script), 'sliced')
+        self._wait_for(jobs)
+        self.assertListEqual(light.get_call_list(), expected)
+
+    def test_stop(self):
+        scheduler = Scheduler()
+        jobs = JobControl(scheduler)
+        script = 'time 60 repeat begin on "Top" wait end'
+        for i in range(0, 10):
+            jobs.spawn_job(ScriptJob.from_string(script), 'job {}'.format(i))
+        time.sleep(0.05)
+        self.assertTrue(jobs.is_running('job 0'))
+        jobs.stop_background()
+        self._wait_for(jobs)
+
+
+if __name__ == '__main__':
+    unittest.main()
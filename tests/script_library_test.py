@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from bardolph.lib import settings
+from tests import test_module
+from web.script_library import ScriptLibrary
+
+
+class ScriptLibraryTest(unittest.TestCase):
+    def setUp(self):
+        test_module.configure()
+        settings.using({'use_compile_cache': False}).configure()
+        self._dir = tempfile.TemporaryDirectory()
+        self._file_name = os.path.join(self._dir.name, 'test.ls')
+        self._write('on all', 1000)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _write(self, text, mtime):
+        with open(self._file_name, 'w') as outp:
+            outp.write(text)
+        os.utime(self._file_name, ns=(mtime, mtime))
+
+    def test_unchanged(self):
+        library = ScriptLibrary()
+        library.load(self._file_name)
+        program = library.get(self._file_name)
+        self.assertIsNotNone(program)
+        self.assertIs(library.get(self._file_name), program)
+        self.assertEqual(library.get_count(), 1)
+
+    def test_touched(self):
+        # Same contents with a new modification time isn't compiled again.
+        library = ScriptLibrary()
+        program = library.get(self._file_name)
+        self._write('on all', 2000)
+        self.assertIs(library.get(self._file_name), program)
+
+    def test_changed(self):
+        library = ScriptLibrary()
+        program = library.get(self._file_name)
+        self._write('off all', 2000)
+        new_program = library.get(self._file_name)
+        self.assertIsNot(new_program, program)
+        self.assertNotEqual(len(new_program.code), 0)
+
+    def test_compile_only(self):
+        # Compiling a script reads it once, and doesn't build a Machine.
+        library = ScriptLibrary()
+        with patch('builtins.open', wraps=open) as mock_open, \
+                patch('bardolph.controller.script_job.Machine') as machine:
+            self.assertNotEqual(len(library.get(self._file_name).code), 0)
+        self.assertEqual(mock_open.call_count, 1)
+        machine.assert_not_called()
+
+    def test_missing(self):
+        library = ScriptLibrary()
+        self.assertIsNone(
+            library.get(os.path.join(self._dir.name, 'missing.ls')))
+
+
+if __name__ == '__main__':
+    unittest.main()
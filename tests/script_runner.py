@@ -1,17 +1,28 @@
 import time
 
-from bardolph.controller import i_controller
+from bardolph.controller import i_controller, lsc
 from bardolph.controller.color_matrix import ColorMatrix
 from bardolph.controller.script_job import ScriptJob
 from bardolph.lib.injection import provide
 from bardolph.lib.job_control import JobControl
 from bardolph.parser.parse import Parser
+from bardolph.vm.machine import Machine
 
 
 class ScriptRunner:
-    def __init__(self, test_case):
+    """
+    Runs scripts for tests, either with the interpreter, or compiled to
+    native code the way "lsc --native" does it. Unless told otherwise, a
+    ScriptRunner uses native code if native_by_default is True.
+    """
+    native_by_default = False
+
+    def __init__(self, test_case, native=None):
         self._test_case = test_case
         self._machine_state = None
+        if native is None:
+            native = ScriptRunner.native_by_default
+        self._native = native
 
     @staticmethod
     def as_list(maybe_list):
@@ -22,11 +33,14 @@ class ScriptRunner:
         self._test_case.assertTrue(parser.parse(script), parser.get_errors())
 
     def run_script(self, script, max_waits=None):
-        jobs = JobControl()
         script_job = ScriptJob.from_string(script)
         if script_job.program is None:
             self._test_case.fail(
                 "Compile failed - {}".format(script_job.compile_errors))
+        if self._native:
+            self._run_native(script_job.program)
+            return
+        jobs = JobControl()
         jobs.add_job(script_job)
         while jobs.has_jobs():
             time.sleep(0.01)
@@ -36,6 +50,15 @@ class ScriptRunner:
                     self._test_case.fail("Jobs didn't finish.")
             self._machine_state = script_job.get_machine_state()
 
+    def _run_native(self, program):
+        source = lsc.program_code(lsc.native_text(program), native=True)
+        namespace = {'__name__': 'native_program'}
+        exec(compile(source, 'native_program', 'exec'), namespace)
+        machine = Machine()
+        machine.run_native(
+            namespace['BLOCKS'], namespace['ROUTINES'], namespace['GLOBALS'])
+        self._machine_state = machine.get_state()
+
     def check_call_list(self, to_check, expected):
         light_api = provide(i_controller.LightApi)
         expected = self.as_list(expected)
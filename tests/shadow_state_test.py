@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+import time
+import unittest
+
+from bardolph.controller import light, shadow_state
+from bardolph.controller.color_matrix import ColorMatrix
+from bardolph.controller.shadow_state import ShadowState
+from bardolph.lib import injection, settings
+
+
+class _Light(light.MultizoneLight):
+    def __init__(self):
+        super().__init__(1, 'light', 'group', 'location')
+        self.color = [1, 2, 3, 4]
+        self.power = 0
+        self.zones = [[0, 0, 0, 0] for _ in range(0, 4)]
+        self.calls = []
+
+    def _get_color(self):
+        self.calls.append('get_color')
+        return self.color
+
+    def _set_color(self, color, duration):
+        self.calls.append('set_color')
+        self.color = color
+
+    def _get_power(self):
+        self.calls.append('get_power')
+        return self.power
+
+    def _set_power(self, power, duration, rapid=True):
+        self.calls.append('set_power')
+        self.power = power
+
+    def _get_zone_colors(self, first_zone=None, last_zone=None):
+        self.calls.append('get_zone_colors')
+        return self.zones[first_zone:last_zone]
+
+    def _set_zone_colors(self, first_zone, last_zone, color, duration):
+        self.calls.append('set_zone_colors')
+        self.zones[first_zone:last_zone] = [color] * (last_zone - first_zone)
+
+
+class _MatrixLight(light.MatrixLight):
+    def __init__(self):
+        super().__init__(2, 'matrix', 'group', 'location')
+        self.matrix = ColorMatrix.new_from_constant(2, 2, [0, 0, 0, 0])
+        self.calls = []
+
+    def _get_matrix(self):
+        self.calls.append('get_matrix')
+        return self.matrix
+
+    def _set_matrix(self, matrix, duration=0):
+        self.calls.append('set_matrix')
+        self.matrix = matrix
+
+
+class ShadowStateTest(unittest.TestCase):
+    def setUp(self):
+        injection.configure()
+        settings.using({
+            'shadow_ttl': 10.0,
+            'shadow_tolerance': 2
+        }).configure()
+        shadow_state.reset_metrics()
+
+    def test_get(self):
+        test_light = _Light()
+        self.assertListEqual(test_light.get_color(), [1, 2, 3, 4])
+        self.assertListEqual(test_light.get_color(), [1, 2, 3, 4])
+        self.assertEqual(test_light.get_power(), 0)
+        self.assertEqual(test_light.get_power(), 0)
+        self.assertListEqual(test_light.calls, ['get_color', 'get_power'])
+        self.assertDictEqual(
+            shadow_state.get_metrics(), {'hits': 2, 'misses': 2, 'skips': 0})
+
+    def test_redundant_set(self):
+        test_light = _Light()
+        test_light.set_color([10, 20, 30, 40], 0)
+        test_light.set_color([11, 20, 29, 40], 0)
+        test_light.set_color([20, 20, 30, 40], 0)
+        test_light.set_power(65535, 0)
+        test_light.set_power(65535, 0)
+        self.assertListEqual(test_light.get_color(), [20, 20, 30, 40])
+        self.assertListEqual(
+            test_light.calls, ['set_color', 'set_color', 'set_power'])
+        self.assertDictEqual(
+            shadow_state.get_metrics(), {'hits': 1, 'misses': 0, 'skips': 2})
+
+    def test_hue_wraps(self):
+        test_light = _Light()
+        test_light.set_color([65535, 20, 30, 40], 0)
+        test_light.set_color([1, 20, 30, 40], 0)
+        self.assertListEqual(test_light.calls, ['set_color'])
+
+    def test_invalid_not_kept(self):
+        test_light = _Light()
+        test_light.color = [-1, -1, -1, -1]
+        test_light.get_color()
+        test_light.color = [1, 2, 3, 4]
+        self.assertListEqual(test_light.get_color(), [1, 2, 3, 4])
+        self.assertListEqual(test_light.calls, ['get_color', 'get_color'])
+
+    def test_ttl(self):
+        state = ShadowState(ttl=0.05, tolerance=0)
+        state.put(shadow_state.COLOR, [1, 2, 3, 4])
+        self.assertTrue(state.matches(shadow_state.COLOR, [1, 2, 3, 4]))
+        time.sleep(0.1)
+        self.assertFalse(state.matches(shadow_state.COLOR, [1, 2, 3, 4]))
+        self.assertListEqual(
+            state.get(shadow_state.COLOR, lambda: [5, 6, 7, 8]), [5, 6, 7, 8])
+
+    def test_disabled(self):
+        settings.using({'shadow_ttl': 0.0}).configure()
+        test_light = _Light()
+        test_light.get_color()
+        test_light.get_color()
+        test_light.set_color([1, 2, 3, 4], 0)
+        test_light.set_color([1, 2, 3, 4], 0)
+        self.assertListEqual(test_light.calls, [
+            'get_color', 'get_color', 'set_color', 'set_color'])
+
+    def test_zones(self):
+        test_light = _Light()
+        self.assertEqual(len(test_light.get_zone_colors()), 4)
+        test_light.set_zone_colors(1, 3, [5, 5, 5, 5], 0)
+        test_light.set_zone_colors(1, 2, [5, 5, 5, 5], 0)
+        self.assertListEqual(
+            test_light.get_zone_colors(0, 3),
+            [[0, 0, 0, 0], [5, 5, 5, 5], [5, 5, 5, 5]])
+        self.assertListEqual(
+            test_light.calls, ['get_zone_colors', 'set_zone_colors'])
+
+        # Setting the color of the whole light forgets the zones.
+        test_light.set_color([7, 7, 7, 7], 0)
+        test_light.get_zone_colors()
+        self.assertEqual(test_light.calls[-1], 'get_zone_colors')
+
+    def test_matrix(self):
+        test_light = _MatrixLight()
+        matrix = ColorMatrix.new_from_constant(2, 2, [9, 9, 9, 9])
+        test_light.set_matrix(matrix)
+        test_light.set_matrix(
+            ColorMatrix.new_from_constant(2, 2, [9, 9, 9, 9]))
+        result = test_light.get_matrix()
+        self.assertListEqual(result.get_colors(), matrix.get_colors())
+        self.assertListEqual(test_light.calls, ['set_matrix'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+import threading
+import time
+import unittest
+
+from tests import test_module
+from web.status_collector import StatusCollector
+
+
+class Snapshot:
+    def __init__(self, text, lights=None):
+        self.text = text
+        self.lights = lights or {}
+
+
+class SlowSnapshot:
+    """ Stands in for a snapshot of lights that take a while to answer. """
+    def __init__(self, delay):
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self._delay)
+        return Snapshot('snapshot {}'.format(calls))
+
+
+class StatusCollectorTest(unittest.TestCase):
+    def setUp(self):
+        test_module.configure()
+
+    def test_snapshot(self):
+        collector = StatusCollector(0)
+        self.assertIsNone(collector.get_text())
+        self.assertIsNone(collector.get_age())
+        self.assertTrue(collector.refresh().wait(1.0))
+        self.assertIn('Top', collector.get_text())
+        self.assertLess(collector.get_age(), 1.0)
+
+    def test_single_flight(self):
+        snapshot = SlowSnapshot(0.1)
+        collector = StatusCollector(0, snapshot.generate)
+        events = [collector.refresh() for _ in range(0, 10)]
+        self.assertTrue(all(event is events[0] for event in events))
+        self.assertTrue(events[0].wait(1.0))
+        self.assertEqual(snapshot.calls, 1)
+        self.assertEqual(collector.get_text(), 'snapshot 1')
+
+        self.assertTrue(collector.refresh().wait(1.0))
+        self.assertEqual(collector.get_text(), 'snapshot 2')
+
+    def test_cached(self):
+        # Reading the status doesn't wait for the lights.
+        snapshot = SlowSnapshot(0.5)
+        collector = StatusCollector(0, snapshot.generate)
+        collector.start()
+        start = time.monotonic()
+        for _ in range(0, 10):
+            collector.get_text()
+            collector.start()
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(snapshot.calls, 1)
+
+    def test_periodic(self):
+        snapshot = SlowSnapshot(0.0)
+        collector = StatusCollector(0.05, snapshot.generate)
+        collector.start()
+        time.sleep(0.3)
+        collector.stop()
+        calls = snapshot.calls
+        self.assertGreater(calls, 2)
+        time.sleep(0.15)
+        self.assertLessEqual(snapshot.calls, calls + 1)
+
+    def test_failure_keeps_last(self):
+        results = ['first']
+
+        def generate():
+            if len(results) == 0:
+                raise IOError('no answer')
+            return Snapshot(results.pop())
+
+        collector = StatusCollector(0, generate)
+        self.assertTrue(collector.refresh().wait(1.0))
+        timestamp = collector.get_timestamp()
+        self.assertTrue(collector.refresh().wait(1.0))
+        self.assertEqual(collector.get_text(), 'first')
+        self.assertEqual(collector.get_timestamp(), timestamp)
+
+    def test_lights(self):
+        collector = StatusCollector(0)
+        self.assertTrue(collector.refresh().wait(1.0))
+        lights = collector.get_lights()
+        self.assertIn('power', lights['Top'])
+        self.assertEqual(len(lights['Top']['color']), 4)
+
+    def test_changes(self):
+        snapshots = [
+            Snapshot('1', {'a': {'power': 0}, 'b': {'power': 0}}),
+            Snapshot('2', {'a': {'power': 1}, 'b': {'power': 0}}),
+            Snapshot('3', {'a': {'power': 1}, 'c': {'power': 0}}),
+            Snapshot('4', {'a': {'power': 1}, 'c': {'power': 0}})]
+        collector = StatusCollector(0, lambda: snapshots.pop(0))
+        changes = []
+        collector.set_listener(changes.append)
+        for _ in range(0, 4):
+            self.assertTrue(collector.refresh().wait(1.0))
+        self.assertListEqual(changes, [
+            {'a': {'power': 0}, 'b': {'power': 0}},
+            {'a': {'power': 1}},
+            {'b': None, 'c': {'power': 0}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,17 @@
 #!/usr/bin/env python
 
+import random
 import unittest
+from bisect import bisect_right
+from datetime import datetime, timedelta
 
+from bardolph.controller.script_job import ScriptJob
 from bardolph.lib.time_pattern import TimePattern
+from bardolph.vm.vm_codes import OpCode, SetOp
+from tests import test_module
+
+_HOURS = ('*', '0*', '1*', '2*', '*0', '*3', '*9', '0', '12', '23')
+_MINUTES = ('*', '0*', '2*', '5*', '*0', '*5', '*9', '00', '30', '59')
 
 
 class TimePatternTest(unittest.TestCase):
@@ -117,6 +126,71 @@ class TimePatternTest(unittest.TestCase):
         self.assertFalse(pattern.match(1, 5))
         self.assertFalse(pattern.match(10, 50))
 
+    def test_union_is_exact(self):
+        pattern = TimePattern.from_string('10:30')
+        pattern.union(TimePattern.from_string('11:*'))
+        self.assertTrue(pattern.match(10, 30))
+        self.assertTrue(pattern.match(11, 45))
+        self.assertFalse(pattern.match(10, 45))
+        self.assertFalse(pattern.match(11, 60))
+
+    def test_minute_59(self):
+        self.assertTrue(TimePattern('*', '*9').match(3, 59))
+        self.assertTrue(TimePattern('*', '5*').match(3, 59))
+        self.assertTrue(TimePattern('*', '59').match(3, 59))
+
+    def test_no_match(self):
+        self.assertIsNone(
+            TimePattern(None, None).next_match(datetime(2020, 1, 1)))
+        self.assertIsNone(
+            TimePattern('24', '*').next_match(datetime(2020, 1, 1)))
+
+    def test_next_match(self):
+        for hours in _HOURS:
+            for minutes in _MINUTES:
+                self._check_next_match(TimePattern(hours, minutes))
+
+    def test_next_match_union(self):
+        rand = random.Random(17)
+        for _ in range(0, 50):
+            pattern = TimePattern(
+                rand.choice(_HOURS), rand.choice(_MINUTES))
+            for _ in range(0, rand.randint(1, 3)):
+                pattern.union(TimePattern(
+                    rand.choice(_HOURS), rand.choice(_MINUTES)))
+            self._check_next_match(pattern)
+
+    def _check_next_match(self, pattern):
+        # Compare against every minute of the day, tried one at a time.
+        matches = [minute for minute in range(0, 24 * 60)
+                   if pattern.match(minute // 60, minute % 60)]
+        self.assertGreater(len(matches), 0, pattern)
+        midnight = datetime(2020, 2, 28)
+        for minute in range(0, 24 * 60):
+            index = bisect_right(matches, minute)
+            if index < len(matches):
+                expected = matches[index]
+            else:
+                expected = matches[0] + 24 * 60
+            moment = midnight + timedelta(minutes=minute, seconds=59.5)
+            actual = pattern.next_match(moment)
+            if actual != midnight + timedelta(minutes=expected):
+                self.fail('{} after {}: {}'.format(pattern, moment, actual))
+
+    def test_program_unchanged(self):
+        # Running a script that makes a union leaves the Program's own
+        # patterns alone, so that jobs can share it.
+        test_module.configure()
+        program = ScriptJob.from_string('time at 10:30 or 11:*').program
+        first = next(
+            inst.param1 for inst in program.code
+            if inst.op_code is OpCode.TIME_PATTERN
+            and inst.param0 is SetOp.INIT)
+        for _ in range(0, 2):
+            ScriptJob.from_program(program).execute()
+            self.assertFalse(first.match(11, 5))
+            self.assertTrue(first.match(10, 30))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+import threading
+import time
+import unittest
+
+from bardolph.lib import clock, injection, settings, timer_service
+from bardolph.lib.timer_service import TimerService
+
+
+class TimerServiceTest(unittest.TestCase):
+    def setUp(self):
+        injection.configure()
+        settings.using({'sleep_time': 0.01}).configure()
+
+    def test_order(self):
+        service = TimerService()
+        fired = []
+        done = threading.Event()
+        now = time.monotonic()
+        for delay in (0.06, 0.02, 0.04):
+            service.schedule(now + delay, lambda d=delay: fired.append(d))
+        service.schedule(now + 0.08, done.set)
+        self.assertTrue(done.wait(1.0))
+        self.assertListEqual(fired, [0.02, 0.04, 0.06])
+        self.assertEqual(service.pending(), 0)
+        service.shutdown()
+
+    def test_cancel(self):
+        service = TimerService()
+        fired = []
+        done = threading.Event()
+        now = time.monotonic()
+        timer = service.schedule(now + 0.02, lambda: fired.append(1))
+        service.schedule(now + 0.04, done.set)
+        service.cancel(timer)
+        self.assertTrue(done.wait(1.0))
+        self.assertListEqual(fired, [])
+        service.shutdown()
+
+    def test_earlier_deadline(self):
+        # A new, earlier deadline must not wait behind a later one.
+        service = TimerService()
+        done = threading.Event()
+        service.schedule(time.monotonic() + 10.0, lambda: None)
+        time.sleep(0.01)
+        start = time.monotonic()
+        service.schedule(start + 0.02, done.set)
+        self.assertTrue(done.wait(1.0))
+        self.assertLess(time.monotonic() - start, 0.2)
+        service.shutdown()
+
+    def test_pause_for(self):
+        clk = clock.Clock()
+        clk.start()
+        for _ in range(0, 3):
+            clk.pause_for(0.05)
+        self.assertAlmostEqual(clk.et(), 0.15, delta=0.03)
+        clk.stop()
+
+    def test_stop(self):
+        clk = clock.Clock()
+        clk.start()
+        threading.Timer(0.05, clk.stop).start()
+        start = time.monotonic()
+        clk.pause_for(10.0)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertFalse(clk.wait())
+
+    @staticmethod
+    def _count_service_threads() -> int:
+        return sum(1 for thread in threading.enumerate()
+                   if thread.name == 'timer service')
+
+    def test_shared_thread(self):
+        before = self._count_service_threads()
+        clocks = [clock.Clock() for _ in range(0, 50)]
+        threads = []
+        for clk in clocks:
+            clk.start()
+            threads.append(threading.Thread(
+                target=clk.pause_for, args=(0.05,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(self._count_service_threads(), max(before, 1))
+        self.assertEqual(timer_service.get_service().pending(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
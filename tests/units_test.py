@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 
+import random
 import unittest
+from unittest.mock import patch
 
 from bardolph.controller import units
+from bardolph.controller.units import UnitMode
 from bardolph.fakes.activity_monitor import Action
 from tests import test_module
 from tests.script_runner import ScriptRunner
@@ -93,5 +96,58 @@ class UnitsTest(unittest.TestCase):
             ])
 
 
+def _sample_colors():
+    # Edges, grays, and the boundaries between hue sextants, plus a lot of
+    # random colors, some of them out of range.
+    epsilon = 1.0 / 65536.0 / 2.0
+    values = (0, 0.0, -0.0, epsilon / 2.0, -epsilon / 2.0, 1, 50, 99.5, 100,
+              120, 359.99, 360, 360 + epsilon / 2.0, 720, 32767.5, 65535,
+              65536, -1)
+    colors = [[value, value, value, value] for value in values]
+    colors += [[value, 100, 50, 2700] for value in values]
+    colors += [[100, value, 0, value] for value in values]
+    colors += [[0, 100, value, 0] for value in values]
+    colors += [[h * 65535.0 / 6.0, 65535, 65535, 0] for h in range(0, 7)]
+    rng = random.Random(42)
+    for _ in range(0, 2000):
+        colors.append([rng.uniform(-10.0, 400.0) for _ in range(0, 3)]
+                      + [rng.randint(0, 9000)])
+        colors.append([rng.uniform(0.0, 65535.0) for _ in range(0, 3)]
+                      + [rng.randint(0, 9000)])
+        colors.append([rng.randint(0, 100) for _ in range(0, 3)] + [0])
+    return colors
+
+
+class BatchTest(unittest.TestCase):
+    """ Each batch conversion gives exactly the single-color results. """
+    def _check_all(self):
+        colors = _sample_colors()
+        for srce_mode in UnitMode:
+            for dest_mode in UnitMode:
+                scalar_fn = units.convert_fn(srce_mode, dest_mode)
+                batch_fn = units.convert_batch_fn(srce_mode, dest_mode)
+                if scalar_fn is None:
+                    self.assertIsNone(batch_fn)
+                    continue
+                results = batch_fn(colors)
+                self.assertEqual(len(results), len(colors))
+                for color, result in zip(colors, results):
+                    expected = scalar_fn(color)
+                    if list(result) != expected:
+                        self.fail('{}({}): {} != {}'.format(
+                            batch_fn.__name__, color, list(result),
+                            expected))
+
+    def test_batch(self):
+        self._check_all()
+
+    def test_batch_without_numpy(self):
+        with patch.object(units, 'numpy', None):
+            self._check_all()
+
+    def test_empty(self):
+        self.assertEqual(len(units.logical_to_raw_batch([])), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,9 @@
 
 import unittest
 
+from bardolph.controller.i_controller import LightSet
+from bardolph.controller.light_set_state import LightSetState
+from bardolph.lib import injection
 from bardolph.vm.call_stack import CallStack
 from bardolph.vm.machine import Registers
 from bardolph.vm.vm_codes import Operand
@@ -9,6 +12,12 @@ from bardolph.vm.vm_discover import VmDiscover
 from tests import test_module
 
 
+class _EmptyLightSet:
+    @staticmethod
+    def get_state():
+        return LightSetState()
+
+
 class VmDiscoverTest(unittest.TestCase):
     def setUp(self):
         test_module.using_small_set().configure()
@@ -90,6 +99,21 @@ class VmDiscoverTest(unittest.TestCase):
         self._assert_and_nextm('loc', 'light_2')
         self.assertEqual(self._reg.result, Operand.NULL)
 
+    def test_discovery_during_iteration(self):
+        # Once an iteration has started, it keeps going over the lights that
+        # were there at the time, even if they have since disappeared.
+        self._reg.operand = Operand.GROUP
+        self._discover.discm('group')
+        injection.bind_instance(_EmptyLightSet()).to(LightSet)
+        self._assert_and_nextm('group', 'light_2')
+        self._assert_and_nextm('group', 'light_0')
+        self.assertEqual(self._reg.result, Operand.NULL)
+
+        self._discover.discm('group')
+        self.assertEqual(self._reg.result, Operand.NULL)
+        self._discover.dnextm('group', 'light_2')
+        self.assertEqual(self._reg.result, Operand.NULL)
+
     def _assert_and_next(self, name):
         self.assertEqual(self._reg.result, name)
         self._discover.dnext(name)
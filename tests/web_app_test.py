@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 
+import json
 import unittest
 
+from bardolph.controller.script_job import ScriptJob
 from bardolph.lib import injection, settings
+from tests import test_module
 from web.web_app import WebApp
 
 class WebAppTest(unittest.TestCase):
@@ -26,6 +29,29 @@ class WebAppTest(unittest.TestCase):
         script = {'file_name': 'test.ls', 'path': 'test-path'}
         self.assertEqual(app.get_script_path(script), 'test-path')
 
+    def test_status_json(self):
+        test_module.configure()
+        settings.using({
+            'manifest_file_name': None,
+            'status_refresh_time': 0,
+            'use_fakes': True
+        }).configure()
+        app = WebApp()
+        stream = app.subscribe()
+        app._jobs.add_job(ScriptJob.from_string('on all'), 'on')
+
+        events = {}
+        while len(events) < 2:
+            event = next(stream)
+            self.assertFalse(event.startswith(':'))
+            events[event.split('\n')[1]] = event
+        self.assertIn('"Top"', events['event: lights'])
+        self.assertIn('"on"', events['event: jobs'])
+
+        status = json.loads(json.dumps(app.get_status_json()))
+        self.assertIn('Top', status['lights'])
+        self.assertIn('finished', status['jobs'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,103 @@
+import collections
+import itertools
+import json
+import threading
+
+
+class EventHub:
+    """
+    Fans events out to any number of subscribers, in the form of a
+    Server-Sent Events stream.
+
+    An event is turned into text once, when it's published. After that,
+    each subscriber only picks up text that's already there, so the work to
+    publish an event doesn't depend on how many browsers are watching.
+
+    An event can also leave behind the full state that it's part of, for
+    subscribers that arrive later. A new subscriber starts with the latest
+    full state for each kind of event, then gets the events published after
+    that. A subscriber that falls more than MAX_EVENTS behind starts over
+    from the full states.
+
+    A subscriber ties up a thread of the web server for as long as it stays
+    connected. If max_subscribers are already being served, a new one is
+    only told when to try again, and its stream ends right away.
+    """
+    MAX_EVENTS = 100
+    BUSY_RETRY = 30.0 # seconds
+
+    def __init__(self, max_subscribers=None):
+        self._events = collections.deque(maxlen=EventHub.MAX_EVENTS)
+        self._initial = {}
+        self._seq = 0
+        self._max_subscribers = max_subscribers
+        self._num_subscribers = 0
+        self._condition = threading.Condition()
+
+    def publish(self, name, data, full_state=None) -> None:
+        """
+        If given, full_state replaces the state that new subscribers start
+        with for this kind of event.
+        """
+        with self._condition:
+            self._seq += 1
+            self._events.append(self._format(name, data, self._seq))
+            if full_state is not None:
+                self._initial[name] = self._format(name, full_state)
+            self._condition.notify_all()
+
+    def subscribe(self, keep_alive=15.0):
+        """
+        Returns a generator of the text of the stream for one subscriber,
+        which goes on forever, starting from the moment of this call. If
+        nothing has happened for keep_alive seconds, it generates a comment,
+        which gives the server a chance to notice the browser has gone away.
+        """
+        with self._condition:
+            return self._stream(
+                list(self._initial.values()), self._seq, keep_alive)
+
+    def _stream(self, texts, seq, keep_alive):
+        with self._condition:
+            busy = (self._max_subscribers is not None
+                    and self._num_subscribers >= self._max_subscribers)
+            if not busy:
+                self._num_subscribers += 1
+        if busy:
+            yield 'retry: {}\n\n'.format(int(EventHub.BUSY_RETRY * 1000))
+            return
+        try:
+            while True:
+                yield from texts
+                with self._condition:
+                    if seq == self._seq:
+                        self._condition.wait(keep_alive)
+                    texts, seq = self._since(seq)
+                if len(texts) == 0:
+                    texts = [': keep-alive\n\n']
+        finally:
+            with self._condition:
+                self._num_subscribers -= 1
+
+    def get_seq(self) -> int:
+        return self._seq
+
+    def get_num_subscribers(self) -> int:
+        return self._num_subscribers
+
+    def _since(self, seq):
+        # Events after seq, and the new seq.
+        missed = self._seq - seq
+        if missed == 0:
+            return [], seq
+        if missed > len(self._events):
+            return list(self._initial.values()), self._seq
+        start = len(self._events) - missed
+        return list(itertools.islice(self._events, start, None)), self._seq
+
+    @staticmethod
+    def _format(name, data, seq=None) -> str:
+        text = 'event: {}\ndata: {}\n\n'.format(name, json.dumps(data))
+        if seq is not None:
+            text = 'id: {}\n'.format(seq) + text
+        return text
@@ -1,5 +1,7 @@
 from flask import Flask
 
+from bardolph.lib.i_lib import Settings
+from bardolph.lib.injection import inject
 from web import front_end, web_module
 
 
@@ -14,3 +16,13 @@ def create_app():
     flask_app.register_blueprint(front_end.blueprint)
     flask_app.add_url_rule("/", endpoint="index")
     return flask_app
+
+
+@inject(Settings)
+def get_threads(settings):
+    """
+    Threads for the server, which should have a few more than the most
+    browsers allowed to watch /events at once, because each one keeps a
+    thread for as long as it stays connected.
+    """
+    return settings.get_value('web_threads', 16)
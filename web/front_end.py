@@ -1,5 +1,6 @@
 #!/usr/bin/env python
-from flask import Blueprint, render_template, request
+from flask import (Blueprint, Response, jsonify, render_template, request,
+                   stream_with_context)
 
 from bardolph.lib.injection import inject, provide
 from web.i_web import WebApp
@@ -78,9 +79,22 @@ class FrontEnd:
             "status.html",
             title="Status",
             agent_class=self.get_agent_class(),
-            data=web_app.get_status(),
+            data=web_app.get_status('refresh' in request.args),
             path_root=web_app.get_path_root())
 
+    @inject(WebApp)
+    def status_json(self, web_app):
+        return jsonify(web_app.get_status_json('refresh' in request.args))
+
+    @inject(WebApp)
+    def events(self, web_app):
+        response = Response(
+            stream_with_context(web_app.subscribe()),
+            mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
     @staticmethod
     def get_agent_class():
         """ return a string containing 'tv', 'mobile', or 'desktop' """
@@ -107,6 +121,12 @@ def off(): return fe.off()
 @blueprint.route('/status')
 def status(): return fe.status()
 
+@blueprint.route('/status.json')
+def status_json(): return fe.status_json()
+
+@blueprint.route('/events')
+def events(): return fe.events()
+
 @blueprint.route('/stop/<script_path>')
 def stop_script(script_path): return fe.stop_script(script_path)
 
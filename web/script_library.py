@@ -0,0 +1,69 @@
+import hashlib
+import logging
+import os
+import threading
+
+from bardolph.controller.script_job import ScriptJob
+
+
+class _Entry:
+    __slots__ = ('stat_key', 'digest', 'program')
+
+    def __init__(self, stat_key, digest, program):
+        self.stat_key = stat_key
+        self.digest = digest
+        self.program = program
+
+
+class ScriptLibrary:
+    """
+    Compiled programs for the scripts the web app runs, so that running a
+    script doesn't mean reading and compiling it again.
+
+    Getting a program costs a call to os.stat(). Only if the file's
+    modification time or size has changed is it read again, and only if its
+    contents have changed is it compiled again.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, file_name) -> None:
+        """ Compile the script ahead of time. """
+        self.get(file_name)
+
+    def get(self, file_name):
+        """
+        The Program for the script, which is shared by every job that runs
+        it. None if the file can't be read.
+        """
+        try:
+            stat = os.stat(file_name)
+        except OSError as ex:
+            logging.error('Unable to read "{}": {}'.format(file_name, ex))
+            return None
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(file_name)
+            if entry is not None and entry.stat_key == stat_key:
+                return entry.program
+
+            try:
+                with open(file_name, 'r') as srce:
+                    input_string = srce.read()
+            except OSError as ex:
+                logging.error('Unable to read "{}": {}'.format(file_name, ex))
+                return None
+            digest = hashlib.sha256(input_string.encode()).hexdigest()
+            if entry is not None and entry.digest == digest:
+                entry.stat_key = stat_key
+                return entry.program
+
+            logging.info('Compiling "{}"'.format(file_name))
+            program = ScriptJob.compile_source(file_name, input_string)
+            self._entries[file_name] = _Entry(stat_key, digest, program)
+            return program
+
+    def get_count(self) -> int:
+        return len(self._entries)
@@ -8,7 +8,8 @@ from web import flask_module
 def main():
     print('start_wsgi.main()') ###
     ### flask_module.configure()
-    serve(flask_module.create_app())
+    flask_app = flask_module.create_app()
+    serve(flask_app, threads=flask_module.get_threads())
 
 if __name__ == "__main__":
     main()
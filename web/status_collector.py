@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+import traceback
+
+from bardolph.controller.snapshot import StatusSnapshot
+from bardolph.lib import timer_service
+
+
+class StatusCollector:
+    """
+    Keeps a text snapshot of all the lights, which is refreshed in the
+    background, so that showing the status never has to wait for the lights
+    to answer.
+
+    Once started, the snapshot is refreshed every refresh_time seconds. A
+    refresh can also be requested at any time; if one is already under way,
+    the request just shares it, so the lights are never asked more than
+    once at a time.
+
+    After each refresh, the listener, if any, is called with the lights
+    whose state has changed: a dictionary from the name of the light to its
+    new state, or to None if it has disappeared. The listener must not call
+    back into the collector.
+    """
+    def __init__(self, refresh_time, generate_fn=None):
+        self._refresh_time = refresh_time
+        self._generate_fn = generate_fn or StatusCollector._generate
+        self._text = None
+        self._lights = {}
+        self._listener = None
+        self._timestamp = None
+        self._in_flight = None
+        self._timer = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._service = timer_service.get_service()
+
+    def start(self) -> None:
+        # Has no effect if already started.
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self.refresh()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            if self._timer is not None:
+                self._service.cancel(self._timer)
+                self._timer = None
+
+    def refresh(self) -> threading.Event:
+        """
+        Start collecting a new snapshot, unless that's already happening.
+        The returned Event is set when the snapshot is ready.
+        """
+        with self._lock:
+            if self._in_flight is None:
+                self._in_flight = threading.Event()
+                threading.Thread(
+                    target=self._collect, args=(self._in_flight,),
+                    name='status collector', daemon=True).start()
+            return self._in_flight
+
+    def set_listener(self, listener) -> None:
+        self._listener = listener
+
+    def get_text(self):
+        """ The latest snapshot, or None if there isn't one yet. """
+        return self._text
+
+    def get_lights(self):
+        """
+        The raw state of each light as of the latest snapshot, keyed by the
+        name of the light. Must not be modified.
+        """
+        return self._lights
+
+    def get_timestamp(self):
+        """ When the latest snapshot was taken, as from time.time(). """
+        return self._timestamp
+
+    def get_age(self):
+        """ Seconds since the latest snapshot was taken, or None. """
+        timestamp = self._timestamp
+        if timestamp is None:
+            return None
+        return time.time() - timestamp
+
+    def _collect(self, done) -> None:
+        try:
+            snapshot = self._generate_fn()
+        except Exception as ex:
+            logging.debug(traceback.format_exc())
+            logging.error('Unable to get the status of the lights: {}'
+                          .format(ex))
+            snapshot = None
+        changes = None
+        with self._lock:
+            if snapshot is not None:
+                changes = self._changes(self._lights, snapshot.lights)
+                self._text = snapshot.text
+                self._lights = snapshot.lights
+                self._timestamp = time.time()
+            self._in_flight = None
+            if self._timer is not None:
+                self._service.cancel(self._timer)
+                self._timer = None
+            if self._running and self._refresh_time > 0:
+                self._timer = self._service.schedule(
+                    time.monotonic() + self._refresh_time, self.refresh)
+            # Still holding the lock, so that the changes from one refresh
+            # can't overtake those from the one before.
+            if changes and self._listener is not None:
+                self._listener(changes)
+        done.set()
+
+    @staticmethod
+    def _changes(old_lights, new_lights):
+        changes = {
+            name: state for name, state in new_lights.items()
+            if old_lights.get(name) != state}
+        for name in old_lights:
+            if name not in new_lights:
+                changes[name] = None
+        return changes
+
+    @staticmethod
+    def _generate():
+        return StatusSnapshot().generate(None)
@@ -1,19 +1,25 @@
 import copy
 import html
 import json
+import logging
 import platform
+import time
 from os.path import join
 
 from bardolph.controller.script_job import ScriptJob
-from bardolph.controller.snapshot import ScriptSnapshot, TextSnapshot
+from bardolph.controller.snapshot import ScriptSnapshot
 from bardolph.lib.i_lib import Settings
 from bardolph.lib.injection import inject
-from bardolph.lib.job_control import JobControl
+from bardolph.lib.job_control import JobControl, Priority
+from bardolph.lib.scheduler import Scheduler
+from web.event_hub import EventHub
+from web.script_library import ScriptLibrary
+from web.status_collector import StatusCollector
 
 
 class ScriptControl:
     def __init__(self, file_name, run_background=False, title='', path='',
-                background='', color='', icon=''):
+                background='', color='', icon='', priority=Priority.NORMAL):
         self.file_name = html.escape(file_name)
         self.run_background = run_background
         self.path = html.escape(path)
@@ -21,6 +27,7 @@ class ScriptControl:
         self.background = html.escape(background)
         self.color = html.escape(color)
         self.icon = icon
+        self.priority = priority
         self.running = None
 
 class WebApp:
@@ -30,9 +37,34 @@ class WebApp:
 
     def __init__(self):
         self._scripts = {}
-        self._jobs = JobControl()
+        self._events = self._make_event_hub()
+        self._jobs = self._make_job_control()
+        self._jobs.add_listener(self._publish_jobs)
+        self._status = self._make_status_collector()
+        self._status.set_listener(self._publish_lights)
+        self._library = ScriptLibrary()
         self._load_manifest()
 
+    @staticmethod
+    @inject(Settings)
+    def _make_job_control(settings):
+        max_workers = settings.get_value('max_job_workers', 16)
+        if not settings.get_value('use_scheduler', False):
+            return JobControl(None, max_workers)
+        num_threads = settings.get_value('scheduler_threads', 1)
+        return JobControl(Scheduler(num_threads), max_workers)
+
+    @staticmethod
+    @inject(Settings)
+    def _make_event_hub(settings):
+        return EventHub(settings.get_value('max_event_streams', 8))
+
+    @staticmethod
+    @inject(Settings)
+    def _make_status_collector(settings):
+        return StatusCollector(
+            settings.get_value('status_refresh_time', 30))
+
     @inject(Settings)
     def _load_manifest(self, settings):
         # If manifest_name is explicitly None, don't attempt to load a file.
@@ -41,6 +73,7 @@ class WebApp:
             return
         fname = join('web', basename)
         config_list = json.load(open(fname))
+        script_path = settings.get_value('script_path', '.')
         self._scripts = {}
         for script_config in config_list:
             file_name = script_config['file_name']
@@ -50,19 +83,32 @@ class WebApp:
             background = script_config['background']
             color = script_config['color']
             icon = script_config.get('icon', 'litBulb')
+            priority = Priority[
+                script_config.get('priority', 'normal').upper()]
             new_script = ScriptControl(file_name, run_background, title, path,
-                                        background, color, icon)
+                                        background, color, icon, priority)
             self._scripts[path] = new_script
+            self._library.load(join(script_path, file_name))
 
     @inject(Settings)
     def queue_script(self, script_control, settings):
+        """
+        The script was compiled when the manifest was loaded, and is compiled
+        again only if the file has changed since.
+        """
         fname = join(
             settings.get_value("script_path", "."), script_control.file_name)
-        job = ScriptJob.from_file(fname)
+        program = self._library.get(fname)
+        if program is None:
+            logging.error('Unable to run "{}"'.format(fname))
+            return False
+        job = ScriptJob.from_program(program)
         if script_control.run_background:
-            self._jobs.spawn_job(job, script_control.path)
+            self._jobs.spawn_job(
+                job, script_control.path, script_control.priority)
         else:
-            self._jobs.add_job(job, script_control.path)
+            self._jobs.add_job(
+                job, script_control.path, script_control.priority)
         return True
 
     def queue_file(self, file_name, run_background=False):
@@ -85,16 +131,89 @@ class WebApp:
             result.append(script)
         return result
 
-    def get_status(self):
+    def get_status(self, refresh=False):
+        """
+        The lights come from the latest snapshot taken in the background,
+        which is started by the first request for the status. If refresh is
+        True, a new snapshot is requested, and shows up on a later request.
+        """
+        lights = self._start_status(refresh).get_text()
         status = {
             'background_jobs': self._jobs.get_background(),
             'current_job': self._jobs.get_current(),
             'queued_jobs': self._jobs.get_queued(),
-            'lights': TextSnapshot().generate().text,
+            'lights': lights or 'Getting the status of the lights.',
+            'lights_age': self._status.get_age(),
+            'lights_time': self._get_lights_time(),
             'py_version': platform.python_version()
         }
         return status
 
+    def get_status_json(self, refresh=False):
+        """
+        Same as get_status(), but everything can be converted to JSON, and
+        the lights are in the form of their raw state.
+        """
+        self._start_status(refresh)
+        return {
+            'jobs': self.get_jobs(),
+            'lights': self._status.get_lights(),
+            'lights_age': self._status.get_age(),
+            'lights_time': self._get_lights_time(),
+            'py_version': platform.python_version()
+        }
+
+    def get_jobs(self):
+        current = self._jobs.get_current()
+        return {
+            'current': None if current is None else self._describe(current),
+            'queued': [self._describe(agent)
+                       for agent in self._jobs.get_queued()],
+            'background': [self._describe(agent)
+                           for agent in list(self._jobs.get_background())],
+            'finished': [self._describe(agent)
+                         for agent in self._jobs.get_history()]
+        }
+
+    def subscribe(self):
+        """
+        Generates a stream of Server-Sent Events for one browser: "jobs"
+        with the state of every job whenever it changes, and "lights" with
+        the state of every light that has changed since the last snapshot.
+        """
+        self._start_status(False)
+        return self._events.subscribe()
+
+    def _start_status(self, refresh):
+        self._status.start()
+        if refresh:
+            self._status.refresh()
+        return self._status
+
+    def _get_lights_time(self):
+        timestamp = self._status.get_timestamp()
+        if timestamp is None:
+            return None
+        return time.strftime('%H:%M:%S', time.localtime(timestamp))
+
+    @staticmethod
+    def _describe(agent):
+        run_time = agent.run_time
+        return {
+            'name': agent.name,
+            'priority': agent.priority.name.lower(),
+            'wait_time': round(agent.wait_time, 3),
+            'run_time': None if run_time is None else round(run_time, 3),
+            'preempted': agent.preempted
+        }
+
+    def _publish_jobs(self) -> None:
+        jobs = self.get_jobs()
+        self._events.publish('jobs', jobs, jobs)
+
+    def _publish_lights(self, changes) -> None:
+        self._events.publish('lights', changes, self._status.get_lights())
+
     @inject(Settings)
     def get_path_root(self, settings):
         return settings.get_value('path_root', '/')
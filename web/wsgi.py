@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 
 from waitress import serve
-from web.flask_module import create_app
+from web.flask_module import create_app, get_threads
 
 if __name__ == '__main__':
-    serve(create_app(), listen='127.0.0.1')
+    flask_app = create_app()
+    serve(flask_app, listen='127.0.0.1', threads=get_threads())
 